@@ -0,0 +1,120 @@
+"""Benchmark of the construct tables: frozenset lookups and combined patterns against lists and one pattern each.
+
+Run from the project root directory:
+
+.. code-block:: bash
+
+    python benchmarks/bench_constructs.py --copies 20 --extra-names 100
+
+A large document is made by repeating the body of an example document. The tables are extended with made up names, as
+a user table loaded with :py:meth:`~translatex.constructs.ConstructTables.load` would, to show how each approach scales
+with the size of the tables. Two measurements are reported:
+
+- The marking traversal of the parsed document (parsing with TexSoup isn't part of the measured time), testing the name
+  of every node against the tables as frozensets, and against the same tables as lists like the ones of the
+  :py:mod:`~translatex.data` module.
+- The tokenization of the completely removed commands of the marked document, in a single sweep with the combined
+  pattern, and in one sweep per command like before the tables.
+"""
+import argparse
+import copy
+import time
+from types import SimpleNamespace
+from typing import Callable
+
+from TexSoup import TexSoup
+
+from common import add_document_arguments, large_document
+from translatex.constructs import DEFAULT_TABLES, ConstructTables
+from translatex.marker import Marker
+from translatex.pipeline import Pipeline
+from translatex.tokenizer import Tokenizer
+
+
+def best_of(repeat: int, run: Callable[[], None]) -> float:
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_marking(latex: str, tables: ConstructTables, repeat: int) -> None:
+    as_lists = SimpleNamespace(
+        **{
+            name: list(getattr(tables, name))
+            for name in ConstructTables.TABLES + ("skipped_commands",)
+        }
+    )
+    soup = TexSoup(latex)
+    for name, lookup_tables in (("frozensets", tables), ("lists", as_lists)):
+        timings = list()
+        for _ in range(repeat):
+            # The traversal renames the nodes, each run needs its own tree
+            tree = copy.deepcopy(soup)
+            marker = Marker(latex)
+            marker.tables = lookup_tables
+            start = time.perf_counter()
+            marker._traverse_ast(tree)
+            timings.append(time.perf_counter() - start)
+        print(f"marking, {name:<40} {min(timings) * 1000:>10.2f} ms")
+
+
+def bench_removed_commands(
+    marked: str, tables: ConstructTables, repeat: int
+) -> None:
+    single_tables = [
+        ConstructTables(completely_removed_commands=[command])
+        for command in sorted(tables.completely_removed_commands)
+    ]
+
+    def combined() -> str:
+        tokenizer = Tokenizer(marked)
+        tokenizer.tables = tables
+        return tokenizer._tokenize_completely_removed(marked)
+
+    def per_command() -> str:
+        tokenizer = Tokenizer(marked)
+        current = marked
+        for command_tables in single_tables:
+            tokenizer.tables = command_tables
+            current = tokenizer._tokenize_completely_removed(current)
+        return current
+
+    for name, run in (
+        ("one combined sweep", combined),
+        (f"{len(single_tables)} sweeps, one per command", per_command),
+    ):
+        elapsed = best_of(repeat, run)
+        print(f"removed commands, {name:<31} {elapsed * 1000:>10.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_document_arguments(parser)
+    parser.add_argument(
+        "--extra-names",
+        type=int,
+        default=100,
+        help="How many made up names are added to every table",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+    latex = large_document(args.file.read_text(), args.copies)
+    tables = DEFAULT_TABLES.merged(
+        {
+            name: [
+                f"user{name.split('_')[0]}{i}" for i in range(args.extra_names)
+            ]
+            for name in ConstructTables.TABLES
+        }
+    )
+    print(f"{len(latex)} characters, {tables}")
+    bench_marking(latex, tables, args.repeat)
+    marked = Pipeline(stop="Marker", tables=tables).run(latex).output
+    bench_removed_commands(marked, tables, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
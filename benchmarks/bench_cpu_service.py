@@ -0,0 +1,108 @@
+"""Benchmark of CPU bound translation services, called in the main process or in a pool of worker processes.
+
+Run from the project root directory:
+
+.. code-block:: bash
+
+    python benchmarks/bench_cpu_service.py --work 20000 --workers 4
+
+An example document is run through the stages up to tokenization, then translated with a stand-in for a local model
+that burns CPU time in pure Python for every character it translates. The same service is run once in the main process
+and once through :py:class:`~translatex.translator.ServiceProcessPool`, the wall times and the speedup are reported. The
+time the workers take to start and create their service is included.
+"""
+import argparse
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from translatex.marker import Marker
+from translatex.preprocessor import Preprocessor
+from translatex.tokenizer import Tokenizer
+from translatex.translator import (
+    ServiceProcessPool,
+    TranslationService,
+    Translator,
+)
+
+EXAMPLES_DIR_PATH = Path(__file__).parent.parent.resolve() / "examples"
+WORK_ENV_VARIABLE_NAME = "TRANSLATEX_BENCH_WORK"
+
+
+class CPUHeavyService(TranslationService):
+    """Leaves the text untouched after hashing it over and over, holding the GIL like a local model would."""
+
+    name = "CPU heavy stand-in"
+    char_limit = 500
+
+    def __init__(self):
+        # Read from the environment so that worker processes get it too
+        self.work = int(os.environ.get(WORK_ENV_VARIABLE_NAME, "1000"))
+
+    def translate(self, text: str, source_lang: str, dest_lang: str) -> str:
+        digest = text.encode()
+        for _ in range(self.work * len(text) // 100):
+            digest = hashlib.sha256(digest).digest()
+        return text
+
+
+class CPUHeavyPooledService(CPUHeavyService):
+    """The same service, declared CPU bound to run in worker processes."""
+
+    name = "CPU heavy stand-in (pool)"
+    cpu_bound = True
+
+
+def tokenized(latex: str) -> Translator:
+    p = Preprocessor(latex)
+    p.process()
+    m = Marker.from_preprocessor(p)
+    m.mark()
+    t = Tokenizer.from_marker(m)
+    t.tokenize()
+    return Translator.from_tokenizer(t)
+
+
+def bench(translator: Translator, service: TranslationService) -> float:
+    start = time.perf_counter()
+    translator.translate(
+        service=service, source_lang="en", destination_lang="fr"
+    )
+    elapsed = time.perf_counter() - start
+    print(f"{service.name:<28} {elapsed * 1000:>10.2f} ms")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-f", "--file", type=Path, default=EXAMPLES_DIR_PATH / "translatex.tex"
+    )
+    parser.add_argument(
+        "--work",
+        type=int,
+        default=1000,
+        help="Hashes per 100 characters translated",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: number of CPUs)",
+    )
+    args = parser.parse_args()
+    os.environ[WORK_ENV_VARIABLE_NAME] = str(args.work)
+    translator = tokenized(args.file.read_text())
+    print(
+        f"{args.file.name}: {len(translator.plan(CPUHeavyService))} chunks, "
+        f"{os.cpu_count()} CPUs"
+    )
+    sequential = bench(translator, CPUHeavyService())
+    ServiceProcessPool.DEFAULT_MAX_WORKERS = args.workers
+    pooled = bench(translator, CPUHeavyPooledService())
+    print(f"Speedup: {sequential / pooled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
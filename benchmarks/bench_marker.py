@@ -0,0 +1,99 @@
+"""Microbenchmarks for the marking stage.
+
+Run from the project root directory:
+
+.. code-block:: bash
+
+    python benchmarks/bench_marker.py
+
+Math environments with a lot of children (wide tables, long lists of cases) go through the content marking path of
+:py:class:`~translatex.marker.Marker` once per range of expressions to mark. Long itemize lists give the baseline cost
+of a regular traversal.
+
+Parsing with TexSoup is done beforehand and isn't part of the measured time: only the tree traversal and marking are.
+"""
+import argparse
+import time
+from textwrap import dedent
+
+from TexSoup import TexSoup
+
+from translatex.marker import Marker
+
+
+def wide_table(columns: int) -> str:
+    """A math array with a text cell for every other column."""
+    cells = " & ".join(
+        rf"\text{{cell {i}}}" if i % 2 else f"x_{{{i}}} + {i}"
+        for i in range(columns)
+    )
+    return dedent(
+        rf"""
+    \begin{{document}}
+    \[
+    \begin{{array}}{{{"c" * columns}}}
+    {cells} \\
+    {cells}
+    \end{{array}}
+    \]
+    \end{{document}}
+    """
+    )
+
+
+def long_cases(items: int) -> str:
+    """A cases environment with a text condition for every line."""
+    lines = " \\\\\n".join(
+        rf"{i}x^{i} & \text{{if case {i} holds}}" for i in range(items)
+    )
+    return dedent(
+        rf"""
+    \begin{{document}}
+    \begin{{equation}}
+    f(x) = \begin{{cases}}
+    {lines}
+    \end{{cases}}
+    \end{{equation}}
+    \end{{document}}
+    """
+    )
+
+
+def long_itemize(items: int) -> str:
+    """An itemize list with a bit of inline math in every item."""
+    lines = "\n".join(
+        rf"\item Item number {i} with $x_{{{i}}}$ inside" for i in range(items)
+    )
+    return (
+        "\\begin{document}\n\\begin{itemize}\n"
+        + lines
+        + "\n\\end{itemize}\n\\end{document}\n"
+    )
+
+
+def bench(name: str, latex: str, repeat: int) -> None:
+    timings = list()
+    for _ in range(repeat):
+        soup = TexSoup(latex)
+        marker = Marker(latex)
+        start = time.perf_counter()
+        marker._traverse_ast(soup)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{name:<24} {len(latex):>9} chars {best * 1000:>10.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for size in (100, 400, 1600):
+        bench(f"wide_table({size})", wide_table(size), args.repeat)
+    for size in (100, 400, 1600):
+        bench(f"long_cases({size})", long_cases(size), args.repeat)
+    for size in (100, 400, 1600):
+        bench(f"long_itemize({size})", long_itemize(size), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark of the peak memory used by the whole pipeline, with and without its low memory mode.
+
+Run from the project root directory:
+
+.. code-block:: bash
+
+    python benchmarks/bench_memory.py --copies 50
+
+A large document is made by repeating the body of an example document, then translated to the end with an instant
+:py:class:`~translatex.mock.MockTranslationService`. Each mode runs in a fresh Python process so that its peak resident
+set size (RSS) isn't hidden by an earlier run. The peak RSS of the process, its increase over the RSS measured right
+before the run and the wall time are reported, along with the memory the Python objects hold when the translation
+stage completes and once the run is over with its result kept, as traced by :py:mod:`tracemalloc`. The peak is
+reached while TexSoup parses the document, the low memory mode bounds it by parsing shards of the document one after
+the other, and lowers what is held during the translation and after.
+Measuring the RSS needs the ``resource`` module, so a Unix system.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from common import add_document_arguments, large_document
+from translatex.mock import MockTranslationService
+from translatex.pipeline import Pipeline
+
+
+def peak_rss() -> int:
+    """The peak resident set size of the current process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def child(path: Path, copies: int, low_memory: bool) -> None:
+    """Runs the pipeline once and prints the measurements as JSON."""
+    latex = large_document(path.read_text(), copies)
+    pipeline = Pipeline(
+        service=MockTranslationService(),
+        source_lang="en",
+        dest_langs="fr",
+        low_memory=low_memory,
+    )
+    translated = list()
+    pipeline.add_hook(
+        "Translator",
+        lambda a, dest_lang: translated.append(
+            tracemalloc.get_traced_memory()[0]
+        ),
+    )
+    tracemalloc.start()
+    before = peak_rss()
+    start = time.perf_counter()
+    result = pipeline.run(latex)
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    del result
+    print(
+        json.dumps(
+            {
+                "characters": len(latex),
+                "seconds": elapsed,
+                "peak_rss": peak_rss(),
+                "increase": peak_rss() - before,
+                "translated": translated[0],
+                "held": held,
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_document_arguments(parser)
+    parser.add_argument("--child", choices=["normal", "low-memory"])
+    args = parser.parse_args()
+    if args.child:
+        child(args.file, args.copies, args.child == "low-memory")
+        return
+    for mode in ("normal", "low-memory"):
+        run = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--file",
+                str(args.file),
+                "--copies",
+                str(args.copies),
+                "--child",
+                mode,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        stats = json.loads(run.stdout.splitlines()[-1])
+        print(
+            f"{mode:<12} {stats['characters']:>10} chars "
+            f"{stats['peak_rss'] / 2**20:>8.1f} MiB peak RSS "
+            f"({stats['increase'] / 2**20:+.1f}) "
+            f"{stats['translated'] / 2**20:>6.2f} MiB held once translated "
+            f"{stats['held'] / 2**20:>6.2f} MiB after "
+            f"{stats['seconds'] * 1000:>9.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
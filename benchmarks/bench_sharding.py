@@ -0,0 +1,52 @@
+"""Benchmark of the scaling of sharded marking over the number of worker processes.
+
+Run from the project root directory:
+
+.. code-block:: bash
+
+    python benchmarks/bench_sharding.py --copies 20 --max-workers 8
+
+A large document is made by repeating the body of an example document, then run through the pipeline up to the
+tokenization stage with 1 to N worker processes marking its shards (see :py:mod:`translatex.sharding`), 1 meaning the
+whole document marked in the current process. The wall time, the speedup over a single process and whether the
+tokenized output is the same as with a single process are reported for each number of workers. The speedup is bound
+by the number of CPUs and by the stages that stay sequential, preprocessing and tokenization.
+"""
+import argparse
+import os
+import time
+
+from common import add_document_arguments, large_document
+from translatex.pipeline import Pipeline
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_document_arguments(parser)
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="The largest number of worker processes to try (default: the number of CPUs)",
+    )
+    args = parser.parse_args()
+    latex = large_document(args.file.read_text(), args.copies)
+    print(f"{len(latex)} characters, {os.cpu_count()} CPU(s)")
+    reference = None
+    single = None
+    for workers in range(1, args.max_workers + 1):
+        pipeline = Pipeline(stop="Tokenizer", shard_workers=workers)
+        start = time.perf_counter()
+        output = pipeline.run(latex).output
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference, single = output, elapsed
+        print(
+            f"{workers:>3} worker(s) {elapsed * 1000:>10.2f} ms "
+            f"{single / elapsed:>6.2f}x "
+            f"{'same output' if output == reference else 'DIFFERENT OUTPUT'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
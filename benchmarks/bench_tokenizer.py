@@ -0,0 +1,115 @@
+"""Benchmarks for the tokenization stage.
+
+Run from the project root directory:
+
+.. code-block:: bash
+
+    python benchmarks/bench_tokenizer.py
+
+Documents of the same size but with an increasing density of LaTeX structures are marked beforehand and then
+tokenized with each engine of :py:class:`~translatex.tokenizer.Tokenizer`. Only the tokenization is measured. The
+throughput of an engine that doesn't depend on the number of structures stays flat along a column.
+
+With ``--passes``, each tokenization pass is run alone on inputs with a growing number of the structures it handles.
+The time per structure of a pass that is linear stays flat when the size doubles.
+"""
+import argparse
+import time
+
+from translatex.marker import Marker
+from translatex.tokenizer import Tokenizer
+
+PLAIN_LINE = "This sentence is plain text without anything special inside."
+STRUCTURED_LINES = (
+    r"See \ref{sec:intro} for the \textbf{bold} claim % a comment",
+    r"Let $x_{1} + y$ be \emph{small} as in \cite{knuth}.",
+    r"\begin{equation} x^2 = \text{the square} \end{equation}",
+)
+
+
+def document(lines: int, density: float) -> str:
+    """A document with the given number of lines where a ``density`` fraction of them contain structures."""
+    body = list()
+    structured = 0
+    for i in range(lines):
+        if structured < density * (i + 1):
+            body.append(STRUCTURED_LINES[structured % len(STRUCTURED_LINES)])
+            structured += 1
+        else:
+            body.append(PLAIN_LINE)
+    return "\\begin{document}\n" + "\n\n".join(body) + "\n\\end{document}\n"
+
+
+PASS_INPUTS = {
+    "_tokenize_comments": "text % comment\n",
+    "_tokenize_completely_removed": r"see \ref{sec:intro} ",
+    "_tokenize_specials": r"\item an \verb|x| item ",
+    "_tokenize_unnamed_math_optimized": "$//1//$ and \\[//2//\\] ",
+    "_tokenize_commands": r"\//1//[opt]{arg}{text} ",
+    "_tokenize_named_envs": r"\begin{//1//}//2//\end{//1//} ",
+    "_tokenize_markers": "//1// text ",
+    "_tokenize_latex_escapes": r"a\,b\; ",
+}
+
+
+def bench_passes(repeat: int) -> None:
+    sizes = (500, 1000, 2000, 4000)
+    print(f"{'pass':<34}", end="")
+    for size in sizes:
+        print(f" {str(size) + ' (us/match)':>16}", end="")
+    print()
+    for name, unit in PASS_INPUTS.items():
+        print(f"{name:<34}", end="")
+        for size in sizes:
+            string = unit * size
+            timings = list()
+            for _ in range(repeat):
+                tokenizer = Tokenizer(string)
+                start = time.perf_counter()
+                getattr(tokenizer, name)(string)
+                timings.append(time.perf_counter() - start)
+            print(f" {min(timings) * 1e6 / size:>16.2f}", end="")
+        print()
+
+
+def bench(marked_latex: str, engine: str, repeat: int) -> float:
+    timings = list()
+    for _ in range(repeat):
+        tokenizer = Tokenizer(marked_latex)
+        tokenizer.engine = engine
+        start = time.perf_counter()
+        tokenizer.tokenize()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-l", "--lines", type=int, default=1000)
+    parser.add_argument(
+        "--passes",
+        action="store_true",
+        help="Measure the scaling of each tokenization pass instead",
+    )
+    args = parser.parse_args()
+    if args.passes:
+        bench_passes(args.repeat)
+        return
+    print(f"{'density':>8} {'chars':>9}", end="")
+    for engine in Tokenizer.ENGINES:
+        print(f" {engine + ' (chars/ms)':>24}", end="")
+    print()
+    for density in (0.0, 0.1, 0.25, 0.5, 1.0):
+        marker = Marker(document(args.lines, density))
+        marker.mark()
+        marked_latex = marker.marked_latex
+        print(f"{density:>8} {len(marked_latex):>9}", end="")
+        for engine in Tokenizer.ENGINES:
+            best = bench(marked_latex, engine, args.repeat)
+            print(f" {len(marked_latex) / (best * 1000):>24.0f}", end="")
+        print()
+
+
+if __name__ == "__main__":
+    main()
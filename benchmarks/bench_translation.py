@@ -0,0 +1,110 @@
+"""Offline benchmark of the translation stage against the mock translation service.
+
+Run from the project root directory:
+
+.. code-block:: bash
+
+    python benchmarks/bench_translation.py --latency 0.05 --distribution lognormal --jitter 0.5
+
+An example document is run through the stages up to tokenization, then translated with
+:py:class:`~translatex.mock.MockTranslationService` which answers after the chosen latency without any network access.
+The number of calls, the characters sent and the wall time are reported. With ``--http``, the translation goes through
+a local :py:class:`~translatex.mock.MockTranslationServer` mimicking Google Translate v2 instead, to include the cost of
+HTTP. The seed makes runs reproducible.
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+from translatex.marker import Marker
+from translatex.mock import (
+    MockTranslationBackend,
+    MockTranslationServer,
+    MockTranslationService,
+)
+from translatex.preprocessor import Preprocessor
+from translatex.tokenizer import Tokenizer
+from translatex.translator import GoogleTranslate, Translator
+
+EXAMPLES_DIR_PATH = Path(__file__).parent.parent.resolve() / "examples"
+
+
+def tokenized(latex: str) -> Translator:
+    p = Preprocessor(latex)
+    p.process()
+    m = Marker.from_preprocessor(p)
+    m.mark()
+    t = Tokenizer.from_marker(m)
+    t.tokenize()
+    return Translator.from_tokenizer(t)
+
+
+def bench(name: str, translator: Translator, service, backend) -> None:
+    start = time.perf_counter()
+    translator.translate(
+        service=service, source_lang="en", destination_lang="fr"
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<24} {backend.stats['calls']:>6} calls {backend.stats['characters']:>9} chars "
+        f"{elapsed * 1000:>10.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-f", "--file", type=Path, default=EXAMPLES_DIR_PATH / "translatex.tex"
+    )
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument(
+        "--distribution",
+        choices=MockTranslationBackend.DISTRIBUTIONS,
+        default=MockTranslationBackend.DEFAULT_DISTRIBUTION,
+    )
+    parser.add_argument("--per-char-latency", type=float, default=0.0)
+    parser.add_argument("--char-limit", type=int, default=500)
+    parser.add_argument("--array-item-limit", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--http",
+        action="store_true",
+        help="Go through the local mock HTTP server",
+    )
+    args = parser.parse_args()
+    backend = MockTranslationBackend(
+        latency=args.latency,
+        jitter=args.jitter,
+        distribution=args.distribution,
+        per_char_latency=args.per_char_latency,
+        char_limit=args.char_limit,
+        array_item_limit=args.array_item_limit,
+        array_overall_char_limit=args.array_item_limit * args.char_limit,
+        seed=args.seed,
+    )
+    translator = tokenized(args.file.read_text())
+    if not args.http:
+        bench(
+            args.file.name,
+            translator,
+            MockTranslationService(backend),
+            backend,
+        )
+        return
+    with MockTranslationServer(backend) as server:
+        os.environ.setdefault(
+            GoogleTranslate.api_key_env_variable_name, "mock"
+        )
+        service = GoogleTranslate()
+        service.url = server.google_url
+        # Plan the chunks for the limits of the mock
+        service.char_limit = backend.char_limit
+        service.array_item_limit = backend.array_item_limit
+        service.array_overall_char_limit = backend.array_overall_char_limit
+        bench(f"{args.file.name} (http)", translator, service, backend)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Helpers shared by the benchmarks that run on a large document made from an example document."""
+import argparse
+from pathlib import Path
+
+EXAMPLES_DIR_PATH = Path(__file__).parent.parent.resolve() / "examples"
+
+
+def large_document(latex: str, copies: int) -> str:
+    """The document with the contents of its document environment repeated."""
+    head, rest = latex.split("\\begin{document}", 1)
+    body, tail = rest.split("\\end{document}", 1)
+    return f"{head}\\begin{{document}}{body * copies}\\end{{document}}{tail}"
+
+
+def add_document_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the arguments of the example document and of how many times its body is repeated."""
+    parser.add_argument(
+        "-f", "--file", type=Path, default=EXAMPLES_DIR_PATH / "translatex.tex"
+    )
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=20,
+        help="How many times the body of the document is repeated",
+    )
@@ -11,7 +11,9 @@ manual translation by a professional human translator or parsing.
 """
 import logging
 
+from .checkpoint import Checkpoint
 from .marker import Marker
+from .pipeline import Pipeline, Result
 from .preprocessor import Preprocessor
 from .tokenizer import Tokenizer
 from .translator import Translator
@@ -0,0 +1,181 @@
+"""Checkpoints of the pipeline, to run only the stages after a given one again.
+
+The debug files written by the command line program are for humans to read and can't be loaded back. A
+:py:class:`Checkpoint` holds the result of each stage along with the stores needed to undo it (see
+:py:meth:`~translatex.preprocessor.Preprocessor.state` and the same method of the other stages), and is saved as a
+compact, versioned JSON file. A pipeline can then be resumed from any stage with
+:py:meth:`~translatex.pipeline.Pipeline.resume_from`, with the result of that stage possibly edited by hand, for example to
+rebuild a LaTeX file from a fixed translation without translating it again::
+
+    checkpoint = Checkpoint()
+    checkpoint.add_hooks(pipeline)
+    pipeline.run(latex)
+    checkpoint.save("checkpoint.json")
+
+    result = pipeline.resume_from(Checkpoint.load("checkpoint.json"), "Translator", fixed_translation)
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Union
+
+from .marker import Marker
+from .pipeline import Pipeline, Result
+from .preprocessor import Preprocessor
+from .tokenizer import Tokenizer
+from .translator import Translator
+
+log = logging.getLogger("translatex.checkpoint")
+
+
+class Checkpoint:
+    """The results of the stages of a run of the pipeline and the stores needed to undo them.
+
+    The state of the translation stage is kept for each destination language. The others are shared by all the
+    languages.
+    """
+
+    FORMAT: str = "translatex-checkpoint"
+    """The identifier of checkpoint files"""
+    VERSION: int = 1
+    """The version of the layout of checkpoint files, only files of this version can be loaded"""
+    DEFAULT_FILE_EXT: str = ".json"
+
+    def __init__(self, stages: Optional[Dict[str, Any]] = None) -> None:
+        """Creates a checkpoint, empty by default.
+
+        Args:
+            stages: The state of each stage reached, and of each destination language for the translation stage
+
+        """
+        self.stages: Dict[str, Any] = stages or dict()
+
+    def __str__(self) -> str:
+        return f"The checkpoint holds the stages: {', '.join(self.stages) or 'none'}."
+
+    def add_hooks(self, pipeline: Pipeline) -> None:
+        """Records the state of every stage the pipeline completes in this checkpoint."""
+        for stage in Pipeline.STAGES:
+            pipeline.add_hook(
+                stage,
+                lambda stage_object, dest_lang, stage=stage: self.record(
+                    stage, stage_object, dest_lang
+                ),
+            )
+
+    def record(
+        self, stage: str, stage_object: Any, dest_lang: Optional[str] = None
+    ) -> None:
+        """Records the state of a stage, of the given destination language for the translation stage."""
+        if stage == "Translator":
+            self.stages.setdefault(stage, dict())[
+                dest_lang
+            ] = stage_object.state()
+        else:
+            self.stages[stage] = stage_object.state()
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Writes the checkpoint to a file."""
+        Path(path).write_text(
+            json.dumps(
+                {
+                    "format": Checkpoint.FORMAT,
+                    "version": Checkpoint.VERSION,
+                    "stages": self.stages,
+                },
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        )
+        log.info("Checkpoint written to %s", path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Checkpoint":
+        """Reads a checkpoint from a file.
+
+        Raises:
+            ValueError: If the file isn't a checkpoint or was written by a version of TransLaTeX with another layout
+
+        """
+        try:
+            contents = json.loads(Path(path).read_text())
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path} is not a checkpoint: {e}") from e
+        if not isinstance(contents, dict) or (
+            contents.get("format") != Checkpoint.FORMAT
+        ):
+            raise ValueError(f"{path} is not a checkpoint")
+        if contents.get("version") != Checkpoint.VERSION:
+            raise ValueError(
+                f"{path} is a checkpoint of version {contents.get('version')}, "
+                f"only version {Checkpoint.VERSION} is supported"
+            )
+        return cls(contents["stages"])
+
+    def restore(
+        self,
+        stage: str,
+        dest_langs: Sequence[str],
+        output: Optional[str] = None,
+    ) -> Result:
+        """Recreates the objects of the stages up to the given one, ready to run the next stages.
+
+        Args:
+            stage: The last stage to restore
+            dest_langs: The destination languages to restore the translation stage of
+            output: The result of the last stage to use instead of the recorded one, e.g. a translation fixed by hand
+
+        Raises:
+            ValueError: If the stage is unknown, wasn't recorded or, with an output, if the translation stage of
+                several languages is restored
+
+        """
+        if stage not in Pipeline.STAGES:
+            raise ValueError(
+                f"Unknown stage, choose one of: {', '.join(Pipeline.STAGES)}"
+            )
+        stages = Pipeline.STAGES[: Pipeline.STAGES.index(stage) + 1]
+        missing = [name for name in stages if name not in self.stages]
+        if stage == "Translator" and not missing:
+            missing = [
+                f"Translator ({dest_lang})"
+                for dest_lang in dest_langs
+                if dest_lang not in self.stages[stage]
+            ]
+        if missing:
+            raise ValueError(
+                f"The checkpoint doesn't hold the stages: {', '.join(missing)}"
+            )
+        if (
+            stage == "Translator"
+            and output is not None
+            and len(dest_langs) > 1
+        ):
+            raise ValueError(
+                "A translation can only be given for a single destination language"
+            )
+        result = Result()
+        result.preprocessor = Preprocessor.from_state(
+            self.stages["Preprocessor"]
+        )
+        if "Marker" in stages:
+            result.marker = Marker.from_state(self.stages["Marker"])
+        if "Tokenizer" in stages:
+            result.tokenizer = Tokenizer.from_state(self.stages["Tokenizer"])
+        if "Translator" in stages:
+            result.translators = {
+                dest_lang: Translator.from_state(
+                    self.stages["Translator"][dest_lang]
+                )
+                for dest_lang in dest_langs
+            }
+        if output is not None:
+            if stage == "Preprocessor":
+                result.preprocessor.processed_latex = output
+            elif stage == "Marker":
+                result.marker.marked_latex = output
+            elif stage == "Tokenizer":
+                result.tokenizer.tokenized_string = output
+            else:
+                result.translators[dest_langs[0]].translated_string = output
+        return result
@@ -0,0 +1,221 @@
+"""A translation service made of several others, hedging slow calls and failing over on errors.
+
+The time a document takes to translate is set by the slowest calls of a service more than by its typical ones, and a
+service going down in the middle of a document shouldn't stop the translation. :py:class:`CompositeService` wraps an
+ordered list of translation services: every call goes to the first one, and is also sent to the next one (a hedged
+request) if it takes longer than most of the previous calls to the first one did. Whichever answers first is used. A
+call that fails is sent to the next service instead. The service that answered each chunk is recorded by the
+:py:class:`~translatex.translator.Translator`, see :py:attr:`~translatex.translator.Translator.chunk_services`.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Deque, Dict, List, Optional, Sequence
+
+from .translator import TranslationService, TranslationServiceError
+
+log = logging.getLogger("translatex.composite")
+
+
+class CompositeService(TranslationService):
+    """Translation service sending each call to an ordered list of services, hedging slow calls and failing over.
+
+    A call is sent to the first service. If it takes longer than the :py:attr:`hedge_percentile` percentile of the
+    latencies of the previous calls to that service, the same call is sent to the next service too and the first of
+    the two to answer wins. If a call fails, it is sent to the next service. The calls that lost the race are not
+    cancelled (services can't be interrupted), their latency is still recorded when they complete. Hedging only starts
+    once :py:attr:`min_samples` latencies were measured, so that a few slow calls at the start don't hedge everything.
+
+    The limits of the composite service are the strictest ones of its services so that any of them accepts the planned
+    calls.
+    """
+
+    DEFAULT_HEDGE_PERCENTILE: float = 95.0
+    DEFAULT_MIN_SAMPLES: int = 10
+    DEFAULT_LATENCY_WINDOW: int = 100
+
+    def __init__(
+        self,
+        services: Sequence[TranslationService],
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        latency_window: int = DEFAULT_LATENCY_WINDOW,
+    ) -> None:
+        """Creates a composite service.
+
+        Args:
+            services: The services to use, by order of preference
+            hedge_percentile: The percentile of the latencies of a service past which a call is hedged to the next
+                service, 100 to never hedge
+            min_samples: How many latencies of a service have to be measured before hedging its calls
+            latency_window: How many of the last latencies of each service are kept to compute the percentile
+
+        Raises:
+            ValueError: If no service is given or the percentile isn't between 0 and 100
+
+        """
+        if not services:
+            raise ValueError("A composite service needs at least one service")
+        if not 0 < hedge_percentile <= 100:
+            raise ValueError("The hedge percentile must be between 0 and 100")
+        self.services: List[TranslationService] = list(services)
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.name = " > ".join(service.name for service in self.services)
+        self.languages = self.services[0].languages
+        self.rate_limit = self.services[0].rate_limit
+        self.call_latency = self.services[0].call_latency
+        self.array_support = all(
+            service.array_support for service in self.services
+        )
+        for limit in (
+            "char_limit",
+            "array_item_limit",
+            "array_item_char_limit",
+            "array_overall_char_limit",
+        ):
+            limits = [getattr(service, limit) for service in self.services]
+            setattr(self, limit, min(filter(None, limits), default=0))
+        self._latencies: Dict[int, Deque[float]] = {
+            index: deque(maxlen=latency_window)
+            for index in range(len(self.services))
+        }
+        """The last latencies of each service by position"""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(
+            max_workers=4 * len(self.services),
+            thread_name_prefix="translatex-composite",
+        )
+        self.stats: Dict[str, int] = dict.fromkeys(
+            ("calls", "hedged", "failed_over"), 0
+        )
+        """Counters of the calls made, the ones hedged to a backup service and the ones failed over after an error."""
+
+    def array_length(self, text: str) -> int:  # type: ignore[override]
+        """The largest length of a string for the services, so that a call fits the limits of any of them."""
+        return max(service.array_length(text) for service in self.services)
+
+    def __enter__(self) -> "CompositeService":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops accepting calls. Calls that lost a race are left to complete in the background."""
+        self._executor.shutdown(wait=False)
+
+    def hedge_delay(self, index: int) -> Optional[float]:
+        """Gives how long a call to the service at the given position is waited for before being hedged.
+
+        Returns:
+            The percentile of the latencies of the service, or ``None`` if too few of them were measured yet or if
+            there's no service to hedge to
+
+        """
+        if index + 1 >= len(self.services):
+            return None
+        with self._lock:
+            latencies = sorted(self._latencies[index])
+        if len(latencies) < max(self.min_samples, 1):
+            return None
+        rank = math.ceil(self.hedge_percentile / 100 * len(latencies))
+        return latencies[max(rank, 1) - 1]
+
+    def _call(
+        self, index: int, texts: List[str], source_lang: str, dest_lang: str
+    ) -> List[str]:
+        """Sends a call to the service at the given position and records its latency if it succeeds."""
+        service = self.services[index]
+        start = time.perf_counter()
+        if len(texts) == 1:
+            translations = [
+                service.translate(texts[0], source_lang, dest_lang)
+            ]
+        else:
+            translations = service.translate_array(
+                texts, source_lang, dest_lang
+            )
+        with self._lock:
+            self._latencies[index].append(time.perf_counter() - start)
+        return translations
+
+    def translate(self, text: str, source_lang: str, dest_lang: str) -> str:
+        return self.translate_array([text], source_lang, dest_lang)[0]
+
+    def translate_array(
+        self, texts: List[str], source_lang: str, dest_lang: str
+    ) -> List[str]:
+        """
+        Return the translations of an array of strings from the first
+        service to answer, hedging and failing over as needed.
+
+        Raises:
+            TranslationServiceError: If every service failed
+        """
+        pending: Dict[Future, int] = dict()
+        launched = 0
+        last_error: Optional[BaseException] = None
+        with self._lock:
+            self.stats["calls"] += 1
+        while launched < len(self.services) or pending:
+            if not pending:
+                if launched:
+                    log.warning(
+                        "Failing over to %s", self.services[launched].name
+                    )
+                    with self._lock:
+                        self.stats["failed_over"] += 1
+                pending[
+                    self._executor.submit(
+                        self._call, launched, texts, source_lang, dest_lang
+                    )
+                ] = launched
+                launched += 1
+            done, _ = wait(
+                pending,
+                timeout=self.hedge_delay(launched - 1),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                log.info(
+                    "%s is slow, hedging the call to %s",
+                    self.services[launched - 1].name,
+                    self.services[launched].name,
+                )
+                with self._lock:
+                    self.stats["hedged"] += 1
+                pending[
+                    self._executor.submit(
+                        self._call, launched, texts, source_lang, dest_lang
+                    )
+                ] = launched
+                launched += 1
+                continue
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    translations = future.result()
+                except Exception as exc:
+                    log.warning(
+                        "%s failed: %s", self.services[index].name, exc
+                    )
+                    last_error = exc
+                    continue
+                self._local.answering_service = self.services[index].name
+                return translations
+        raise TranslationServiceError(
+            f"Every service failed: {self.name}"
+        ) from last_error
+
+    def answering_service(self) -> str:
+        return getattr(self._local, "answering_service", self.name)
@@ -0,0 +1,196 @@
+"""Tables of the LaTeX constructs that get special treatment, extensible by users from a TOML or JSON file.
+
+The defaults are the lists of the :py:mod:`~translatex.data` module. A :py:class:`ConstructTables` turns them into
+frozensets once, so that the marking stage tests the name of every node of the parse tree against them in constant
+time, and joins the completely removed commands into a single pattern, so that the tokenization stage removes all of
+them in one sweep instead of one per command.
+
+Users add names to the tables, or remove some, without editing the package, with a file holding a table of the same
+name for each one to change, as a list of names to add or with ``add`` and ``remove`` lists:
+
+.. code-block:: toml
+
+    math_envs = ["align", "align*", "gather"]
+
+    [completely_removed_commands]
+    add = ["eqref", "autoref"]
+    remove = ["url"]
+
+or the same in JSON, ``{"math_envs": ["align", "align*", "gather"], "completely_removed_commands": {"add": ...}}``.
+The file is merged with the defaults by :py:meth:`ConstructTables.load`. Reading TOML needs Python 3.11 or the
+``tomli`` package.
+"""
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, Union
+
+import regex as re
+
+from .data import (
+    COMPLETELY_REMOVED_COMMANDS,
+    COMPLETELY_REMOVED_ENVS,
+    MATH_ENVS,
+    SPECIAL_COMMANDS,
+    TEXT_COMMANDS,
+)
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    try:
+        import tomli as tomllib
+    except ImportError:  # pragma: no cover
+        tomllib = None
+
+log = logging.getLogger("translatex.constructs")
+
+
+class ConstructTables:
+    """The names of the LaTeX environments and commands each stage handles apart, as frozensets and patterns.
+
+    Attributes:
+        math_envs: The math environments, see :py:data:`~translatex.data.MATH_ENVS`.
+        completely_removed_envs: The environments marked as a whole, see
+            :py:data:`~translatex.data.COMPLETELY_REMOVED_ENVS`.
+        text_commands: The commands holding text inside math, see :py:data:`~translatex.data.TEXT_COMMANDS`.
+        special_commands: The commands left to regexes, see :py:data:`~translatex.data.SPECIAL_COMMANDS`.
+        completely_removed_commands: The commands tokenized with their arguments, see
+            :py:data:`~translatex.data.COMPLETELY_REMOVED_COMMANDS`.
+        skipped_commands: The commands left unmarked, the special and completely removed ones, see
+            :py:data:`~translatex.data.SKIPPED_COMMANDS`.
+        removed_commands_regex: A regex matching a backslash followed by the name of any completely removed command,
+            the longest names first, that never matches if there are none.
+        removed_commands_anchor: The same regex, compiled.
+
+    """
+
+    TABLES = (
+        "math_envs",
+        "completely_removed_envs",
+        "text_commands",
+        "special_commands",
+        "completely_removed_commands",
+    )
+    """The tables that can be changed, the skipped commands being made of two of them"""
+
+    def __init__(
+        self,
+        math_envs: Iterable[str] = MATH_ENVS,
+        completely_removed_envs: Iterable[str] = COMPLETELY_REMOVED_ENVS,
+        text_commands: Iterable[str] = TEXT_COMMANDS,
+        special_commands: Iterable[str] = SPECIAL_COMMANDS,
+        completely_removed_commands: Iterable[
+            str
+        ] = COMPLETELY_REMOVED_COMMANDS,
+    ) -> None:
+        """Creates tables, with the defaults of the :py:mod:`~translatex.data` module for the ones not given."""
+        self.math_envs: FrozenSet[str] = frozenset(math_envs)
+        self.completely_removed_envs: FrozenSet[str] = frozenset(
+            completely_removed_envs
+        )
+        self.text_commands: FrozenSet[str] = frozenset(text_commands)
+        self.special_commands: FrozenSet[str] = frozenset(special_commands)
+        self.completely_removed_commands: FrozenSet[str] = frozenset(
+            completely_removed_commands
+        )
+        self.skipped_commands: FrozenSet[str] = (
+            self.special_commands | self.completely_removed_commands
+        )
+        names = sorted(
+            self.completely_removed_commands,
+            key=lambda name: (-len(name), name),
+        )
+        self.removed_commands_regex: str = (
+            r"\\(?:" + "|".join(map(re.escape, names)) + ")"
+            if names
+            else "(?!)"
+        )
+        self.removed_commands_anchor = re.compile(self.removed_commands_regex)
+
+    def __str__(self) -> str:
+        return "The construct tables hold " + ", ".join(
+            f"{len(getattr(self, table))} {table.replace('_', ' ')}"
+            for table in ConstructTables.TABLES
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ConstructTables) and all(
+            getattr(self, table) == getattr(other, table)
+            for table in ConstructTables.TABLES
+        )
+
+    def merged(self, changes: Dict[str, Any]) -> "ConstructTables":
+        """Gives new tables with names added to or removed from these ones.
+
+        Args:
+            changes: For each table to change, the list of the names to add, or a dictionary with lists of names to
+                ``add`` and to ``remove``
+
+        Raises:
+            ValueError: If a table is unknown or its changes aren't lists of names
+
+        """
+        tables = {
+            table: set(getattr(self, table))
+            for table in ConstructTables.TABLES
+        }
+        for table, change in changes.items():
+            if table not in tables:
+                raise ValueError(
+                    f"Unknown construct table {table}, choose one of: {', '.join(ConstructTables.TABLES)}"
+                )
+            if not isinstance(change, dict):
+                change = {"add": change}
+            if set(change).difference(("add", "remove")):
+                raise ValueError(
+                    f"The changes of the construct table {table} can only be add and remove"
+                )
+            for operation, names in change.items():
+                if not isinstance(names, list) or not all(
+                    isinstance(name, str) and name for name in names
+                ):
+                    raise ValueError(
+                        f"The names to {operation} in the construct table {table} must be a list of strings"
+                    )
+                if operation == "add":
+                    tables[table].update(names)
+                else:
+                    tables[table].difference_update(names)
+        return ConstructTables(**tables)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ConstructTables":
+        """Reads the changes to the default tables from a TOML or JSON file, by its extension, and merges them.
+
+        Raises:
+            ValueError: If the file can't be read as TOML or JSON, or its changes are invalid (see :py:meth:`merged`)
+
+        """
+        path = Path(path)
+        try:
+            if path.suffix == ".toml":
+                if tomllib is None:
+                    raise ValueError(
+                        "Reading TOML needs Python 3.11 or the tomli package"
+                    )
+                changes = tomllib.loads(path.read_text())
+            else:
+                changes = json.loads(path.read_text())
+        except (
+            json.JSONDecodeError,
+            getattr(tomllib, "TOMLDecodeError", json.JSONDecodeError),
+        ) as e:
+            raise ValueError(
+                f"{path} is not a valid constructs file: {e}"
+            ) from e
+        if not isinstance(changes, dict):
+            raise ValueError(f"{path} is not a valid constructs file")
+        tables = DEFAULT_TABLES.merged(changes)
+        log.info("Construct tables loaded from %s: %s", path, tables)
+        return tables
+
+
+DEFAULT_TABLES: ConstructTables = ConstructTables()
+"""The tables made of the lists of the :py:mod:`~translatex.data` module"""
@@ -87,3 +87,12 @@ These commands are left unmarked so that later passes that use regex can handle
 that never contain text to be translated, but some are also highly complicated or conditional so they require more
 intricate regex treatment.
 """
+
+TOLERANT_TOKEN_OPENERS: str = "[({<（［｛【〔〈《«"
+"""Opening brackets that automatic translators may put in place of the opening bracket of a token."""
+
+TOLERANT_TOKEN_CLOSERS: str = "])}>）］｝】〕〉》»"
+"""Closing brackets that automatic translators may put in place of the closing bracket of a token."""
+
+TOLERANT_TOKEN_DASHES: str = "-‐‑‒–—―−－_~"
+"""Dashes and hyphens that automatic translators may put in place of the dash of a token."""
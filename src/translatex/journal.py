@@ -0,0 +1,166 @@
+"""A crash-safe journal of translated chunks so that an interrupted translation can be resumed.
+
+Translation is the only stage of TransLaTeX that takes time and costs money. Every chunk translated is appended to the
+journal file as soon as it is received, as a line of JSON keyed by the position of the chunk and a hash of its contents
+and languages. If the program dies along the way, a new run resuming from the journal only requests the chunks that are
+missing from it.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+log = logging.getLogger("translatex.journal")
+
+
+class TranslationJournal:
+    """Append-only journal of the translated chunks of a document, stored as JSON lines.
+
+    Each line records the index of a chunk, the hash of the chunk with the languages it was translated between (see
+    :py:meth:`chunk_hash`) and its translation. A chunk is only replayed if both its index and its hash match, so a
+    journal left by another version of the document or by another pair of languages is harmless. Lines are flushed to
+    the disk one by one so that at most the line being written is lost in a crash; such a torn last line is dropped
+    when the journal is resumed.
+
+    The journal can be used as a context manager to close the file at the end.
+    """
+
+    DEFAULT_FILE_EXT: str = ".jsonl"
+
+    def __init__(self, path: Union[str, Path], resume: bool = False) -> None:
+        """Opens a journal for writing.
+
+        Args:
+            path: The file of the journal
+            resume: Replay the entries of an existing journal file and append to it instead of starting over
+
+        """
+        self._path: Path = Path(path)
+        self._entries: Dict[Tuple[int, str], str] = dict()
+        """The translations recorded so far by chunk index and hash"""
+        self._services: Dict[Tuple[int, str], str] = dict()
+        """The name of the service that gave each recorded translation, if known"""
+        if resume and self._path.exists():
+            self._replay()
+            mode = "a"
+        else:
+            if self._path.exists() and self._path.stat().st_size:
+                log.warning(
+                    "Overwriting the existing journal %s instead of resuming from it",
+                    self._path,
+                )
+            mode = "w"
+        self._file = open(self._path, mode, encoding="utf-8")
+
+    def __str__(self) -> str:
+        return f"The journal {self._path} holds {len(self._entries)} translated chunks."
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> "TranslationJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def path(self) -> Path:
+        """The file of the journal."""
+        return self._path
+
+    @staticmethod
+    def chunk_hash(chunk: str, source_lang: str, destination_lang: str) -> str:
+        """Gives the hash a chunk is recorded under for the given languages."""
+        return hashlib.sha256(
+            "\0".join((source_lang, destination_lang, chunk)).encode()
+        ).hexdigest()
+
+    def _replay(self) -> None:
+        """Loads the entries of the journal file, dropping a torn last line."""
+        with open(self._path, "r+", encoding="utf-8") as f:
+            valid_end = 0
+            for line in iter(f.readline, ""):
+                try:
+                    entry = json.loads(line)
+                    key = (entry["index"], entry["hash"])
+                    translation = entry["translation"]
+                except (ValueError, KeyError, TypeError):
+                    log.warning(
+                        "Dropping a torn or invalid line from the journal %s",
+                        self._path,
+                    )
+                    break
+                if not line.endswith("\n"):
+                    log.warning(
+                        "Dropping a torn line from the journal %s", self._path
+                    )
+                    break
+                self._entries[key] = translation
+                self._services[key] = entry.get("service", str())
+                valid_end = f.tell()
+            f.truncate(valid_end)
+        log.info(
+            "Replayed %d translated chunks from the journal %s",
+            len(self._entries),
+            self._path,
+        )
+
+    def lookup(
+        self, index: int, chunk: str, source_lang: str, destination_lang: str
+    ) -> Optional[str]:
+        """Gives the recorded translation of a chunk, or ``None`` if it isn't in the journal."""
+        chunk_hash = TranslationJournal.chunk_hash(
+            chunk, source_lang, destination_lang
+        )
+        return self._entries.get((index, chunk_hash))
+
+    def lookup_service(
+        self, index: int, chunk: str, source_lang: str, destination_lang: str
+    ) -> str:
+        """Gives the name of the service that gave the recorded translation of a chunk, empty if unknown."""
+        chunk_hash = TranslationJournal.chunk_hash(
+            chunk, source_lang, destination_lang
+        )
+        return self._services.get((index, chunk_hash), str())
+
+    def record(
+        self,
+        index: int,
+        chunk: str,
+        source_lang: str,
+        destination_lang: str,
+        translation: str,
+        service: str = str(),
+    ) -> None:
+        """Appends the translation of a chunk to the journal and makes sure it reached the disk.
+
+        The name of the service that gave the translation is recorded along, for traceability.
+        """
+        chunk_hash = TranslationJournal.chunk_hash(
+            chunk, source_lang, destination_lang
+        )
+        self._entries[(index, chunk_hash)] = translation
+        self._services[(index, chunk_hash)] = service
+        entry = {
+            "index": index,
+            "hash": chunk_hash,
+            "translation": translation,
+        }
+        if service:
+            entry["service"] = service
+        line = json.dumps(entry, ensure_ascii=False)
+        self._file.write(line + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Closes the journal file. Its contents are kept."""
+        self._file.close()
+
+    def remove(self) -> None:
+        """Closes and deletes the journal file, once the translation it records is complete."""
+        self.close()
+        self._path.unlink(missing_ok=True)
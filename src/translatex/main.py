@@ -7,119 +7,470 @@ keeping it error free and compilable at the end, resulting in the same looking f
 """
 
 import argparse
+import hashlib
 import logging
+import os
 import sys
+import time
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO, Union
 
-from . import __version__
+from . import __version__, server
+from .checkpoint import Checkpoint
+from .composite import CompositeService
+from .constructs import DEFAULT_TABLES, ConstructTables
+from .journal import TranslationJournal
 from .marker import Marker
-from .preprocessor import Preprocessor
+from .metrics import Metrics
+from .pipeline import Pipeline
+from .progress import JsonLinesWriter, ProgressBar
 from .tokenizer import Tokenizer
 from .translator import (
     TRANSLATION_SERVICE_CLASSES,
     ApiKeyError,
+    DeepL,
+    TranslationCache,
+    TranslationService,
+    TranslationServiceError,
     Translator,
     add_custom_translation_services,
 )
 
 DEFAULT_INTER_FILE_PRE: str = "_"
 DEFAULT_INTER_FILE_EXT: str = ".txt"
+DEFAULT_WATCH_INTERVAL: float = 0.2
 
 log = logging.getLogger("translatex.main")
 
 
 def translatex(args: argparse.Namespace) -> None:
-    """Run the TransLaTeX pipeline on a LaTeX source file."""
+    """Run the TransLaTeX pipeline on a LaTeX source file.
+
+    This is a thin wrapper around :py:class:`~translatex.pipeline.Pipeline` that reads and writes the files given on
+    the command line and saves the intermediary results of the stages with the debug option.
+    """
     if args.custom_api:
         add_custom_translation_services(args.custom_api)
-    if args.service not in TRANSLATION_SERVICE_CLASSES:
+    if not set([args.service] + args.backup_service).issubset(
+        TRANSLATION_SERVICE_CLASSES
+    ):
         log.error(
             "The given service is not available. "
             "Please choose one of the following: %s",
             ", ".join(TRANSLATION_SERVICE_CLASSES.keys()),
         )
         sys.exit(1)
+    if args.watch and (args.infile == sys.stdin or args.outfile == sys.stdout):
+        log.error("Watch mode needs an input and an output file")
+        sys.exit(1)
+    if args.resume_from and (args.watch or not args.checkpoint):
+        log.error(
+            "Resuming from a stage needs the checkpoint it was saved to and "
+            "can't be watched"
+        )
+        sys.exit(1)
+    try:
+        tables = (
+            ConstructTables.load(args.constructs)
+            if args.constructs
+            else DEFAULT_TABLES
+        )
+    except (OSError, ValueError) as e:
+        log.error(e)
+        sys.exit(1)
     base_file: str = DEFAULT_INTER_FILE_PRE + Path(args.infile.name).stem
-    p = Preprocessor(args.infile.read())
+    latex = args.infile.read()
     args.infile.close()
-    p.process()
-    log.info("---- Preprocessor info ---- %s", p)
-    if args.stop == "Preprocessor":
-        args.outfile.write(p.processed_latex)
-        sys.exit()
-    if args.debug:
-        with open(f"{base_file}_processed{DEFAULT_INTER_FILE_EXT}", "w") as f:
-            f.write(p.processed_latex)
-        with open(
-            f"{base_file}_indicator_store{DEFAULT_INTER_FILE_EXT}", "w"
-        ) as f:
-            f.write(p.dump_store())
-    m = Marker.from_preprocessor(p)
-    if args.marker_format:
-        m.marker_format = args.marker_format
-    m.mark()
-    log.info("---- Marker info ---- %s", m)
-    if args.stop == "Marker":
-        args.outfile.write(m.marked_latex)
-        sys.exit()
+    stop = "Tokenizer" if args.estimate else args.stop
+    translating = (
+        stop in (None, "Translator")
+        and not args.dry_run
+        and args.resume_from != "Translator"
+    )
+    service = create_service(args) if translating else args.service
+    pipeline = Pipeline(
+        service=service,
+        source_lang=args.src_lang,
+        dest_langs=args.dest_lang,
+        marker_format=args.marker_format or Marker.DEFAULT_MARKER_FORMAT,
+        token_format=args.token_format or Tokenizer.DEFAULT_TOKEN_FORMAT,
+        tokenizer_engine=args.tokenizer_engine,
+        deduplicate=args.deduplicate,
+        substitution=args.no_pre,
+        stop=stop,
+        dry_run=args.dry_run,
+        journal=args.journal or default_journal(args, base_file, latex),
+        resume=args.resume,
+        keep_journal=args.debug,
+        low_memory=args.low_memory,
+        shard_workers=args.shard_workers,
+        tables=tables,
+        cache=(
+            TranslationCache(
+                args.token_format or Tokenizer.DEFAULT_TOKEN_FORMAT
+            )
+            if args.watch
+            else None
+        ),
+    )
+    try:
+        run_and_write(pipeline, args, latex, base_file)
+    finally:
+        pipeline.close()
+        if isinstance(service, CompositeService):
+            service.close()
+
+
+def run_and_write(
+    pipeline: Pipeline, args: argparse.Namespace, latex: str, base_file: str
+) -> None:
+    """Run the pipeline on the LaTeX, or resume it from a checkpoint, and write the outputs, then watch the input file
+    if asked to.
+
+    A run whose translation service fails is reported in a single line pointing to the journal, exiting with an error.
+    """
+    stop = pipeline.stop
     if args.debug:
-        with open(f"{base_file}_marked{DEFAULT_INTER_FILE_EXT}", "w") as f:
-            f.write(m.marked_latex)
-        with open(
-            f"{base_file}_marker_store{DEFAULT_INTER_FILE_EXT}", "w"
-        ) as f:
-            f.write(m.dump_store())
-    t = Tokenizer.from_marker(m)
-    if args.token_format:
-        t.token_format = args.token_format
-    t.tokenize()
-    log.info("---- Tokenizer info ---- %s", t)
-    if args.stop == "Tokenizer":
-        args.outfile.write(t.tokenized_string)
+        add_debug_hooks(pipeline, base_file)
+    end_run = add_reporters(pipeline, args)
+    outfiles = (
+        open_outfiles(args)
+        if stop in (None, "Translator")
+        else {args.dest_lang[0]: args.outfile}
+    )
+    checkpoint_path = args.checkpoint or (
+        f"{base_file}_checkpoint{Checkpoint.DEFAULT_FILE_EXT}"
+        if args.debug
+        else None
+    )
+    try:
+        if args.resume_from:
+            try:
+                result = pipeline.resume_from(
+                    Checkpoint.load(args.checkpoint), args.resume_from, latex
+                )
+            except ValueError as e:
+                log.error(e)
+                sys.exit(1)
+        elif checkpoint_path:
+            checkpoint = Checkpoint()
+            checkpoint.add_hooks(pipeline)
+            result = pipeline.run(latex)
+            checkpoint.save(checkpoint_path)
+        else:
+            result = pipeline.run(latex)
+    except TranslationServiceError as e:
+        log.error(
+            "Translation failed: %s. The translated chunks are kept in the journal, run the same command again with "
+            "--resume to only translate the missing ones",
+            e,
+        )
+        sys.exit(1)
+    finally:
+        end_run()
+    if args.estimate:
+        estimate(args, pipeline.translator(result.tokenizer))
         sys.exit()
-    if args.debug:
-        with open(f"{base_file}_tokenized{DEFAULT_INTER_FILE_EXT}", "w") as f:
-            f.write(t.tokenized_string)
+    if args.dry_run and stop is None:
+        planned_calls = result.translators[args.dest_lang[0]].plan(
+            TRANSLATION_SERVICE_CLASSES[args.service]
+        )
+        print(
+            f"{len(planned_calls)} API call(s) planned with {args.service}",
+            file=sys.stderr,
+        )
+    for dest_lang, outfile in outfiles.items():
+        outfile.write(result.outputs[dest_lang])
+        if stop is None and outfile != sys.stdout:
+            log.info("Translated LaTeX file written to %s", outfile.name)
+        outfile.close()
+    if args.watch:
+        watch(
+            pipeline,
+            Path(args.infile.name),
+            {
+                dest_lang: Path(outfile.name)
+                for dest_lang, outfile in outfiles.items()
+            },
+            latex,
+            end_run,
+        )
+
+
+def watch(
+    pipeline: Pipeline,
+    infile: Path,
+    outfiles: Dict[str, Path],
+    latex: str,
+    end_run: Optional[Callable[[], None]] = None,
+) -> None:
+    """Translate the input file again every time it is saved, until interrupted.
+
+    The file is polled every :py:data:`DEFAULT_WATCH_INTERVAL` seconds. Runs of the pipeline reuse the translations of
+    the chunks that didn't change from its cache (see :py:class:`~translatex.translator.TranslationCache`), so that
+    editing a sentence only sends its paragraph to the translation service. A run that fails is reported and the
+    previous outputs are kept.
+
+    Args:
+        pipeline: The pipeline that made the first run, with a cache
+        infile: The LaTeX file to watch
+        outfiles: The output file of each destination language
+        latex: The contents of the input file the outputs were made from
+        end_run: Called after every run, failed or not, e.g. to end the progress bar and write the metrics
+
+    """
+    print(
+        f"Watching {infile} for changes, press Ctrl+C to stop", file=sys.stderr
+    )
+    mtime = infile.stat().st_mtime_ns
+    try:
+        while True:
+            time.sleep(DEFAULT_WATCH_INTERVAL)
+            try:
+                if infile.stat().st_mtime_ns == mtime:
+                    continue
+                mtime = infile.stat().st_mtime_ns
+                edited = infile.read_text()
+            except FileNotFoundError:
+                # Editors saving by replacing the file remove it for a moment
+                continue
+            if edited == latex:
+                continue
+            latex = edited
+            start = time.perf_counter()
+            misses = pipeline.cache.stats["misses"]
+            try:
+                result = pipeline.run(latex)
+            except Exception as e:
+                log.error("Translating %s again failed: %s", infile, e)
+                continue
+            finally:
+                if end_run is not None:
+                    end_run()
+            for dest_lang, path in outfiles.items():
+                path.write_text(result.outputs[dest_lang])
+            print(
+                f"{infile} translated again in "
+                f"{time.perf_counter() - start:.2f}s, "
+                f"{pipeline.cache.stats['misses'] - misses} chunk(s) sent",
+                file=sys.stderr,
+            )
+    except KeyboardInterrupt:
+        pass
+
+
+def add_reporters(
+    pipeline: Pipeline, args: argparse.Namespace
+) -> Callable[[], None]:
+    """Follow the runs of the pipeline with the progress bar, progress log and metrics asked for.
+
+    Returns:
+        What to call at the end of every run: ends the line of the progress bar and writes the metrics files
+
+    """
+    progress_bar = ProgressBar(pipeline.progress) if args.progress else None
+    if args.progress_log:
+        pipeline.progress.subscribe(JsonLinesWriter(args.progress_log))
+    metrics = None
+    if args.metrics or args.metrics_json:
+        metrics = Metrics()
+        metrics.add_hooks(pipeline)
+
+    def end_run() -> None:
+        if progress_bar is not None:
+            progress_bar.close()
+        if metrics is not None:
+            metrics.write(args.metrics, args.metrics_json)
+
+    return end_run
+
+
+def add_debug_hooks(pipeline: Pipeline, base_file: str) -> None:
+    """Save the intermediary results of every stage and the stores that go with them to files."""
+
+    def save(name: str, contents: str, dest_lang: Optional[str]) -> None:
+        suffix = (
+            f"_{dest_lang}"
+            if dest_lang and len(pipeline.dest_langs) > 1
+            else ""
+        )
         with open(
-            f"{base_file}_token_store{DEFAULT_INTER_FILE_EXT}", "w"
+            f"{base_file}_{name}{suffix}{DEFAULT_INTER_FILE_EXT}", "w"
         ) as f:
-            f.write(t.dump_store())
-    a = Translator.from_tokenizer(t)
-    if not args.dry_run:
+            f.write(contents)
+
+    def save_translation(a: Translator, dest_lang: str) -> None:
+        if pipeline.dry_run:
+            return
+        save("translated", a.translated_string, dest_lang)
+        save(
+            "chunk_services",
+            "".join(
+                f"{index}\t{name}\n"
+                for index, name in enumerate(a.chunk_services)
+            ),
+            dest_lang,
+        )
+
+    pipeline.add_hook(
+        "Preprocessor",
+        lambda p, dest_lang: (
+            save("processed", p.processed_latex, dest_lang),
+            save("indicator_store", p.dump_store(), dest_lang),
+        ),
+    )
+    pipeline.add_hook(
+        "Marker",
+        lambda m, dest_lang: (
+            save("marked", m.marked_latex, dest_lang),
+            save("marker_store", m.dump_store(), dest_lang),
+        ),
+    )
+    pipeline.add_hook(
+        "Tokenizer",
+        lambda t, dest_lang: (
+            save("tokenized", t.tokenized_string, dest_lang),
+            save("token_store", t.dump_store(), dest_lang),
+        ),
+    )
+    pipeline.add_hook("Translator", save_translation)
+
+
+class OutputFile:
+    """An output file given on the command line, only opened (so created, or emptied if it exists) on its first write.
+
+    Unlike with :py:class:`argparse.FileType`, a file that ends up not being written, like the output file given with
+    several destination languages (see :py:func:`open_outfiles`) or the one of a failed translation, is left untouched.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Checks that the file can be written, as an argument type.
+
+        Raises:
+            argparse.ArgumentTypeError: If the file, or the directory it would be created in, isn't writable
+
+        """
+        path = Path(name)
+        writable = path if path.exists() else path.resolve().parent
+        if not os.access(writable, os.W_OK):
+            raise argparse.ArgumentTypeError(
+                f"can't open '{name}': {writable} isn't writable"
+            )
+        self.name = name
+        self._file: Optional[TextIO] = None
+
+    def write(self, text: str) -> int:
+        if self._file is None:
+            self._file = open(self.name, "w")
+        return self._file.write(text)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def output_file(name: str) -> Union[TextIO, OutputFile]:
+    """The type of the output file argument: the standard output for ``-``, an :py:class:`OutputFile` otherwise."""
+    if name == "-":
+        return sys.stdout
+    return OutputFile(name)
+
+
+def open_outfiles(args: argparse.Namespace) -> Dict[str, TextIO]:
+    """Give the output file of each destination language.
+
+    With several destination languages, the language code is added to the name of the given output file for each of
+    them, e.g. ``out.fr.tex`` and ``out.de.tex`` for ``out.tex``. The given output file itself is left untouched.
+    """
+    if len(args.dest_lang) == 1:
+        return {args.dest_lang[0]: args.outfile}
+    if args.outfile == sys.stdout:
+        log.error("Translating to several languages needs an output file")
+        sys.exit(1)
+    path = Path(args.outfile.name)
+    return {
+        dest_lang: open(
+            path.with_name(f"{path.stem}.{dest_lang}{path.suffix}"), "w"
+        )
+        for dest_lang in args.dest_lang
+    }
+
+
+def create_service(args: argparse.Namespace) -> TranslationService:
+    """Create the chosen translation service, exiting with an error message if it isn't usable.
+
+    With backup services, a :py:class:`~translatex.composite.CompositeService` hedging and failing over from the chosen
+    service to the backups in order is created instead.
+    """
+    services = list()
+    for name in [args.service] + args.backup_service:
         try:
-            service = TRANSLATION_SERVICE_CLASSES[args.service]()
+            services.append(TRANSLATION_SERVICE_CLASSES[name]())
         except ApiKeyError as e:
             log.error(e.message)
             sys.exit(1)
         except ModuleNotFoundError as e:
             log.error(e.msg)
             sys.exit(1)
-        a.translate(
-            service=service,
-            source_lang=args.src_lang,
-            destination_lang=args.dest_lang,
+    if args.glossary:
+        glossary = DeepL.load_glossary(args.glossary)
+        for service in services:
+            if isinstance(service, DeepL):
+                service.glossary = glossary
+            else:
+                log.warning(
+                    "%s doesn't support glossaries, ignoring %s",
+                    service.name,
+                    args.glossary,
+                )
+    if len(services) == 1:
+        return services[0]
+    return CompositeService(services)
+
+
+def estimate(args: argparse.Namespace, a: Translator) -> None:
+    """Write to the output what translating with each available service would cost, without making any API call.
+
+    The chosen service comes first. Services whose quota would be exceeded are flagged.
+    """
+    services = [TRANSLATION_SERVICE_CLASSES[args.service]] + [
+        service
+        for name, service in TRANSLATION_SERVICE_CLASSES.items()
+        if name != args.service
+    ]
+    args.outfile.write(
+        f"{'Service':<32} {'Characters':>12} {'Requests':>9} {'Time':>10}\n"
+    )
+    for service in services:
+        e = a.estimate(service)
+        over_limit = "  over the quota" if e["over_limit"] else ""
+        args.outfile.write(
+            f"{e['service']:<32} {e['characters']:>12} {e['requests']:>9} "
+            f"{e['seconds']:>9.1f}s{over_limit}\n"
         )
-        if args.stop == "Translator":
-            args.outfile.write(a.translated_string)
-            sys.exit()
-        if args.debug:
-            with open(
-                f"{base_file}_translated{DEFAULT_INTER_FILE_EXT}", "w"
-            ) as f:
-                f.write(a.translated_string)
-        t.update_from_translator(a)
-    else:
-        t.tokenized_string = a.tokenized_string
-    log.info("---- Translator info ---- %s", a)
-    t.detokenize()
-    m.update_from_tokenizer(t)
-    m.unmark()
-    p.update_from_marker(m)
-    p.rebuild(args.no_pre)
-    args.outfile.write(p.unprocessed_latex)
-    if args.outfile != sys.stdout:
-        log.info("Translated LaTeX file written to %s", args.outfile.name)
-    args.outfile.close()
+    args.outfile.flush()
+
+
+def default_journal(
+    args: argparse.Namespace, base_file: str, latex: str
+) -> str:
+    """Gives the journal file of the input, named after the file, or after a hash of the LaTeX when reading ``stdin``
+    so that unrelated runs never share a journal."""
+    if args.infile is sys.stdin or args.infile.name == "<stdin>":
+        base_file += "_" + hashlib.sha256(latex.encode()).hexdigest()[:16]
+    return f"{base_file}_journal{TranslationJournal.DEFAULT_FILE_EXT}"
+
+
+def language_list(languages: str) -> List[str]:
+    """Split a comma separated list of language codes, dropping duplicates."""
+    codes = [code.strip() for code in languages.split(",") if code.strip()]
+    if not codes:
+        raise argparse.ArgumentTypeError("no language given")
+    return list(dict.fromkeys(codes))
 
 
 def parse_args(args) -> argparse.Namespace:
@@ -153,12 +504,32 @@ def parse_args(args) -> argparse.Namespace:
         action="store_true",
         help="Don't translate (no API call), just run the chain of operations",
     )
+    mutually_exclusive_group.add_argument(
+        "-e",
+        "--estimate",
+        action="store_true",
+        help="Don't translate (no API call), write the characters, requests and time translating would take with each "
+        "service instead",
+    )
     mutually_exclusive_group.add_argument(
         "-s",
         "--stop",
         choices=["Preprocessor", "Marker", "Tokenizer", "Translator"],
         help="Stop at the end of the specified stage and write its result to output",
     )
+    mutually_exclusive_group.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="Keep running and translate the input file again every time it is saved, only sending the paragraphs "
+        "that changed",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        dest="deduplicate",
+        action="store_false",
+        help="Send every chunk to the translation service, even the ones repeating an earlier chunk",
+    )
     parser.add_argument(
         "--no-pre",
         action="store_false",
@@ -176,6 +547,81 @@ def parse_args(args) -> argparse.Namespace:
         default=Tokenizer.DEFAULT_TOKEN_FORMAT,
         help="Token format to use during tokenization stage (default: %(default)s)",
     )
+    parser.add_argument(
+        "-te",
+        "--tokenizer-engine",
+        choices=Tokenizer.ENGINES,
+        default=Tokenizer.DEFAULT_ENGINE,
+        help="Engine to use during tokenization stage (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--journal",
+        help="File to record the translated chunks to as they come "
+        "(default: _<input file name>_journal.jsonl, with a hash of the input when reading stdin)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted translation from its journal, only translating the missing chunks",
+    )
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Drop the copies of the document each stage keeps as soon as the next stage took over and parse the "
+        "document in shards one after the other, for very large documents",
+    )
+    parser.add_argument(
+        "--shard-workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Split the document at its sections and mark the shards in N worker processes, 0 for one per CPU "
+        "(default: %(default)s, no split)",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Draw the stage running and a progress bar of the translation with its estimated time left on stderr",
+    )
+    parser.add_argument(
+        "--progress-log",
+        type=argparse.FileType("w"),
+        help="File to write the progress events to as they happen, one JSON object per line",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        help="File to write the metrics of the run to in the Prometheus text format, e.g. for the textfile collector "
+        "of the node exporter: API calls and their latency, characters, cache hits, missing tokens, stage durations",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        type=Path,
+        help="File to write the same metrics to as a JSON summary",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        help="File to save the result and stores of every stage to (saved as _<input file name>_checkpoint.json with "
+        "the debug option), or to resume from with --resume-from",
+    )
+    parser.add_argument(
+        "--resume-from",
+        choices=Pipeline.STAGES,
+        help="Resume after the given stage from the --checkpoint file, the input file being the result of that stage "
+        "(e.g. a translation fixed by hand)",
+    )
+    parser.add_argument(
+        "--constructs",
+        type=Path,
+        help="TOML or JSON file of LaTeX environment and command names to add to or remove from the tables of "
+        "constructs handled apart (math environments, text commands, completely removed commands...)",
+    )
+    parser.add_argument(
+        "--glossary",
+        type=Path,
+        help="CSV file of terms and their fixed translations, one pair per row, to send as a glossary (DeepL only)",
+    )
     parser.add_argument(
         "-sl",
         "--src-lang",
@@ -185,8 +631,10 @@ def parse_args(args) -> argparse.Namespace:
     parser.add_argument(
         "-dl",
         "--dest-lang",
+        type=language_list,
         default=Translator.DEFAULT_DEST_LANG,
-        help="Output's language (default: %(default)s)",
+        help="Output's language, or comma separated languages to translate to in a single run, each written to the "
+        "output file name with the language code added, e.g. out.fr.tex (default: %(default)s)",
     )
     parser.add_argument(
         "-ca",
@@ -203,6 +651,13 @@ def parse_args(args) -> argparse.Namespace:
         type=str,
         help=f"Translation service to use {service_choices} (default: %(default)s)",
     )
+    parser.add_argument(
+        "--backup-service",
+        action="append",
+        default=list(),
+        help="Translation service to hedge slow calls to and to fail over to when the previous ones fail, can be "
+        "repeated to add several backups in order",
+    )
     parser.add_argument(
         "infile",
         nargs="?",
@@ -213,7 +668,7 @@ def parse_args(args) -> argparse.Namespace:
     parser.add_argument(
         "outfile",
         nargs="?",
-        type=argparse.FileType("w"),
+        type=output_file,
         default=sys.stdout,
         help="File to output the processed LaTeX (can be non existant)",
     )
@@ -243,7 +698,12 @@ def main():
 
     In short the levels of information in the logs increase as follows according to the given options: ``-v``,
     ``-vv``, ``-d``.
+
+    ``translatex serve`` starts a translation server instead, see :py:mod:`translatex.server`.
     """
+    if sys.argv[1:2] == ["serve"]:
+        server.main(sys.argv[2:])
+        return
     args = parse_args(sys.argv[1:])
     console_small = logging.StreamHandler()
     console_small.setFormatter(
@@ -10,12 +10,12 @@ compatible with many more types of structures.
 """
 import logging
 import re
-from typing import TYPE_CHECKING, Dict, Optional
+from typing import TYPE_CHECKING, AbstractSet, Any, Dict, List, Optional, Set
 
 from TexSoup import TexSoup
 from TexSoup.data import *
 
-from .data import *
+from .constructs import DEFAULT_TABLES, ConstructTables
 from .preprocessor import Preprocessor
 
 if TYPE_CHECKING:
@@ -49,6 +49,10 @@ class Marker:
         self.marker_format: str = Marker.DEFAULT_MARKER_FORMAT
         self._marker_store: Dict[int, str] = dict()
         """The dictionary that associates to each marker the corresponding string it replaces."""
+        self.missing_markers: List[str] = list()
+        """The markers found missing or altered by the last :py:meth:`unmark`"""
+        self.tables: ConstructTables = DEFAULT_TABLES
+        """The environments and commands marked apart, see :py:mod:`~translatex.constructs`"""
 
     @classmethod
     def from_preprocessor(cls, preprocessor: Preprocessor) -> "Marker":
@@ -147,6 +151,38 @@ class Marker:
         )
         return escaped_marker_format.format(r"(?:\d+)")
 
+    def release(self) -> None:
+        """Drops the strings held once the next stage took over, keeping the marker store to unmark later.
+
+        This is for the low memory mode of :py:class:`~translatex.pipeline.Pipeline`, see
+        :py:meth:`Preprocessor.release`.
+        """
+        self._base_latex = self._unmarked_latex = self._marked_latex = str()
+
+    def state(self) -> Dict[str, Any]:
+        """Gives the marked LaTeX and what is needed to unmark it, as JSON serializable values.
+
+        See :py:meth:`from_state` and :py:class:`~translatex.checkpoint.Checkpoint`.
+        """
+        return {
+            "marked_latex": self._marked_latex,
+            "marker_format": self._marker_format,
+            "marker_count": self.marker_count,
+            "marker_store": list(self._marker_store.items()),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "Marker":
+        """Another constructor that creates a Marker ready to unmark from a state given by :py:meth:`state`."""
+        marker = cls(str())
+        marker.marker_format = state["marker_format"]
+        marker.marked_latex = state["marked_latex"]
+        marker.marker_count = state["marker_count"]
+        marker._marker_store = {
+            int(number): value for number, value in state["marker_store"]
+        }
+        return marker
+
     def dump_store(self) -> str:
         string_transformed = [
             f"{item}\n" for item in self._marker_store.items()
@@ -176,11 +212,87 @@ class Marker:
             node.name = self._next_marker()
             self._marker_store.update({self.marker_count: previous_name})
         elif type(node.expr) is TexCmd:
-            if node.name in SKIPPED_COMMANDS:
+            if node.name in self.tables.skipped_commands:
                 return
             node.name = self._next_marker()
             self._marker_store.update({self.marker_count: previous_name})
 
+    @staticmethod
+    def _node_body(node: TexNode) -> list:
+        """Gives the list of expressions of a node without the contents of its arguments.
+
+        TexSoup lists the contents of the arguments (``[]`` and ``{}`` groups) before the actual body of a node. The
+        arguments are kept out of any content marking so that they can be processed with regex during tokenization. They
+        are filtered by identity rather than equality so that a body expression with the same text as an argument
+        stays in place, and so that no string comparison takes place for every expression.
+        """
+        argument_ids: Set[int] = {
+            id(content) for arg in node.args for content in arg.contents
+        }
+        if not argument_ids:
+            return node.expr.all
+        return [x for x in node.expr.all if id(x) not in argument_ids]
+
+    def _source_span(self, expressions: list) -> str:
+        """Gives the LaTeX string that a contiguous list of expressions spans.
+
+        The string is sliced directly from the source that was parsed using the positions recorded by TexSoup, instead
+        of turning every expression back into a string. Only the first and the last expressions are turned into strings
+        to verify the slice. If a position is unknown (expression inserted after parsing) or the slice doesn't match,
+        the expressions are joined as strings instead.
+
+        Args:
+            expressions: Contiguous expressions taken from the list of expressions of a single node
+
+        """
+        if not expressions:
+            return str()
+        if len(expressions) == 1:
+            return str(expressions[0])
+        first, last = expressions[0], expressions[-1]
+        start: int = getattr(first, "position", -1)
+        last_start: int = getattr(last, "position", -1)
+        if 0 <= start <= last_start:
+            first_string, last_string = str(first), str(last)
+            end = last_start + len(last_string)
+            if self._unmarked_latex.startswith(
+                first_string, start
+            ) and self._unmarked_latex.startswith(last_string, last_start):
+                return self._unmarked_latex[start:end]
+        return "".join([str(x) for x in expressions])
+
+    def _mark_node_ranges(
+        self, node: TexNode, ranges: List[range], body: Optional[list] = None
+    ) -> None:
+        """This method replaces the given ranges of the body of a TexNode with markers in a single pass.
+
+        The ranges must be sorted and must not overlap. Each range is replaced by a single marker and the LaTeX it spans
+        is saved in the dictionary. The new list of expressions is built once, no matter how many ranges there are.
+
+        Args:
+            node: A node in the TexSoup syntax tree
+            ranges: Ranges in the list of body expressions of the node (see :py:meth:`_node_body`)
+            body: The body expressions of the node if they were already computed by the caller
+
+        """
+        if body is None:
+            body = self._node_body(node)
+        new_contents: list = list()
+        position: int = 0
+        for replace_range in ranges:
+            new_contents.extend(body[position : replace_range.start])
+            new_contents.append(self._next_marker())
+            self._marker_store.update(
+                {
+                    self.marker_count: self._source_span(
+                        body[replace_range.start : replace_range.stop]
+                    )
+                }
+            )
+            position = max(position, replace_range.stop)
+        new_contents.extend(body[position:])
+        node.contents = new_contents
+
     def _mark_node_contents(
         self,
         node: TexNode,
@@ -190,9 +302,9 @@ class Marker:
         """This method marks the contents of a TexNode. It is used for LaTeX environments rather than commands.
 
         If no optional parameters are passed, all the contents get marked with a single marker. If both optional
-        parameters are specified, only the given ranges are marked and the rest is left as is for further treatment and
-        recursion. All the parts that the marker replaces are turned into strings and stored in the dictionary.
-        Any LaTeX bracket arguments are removed from the marking process so that they can be processed with
+        parameters are specified, only the given range is marked and the rest is left as is for further treatment and
+        recursion. All the parts that the marker replaces are saved in the dictionary.
+        Any LaTeX arguments are left out of the marking process so that they can be processed with
         regex during tokenization run.
 
         .. note::
@@ -200,81 +312,44 @@ class Marker:
 
         Args:
             node: A node in the TexSoup syntax tree
-            original_expression_size: The starting length of the TexSoup expression list for this node. Used to adjust
-            the given ranges for the removals done to the list.
-            replace_range: A range in the list of expressions to mark
+            original_expression_size: The starting length of the body expression list for this node. Used to adjust
+            the given range for the removals done to the list.
+            replace_range: A range in the list of body expressions to mark
 
         """
         if (original_expression_size != 0) ^ (replace_range is not None):
             raise ValueError(
                 "Either supply both optional parameters or none of them"
             )
+        body: list = self._node_body(node)
+        current_expression_size = len(body)
         if original_expression_size == 0 and replace_range is None:
-            previous_expression: list = node.expr.all
-            # Sanitize previous expressions so that it no longer contains command options within []
-            args = [
-                y.pop()
-                for y in [
-                    x.contents for x in node.args if type(x) is BracketGroup
-                ]
-            ]
-            previous_expression = [
-                x for x in previous_expression if x not in args
-            ]
-            node.contents = [self._next_marker()]
-            self._marker_store.update(
-                {
-                    self.marker_count: "".join(
-                        [str(x) for x in previous_expression]
-                    )
-                }
+            self._mark_node_ranges(
+                node, [range(current_expression_size)], body
             )
         else:
-            current_expression_size = len(node.expr.all)
             adjustment_difference = (
                 original_expression_size - current_expression_size
             )
-            adjusted_replace_range = range(
-                replace_range.start - adjustment_difference,
-                replace_range.stop - adjustment_difference,
-            )
-            previous_expression: list = node.expr.all[
-                adjusted_replace_range.start : adjusted_replace_range.stop
-            ]
-            # Sanitize previous expressions so that it no longer contains command options within []
-            args = [
-                y.pop()
-                for y in [
-                    x.contents for x in node.args if type(x) is BracketGroup
-                ]
-            ]
-            previous_expression = [
-                x for x in previous_expression if x not in args
-            ]
-            new_contents = list(node.expr.all)
-            del new_contents[
-                adjusted_replace_range.start : adjusted_replace_range.stop
-            ]
-            new_contents.insert(
-                adjusted_replace_range.start, self._next_marker()
-            )
-            node.contents = new_contents
-            self._marker_store.update(
-                {
-                    self.marker_count: "".join(
-                        [str(x) for x in previous_expression]
+            self._mark_node_ranges(
+                node,
+                [
+                    range(
+                        replace_range.start - adjustment_difference,
+                        replace_range.stop - adjustment_difference,
                     )
-                }
+                ],
+                body,
             )
 
-    @staticmethod
+    @classmethod
     def _marking_range_finder(
-        node: TexNode, excluded_commands: List[str]
+        cls, node: TexNode, excluded_commands: AbstractSet[str]
     ) -> List[range]:
-        """Finds ranges to be replaced with markers in the list of expressions of a node according to the given
-        exclude list.
+        """Finds ranges to be replaced with markers in the list of body expressions of a node according to the
+        given exclude list.
 
-        Any excluded commands are kept as is and anything else is counted in ranges and returned. This is a static
+        Any excluded commands are kept as is and anything else is counted in ranges and returned. This is a class
         method and doesn't modify any of its arguments (read-only), it's just a calculation method.
 
         .. warning::
@@ -284,17 +359,18 @@ class Marker:
 
         Args:
             node: A node in the TexSoup syntax tree
-            excluded_commands: A list of strings indicating the names of the LaTeX commands to leave outside the
+            excluded_commands: A set of strings indicating the names of the LaTeX commands to leave outside the
             calculated ranges.
 
         Returns:
-            A list of ranges corresponding to the expression list of the given node.
+            A list of ranges corresponding to the body expression list of the given node (see :py:meth:`_node_body`).
 
         """
         # TODO: make it work recursively so that commands more than one level deep aren't ignored.
         ranges_to_mark: List[range] = list()
         start: int = -1
-        for i, expr in enumerate(node.expr.all):
+        body: list = cls._node_body(node)
+        for i, expr in enumerate(body):
             if start == -1 and (
                 type(expr) is not TexCmd or expr.name not in excluded_commands
             ):
@@ -306,7 +382,7 @@ class Marker:
             ):
                 ranges_to_mark.append(range(start, i))
                 start = -1
-            elif len(node.expr.all) - 1 == i:
+            elif len(body) - 1 == i:
                 ranges_to_mark.append(range(start, i + 1))
         return ranges_to_mark
 
@@ -334,19 +410,15 @@ class Marker:
         for descendant in node.descendants:
             if (
                 type(descendant) is TexNode
-                and descendant.name in TEXT_COMMANDS
+                and descendant.name in self.tables.text_commands
             ):
                 continue_recursion = True
                 break
         if continue_recursion:
             ranges_to_mark: List[range] = self._marking_range_finder(
-                node, TEXT_COMMANDS
+                node, self.tables.text_commands
             )
-            original_expression_size: int = len(node.expr.all)
-            for range_to_mark in ranges_to_mark:
-                self._mark_node_contents(
-                    node, original_expression_size, range_to_mark
-                )
+            self._mark_node_ranges(node, ranges_to_mark)
         else:
             self._mark_node_contents(node)
             # TODO: implement way to completely mark and replace named math environment (maybe)
@@ -365,12 +437,12 @@ class Marker:
             node: A node in the TexSoup syntax tree
 
         """
-        if node.name in MATH_ENVS:
+        if node.name in self.tables.math_envs:
             marked_node: Optional[TexNode] = self._math_processor(node)
             if marked_node:
                 for current_node in marked_node.children:
                     self._traverse_ast(current_node)
-        elif node.name in COMPLETELY_REMOVED_ENVS:
+        elif node.name in self.tables.completely_removed_envs:
             self._mark_node_contents(node)
             self._mark_node_name(node)
         elif len(node.children) == 0:
@@ -425,12 +497,14 @@ class Marker:
         current_string: str = self._marked_latex
         if not current_string:
             raise ValueError("Marked string is empty, nothing to unmark")
+        self.missing_markers = list()
         for marker, value in self._marker_store.items():
             formatted_marker = self._marker_format.format(marker)
             if current_string.count(formatted_marker) == 0:
                 log.error(
                     f"Found missing or altered MARKER: {formatted_marker} --> during stage MARKER"
                 )
+                self.missing_markers.append(formatted_marker)
             else:
                 current_string = current_string.replace(
                     formatted_marker, value
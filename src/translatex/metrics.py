@@ -0,0 +1,352 @@
+"""Metrics of the runs of a pipeline, exported for monitoring as a Prometheus text file and a JSON summary.
+
+:py:class:`Metrics` follows a :py:class:`~translatex.pipeline.Pipeline` through its progress events (see
+:py:mod:`translatex.progress`) and a hook at the end of the tokenization stage, and keeps counters, gauges and latency
+histograms over all the runs (see :py:attr:`Metrics.METRICS`): the API calls made to each service and how long they
+took, the characters sent and received, the chunks reused from the cache, the journal or an earlier duplicate, the
+tokens per thousand characters sent, the tokens, markers and indicators found missing when undoing the stages and the
+duration of every stage.
+
+They are written with :py:meth:`Metrics.write`, at the end of each batch of documents, as a text file in the
+Prometheus exposition format, e.g. for the textfile collector of the node exporter, and as a JSON summary::
+
+    metrics = Metrics()
+    metrics.add_hooks(pipeline)
+    for latex in documents:
+        pipeline.run(latex)
+    metrics.write(prometheus_path="translatex.prom", json_path="translatex.json")
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .pipeline import Pipeline
+from .tokenizer import Tokenizer
+
+log = logging.getLogger("translatex.metrics")
+
+Labels = Tuple[Tuple[str, str], ...]
+"""The labels of a sample, as sorted name and value pairs"""
+
+
+class Histogram:
+    """Counts of observed values in cumulative buckets, with their sum, like a Prometheus histogram."""
+
+    DEFAULT_BUCKETS: Tuple[float, ...] = (
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+        60.0,
+    )
+    """The upper bounds of the buckets in seconds, from a few milliseconds for the local stages to a minute for slow
+    API calls"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets: List[float] = sorted(buckets) + [math.inf]
+        self.counts: List[int] = [0] * len(self.buckets)
+        """The number of observed values of each bucket, not cumulative"""
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """Adds a value to the first bucket that holds it."""
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[int]:
+        """The number of observed values less than or equal to the bound of each bucket."""
+        counts = list()
+        total = 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class Metrics:
+    """Counters, gauges and latency histograms of the runs of a pipeline, exported as Prometheus text and JSON.
+
+    The metrics are kept over all the runs of the pipelines they follow, like the counters of a long running process,
+    so that a monitoring system computes rates from their increase. They can be updated from several threads.
+    """
+
+    PREFIX: str = "translatex_"
+    """Added to the name of every metric on export"""
+    METRICS: Dict[str, Tuple[str, str]] = {
+        "requests_total": (
+            "counter",
+            "API calls made to each translation service",
+        ),
+        "request_seconds": (
+            "histogram",
+            "Duration of the API calls to each translation service",
+        ),
+        "characters_sent_total": (
+            "counter",
+            "Characters sent to each translation service",
+        ),
+        "characters_received_total": (
+            "counter",
+            "Characters received from each translation service",
+        ),
+        "chunks_reused_total": (
+            "counter",
+            "Chunks not sent because taken from a source: the cache (cache hits), the journal or an earlier duplicate",
+        ),
+        "chunks_retried_total": (
+            "counter",
+            "Chunks translated again because they lost tokens",
+        ),
+        "documents_total": (
+            "counter",
+            "Documents tokenized",
+        ),
+        "tokens_per_1k_characters": (
+            "gauge",
+            "Tokens per thousand characters of the last document tokenized",
+        ),
+        "missing_total": (
+            "counter",
+            "Tokens, markers and indicators found missing or altered when undoing each stage",
+        ),
+        "stage_seconds": (
+            "histogram",
+            "Duration of each stage, undoing the stages of a language being the Rebuild stage",
+        ),
+    }
+    """The type and description of each metric, by name without the :py:attr:`PREFIX`"""
+
+    def __init__(
+        self, buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS
+    ) -> None:
+        """Creates empty metrics.
+
+        Args:
+            buckets: The upper bounds of the buckets of the histograms in seconds
+
+        """
+        self.buckets = buckets
+        self._samples: Dict[str, Dict[Labels, Any]] = {
+            name: dict() for name in Metrics.METRICS
+        }
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"The metrics hold {sum(map(len, self._samples.values()))} sample(s)."
+
+    def add_hooks(self, pipeline: Pipeline) -> None:
+        """Follows the runs of a pipeline: subscribes to its progress and counts the tokens of its documents."""
+        pipeline.progress.subscribe(self)
+        pipeline.add_hook(
+            "Tokenizer", lambda t, dest_lang: self.record_tokenizer(t)
+        )
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """Adds a value to a counter."""
+        key = Metrics._labels(labels)
+        with self._lock:
+            samples = self._samples[name]
+            samples[key] = samples.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """Sets the value of a gauge."""
+        with self._lock:
+            self._samples[name][Metrics._labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Adds a value to a histogram."""
+        key = Metrics._labels(labels)
+        with self._lock:
+            samples = self._samples[name]
+            if key not in samples:
+                samples[key] = Histogram(self.buckets)
+            samples[key].observe(value)
+
+    def get(self, name: str, **labels: str) -> Any:
+        """Gives the value of a counter or gauge, or the histogram, with the given labels, ``None`` if never set."""
+        with self._lock:
+            return self._samples[name].get(Metrics._labels(labels))
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Labels:
+        return tuple(
+            sorted((name, str(value)) for name, value in labels.items())
+        )
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        """Updates the metrics with a progress event, see :py:data:`~translatex.progress.Subscriber`."""
+        kind = event["event"]
+        if kind == "chunks_received":
+            service = event["service"] or "unknown"
+            self.inc("requests_total", service=service)
+            self.observe("request_seconds", event["seconds"], service=service)
+            self.inc(
+                "characters_sent_total", event["characters"], service=service
+            )
+            self.inc(
+                "characters_received_total",
+                event["received_characters"],
+                service=service,
+            )
+        elif kind == "chunks_reused":
+            self.inc(
+                "chunks_reused_total", event["chunks"], source=event["source"]
+            )
+        elif kind == "chunks_retried":
+            self.inc("chunks_retried_total", event["chunks"])
+        elif kind == "stage_finished":
+            self.observe(
+                "stage_seconds", event["seconds"], stage=event["stage"]
+            )
+        elif kind == "document_rebuilt":
+            self.observe("stage_seconds", event["seconds"], stage="Rebuild")
+            for stage, field in (
+                ("Tokenizer", "missing_tokens"),
+                ("Marker", "missing_markers"),
+                ("Preprocessor", "missing_indicators"),
+            ):
+                self.inc("missing_total", event[field], stage=stage)
+
+    def record_tokenizer(self, tokenizer: Tokenizer) -> None:
+        """Counts a tokenized document and the density of its tokens."""
+        self.inc("documents_total")
+        if tokenizer.tokenized_string:
+            self.set(
+                "tokens_per_1k_characters",
+                1000
+                * len(
+                    re.findall(
+                        Tokenizer.token_regex(tokenizer.token_format),
+                        tokenizer.tokenized_string,
+                    )
+                )
+                / len(tokenizer.tokenized_string),
+            )
+
+    def prometheus_text(self) -> str:
+        """Gives the metrics in the Prometheus text exposition format."""
+        lines = list()
+        with self._lock:
+            for name, (kind, description) in Metrics.METRICS.items():
+                full_name = Metrics.PREFIX + name
+                lines.append(f"# HELP {full_name} {description}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for labels, value in sorted(self._samples[name].items()):
+                    if kind != "histogram":
+                        lines.append(
+                            f"{full_name}{Metrics._format_labels(labels)} {Metrics._format_value(value)}"
+                        )
+                        continue
+                    for bound, count in zip(
+                        value.buckets, value.cumulative_counts()
+                    ):
+                        le = (("le", Metrics._format_value(bound)),)
+                        lines.append(
+                            f"{full_name}_bucket{Metrics._format_labels(labels + le)} {count}"
+                        )
+                    lines.append(
+                        f"{full_name}_sum{Metrics._format_labels(labels)} {Metrics._format_value(value.sum)}"
+                    )
+                    lines.append(
+                        f"{full_name}_count{Metrics._format_labels(labels)} {value.count}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _format_labels(labels: Labels) -> str:
+        if not labels:
+            return str()
+        escaped = (
+            (
+                name,
+                value.replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for name, value in labels
+        )
+        return (
+            "{"
+            + ",".join(f'{name}="{value}"' for name, value in escaped)
+            + "}"
+        )
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        if value == math.inf:
+            return "+Inf"
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def summary(self) -> Dict[str, Any]:
+        """Gives the metrics as JSON serializable values.
+
+        Returns:
+            Each metric by name, without the :py:attr:`PREFIX`, with its type, description and samples. A sample holds
+            its labels and its value, or for histograms the count, sum and mean of the observed values and the
+            cumulative count of each bucket by upper bound.
+
+        """
+        summary = dict()
+        with self._lock:
+            for name, (kind, description) in Metrics.METRICS.items():
+                samples = list()
+                for labels, value in sorted(self._samples[name].items()):
+                    sample: Dict[str, Any] = {"labels": dict(labels)}
+                    if kind == "histogram":
+                        sample["count"] = value.count
+                        sample["sum"] = value.sum
+                        sample["mean"] = value.sum / value.count
+                        sample["buckets"] = {
+                            Metrics._format_value(bound): count
+                            for bound, count in zip(
+                                value.buckets, value.cumulative_counts()
+                            )
+                        }
+                    else:
+                        sample["value"] = value
+                    samples.append(sample)
+                summary[name] = {
+                    "type": kind,
+                    "description": description,
+                    "samples": samples,
+                }
+        return summary
+
+    def write(
+        self,
+        prometheus_path: Optional[Union[str, Path]] = None,
+        json_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """Writes the metrics to a Prometheus text file and a JSON summary, either or both.
+
+        Each file is written aside then renamed, so that a collector reading it never sees it half written.
+        """
+        for path, contents in (
+            (prometheus_path, self.prometheus_text),
+            (json_path, lambda: json.dumps(self.summary(), indent=2) + "\n"),
+        ):
+            if path is None:
+                continue
+            path = Path(path)
+            partial = path.with_name(f".{path.name}.partial")
+            partial.write_text(contents())
+            os.replace(partial, path)
+            log.info("Metrics written to %s", path)
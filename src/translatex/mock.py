@@ -0,0 +1,556 @@
+"""A local stand-in for translation services, to test and benchmark TransLaTeX offline and reproducibly.
+
+Real translation services can't be load tested: they cost money, enforce quotas and their response times vary. This
+module provides a mock backend that answers like a translation service would, with configurable latency distributions,
+error and rate limiting (HTTP 429) rates and character limits. The backend can be used in-process through
+:py:class:`MockTranslationService`, a regular :py:class:`~translatex.translator.TranslationService`, or over HTTP
+through :py:class:`MockTranslationServer` which mimics the JSON APIs of Google Translate v2 and of IRMA (see the custom
+service example in the documentation) on localhost.
+
+The server can also be run on its own::
+
+    python -m translatex.mock --port 8000 --latency 0.2 --jitter 0.5 --distribution lognormal --rate-limit-rate 0.05
+
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from .translator import TranslationService
+
+log = logging.getLogger("translatex.mock")
+
+
+class MockServiceError(Exception):
+    """Raised when the mock backend answers with an error, like a real service would.
+
+    Attributes:
+        status_code: The HTTP status code of the error, 429 when rate limited.
+        message: Explanation of the error.
+
+    """
+
+    def __init__(self, status_code: int, message: str) -> None:
+        self.status_code = status_code
+        self.message = message
+        super().__init__(f"{status_code}: {message}")
+
+
+class MockTranslationBackend:
+    """The behaviour shared by the in-process mock service and the mock HTTP server.
+
+    Each call first waits for a latency drawn from the chosen distribution plus a delay for each character, then fails
+    with a rate limiting (429) or server (500) error at the given rates, or checks the character limits and translates.
+    The translation is done by a transform function, which leaves the text untouched by default so that the output of
+    TransLaTeX is the same as its input.
+
+    All the randomness comes from a generator seeded with the given seed, so that runs are reproducible. Calls are
+    thread safe and counted in :py:attr:`stats`.
+    """
+
+    DISTRIBUTIONS: Tuple[str, ...] = (
+        "constant",
+        "uniform",
+        "normal",
+        "lognormal",
+        "exponential",
+    )
+    """Latency distributions, all centered on the latency and spread by the jitter (see :py:meth:`draw_latency`)."""
+    DEFAULT_DISTRIBUTION: str = "constant"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        distribution: str = DEFAULT_DISTRIBUTION,
+        per_char_latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        char_limit: int = 0,
+        array_item_limit: int = 0,
+        array_item_char_limit: int = 0,
+        array_overall_char_limit: int = 0,
+        overall_char_limit: int = 0,
+        seed: Optional[int] = None,
+        transform: Optional[Callable[[str, str, str], str]] = None,
+    ) -> None:
+        """Creates a mock backend. Limits of zero are not enforced.
+
+        Args:
+            latency: Typical time in seconds to answer a call
+            jitter: Spread of the latency, its meaning depends on the distribution
+            distribution: The latency distribution, one of :py:attr:`DISTRIBUTIONS`
+            per_char_latency: Additional time in seconds for each character to translate
+            error_rate: Probability of a call failing with a server error (500)
+            rate_limit_rate: Probability of a call failing with a rate limiting error (429)
+            char_limit: Maximum number of characters of a single text
+            array_item_limit: Maximum number of texts in a single call
+            array_item_char_limit: Maximum number of characters of each text of an array
+            array_overall_char_limit: Maximum number of characters of all the texts of an array
+            overall_char_limit: Quota of characters for all the calls, errors (403) once exceeded
+            seed: Seed of the random generator
+            transform: Function translating a text given the source and destination languages
+
+        Raises:
+            ValueError: If the distribution is unknown or a rate isn't a probability
+
+        """
+        if distribution not in MockTranslationBackend.DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution, choose one of: {', '.join(MockTranslationBackend.DISTRIBUTIONS)}"
+            )
+        if not (0 <= error_rate <= 1 and 0 <= rate_limit_rate <= 1):
+            raise ValueError("Error rates must be between 0 and 1")
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self.per_char_latency = per_char_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.char_limit = char_limit
+        self.array_item_limit = array_item_limit
+        self.array_item_char_limit = array_item_char_limit
+        self.array_overall_char_limit = array_overall_char_limit
+        self.overall_char_limit = overall_char_limit
+        self.transform = transform or (
+            lambda text, source_lang, dest_lang: text
+        )
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.stats: Dict[str, int] = dict.fromkeys(
+            (
+                "calls",
+                "texts",
+                "characters",
+                "errors",
+                "rate_limited",
+                "rejected",
+                "max_concurrency",
+            ),
+            0,
+        )
+        """Counters of the calls answered, texts and characters translated, errors of each kind and the highest number
+        of calls answered at the same time."""
+
+    def __str__(self) -> str:
+        return (
+            f"The mock backend answered {self.stats['calls']} calls and translated {self.stats['characters']} "
+            f"characters."
+        )
+
+    def draw_latency(self, characters: int = 0) -> float:
+        """Draws the time in seconds a call translating the given number of characters takes.
+
+        ``constant`` always gives the latency, ``uniform`` draws between the latency minus and plus the jitter,
+        ``normal`` uses the jitter as standard deviation, ``lognormal`` uses the latency as median and the jitter as
+        the standard deviation of the logarithm (long tail) and ``exponential`` uses the latency as mean.
+        """
+        with self._lock:
+            if self.distribution == "uniform":
+                latency = self._random.uniform(
+                    self.latency - self.jitter, self.latency + self.jitter
+                )
+            elif self.distribution == "normal":
+                latency = self._random.gauss(self.latency, self.jitter)
+            elif self.distribution == "lognormal":
+                latency = self.latency * math.exp(
+                    self._random.gauss(0, self.jitter)
+                )
+            elif self.distribution == "exponential" and self.latency > 0:
+                latency = self._random.expovariate(1 / self.latency)
+            else:
+                latency = self.latency
+        return max(0.0, latency) + characters * self.per_char_latency
+
+    def _check_limits(self, texts: List[str], array: bool) -> None:
+        lengths = [len(text) for text in texts]
+        if array:
+            if 0 < self.array_item_limit < len(texts):
+                raise MockServiceError(
+                    400,
+                    f"Too many texts: {len(texts)} > {self.array_item_limit}",
+                )
+            if 0 < self.array_item_char_limit < max(lengths, default=0):
+                raise MockServiceError(
+                    400,
+                    f"Text too long: {max(lengths)} > {self.array_item_char_limit}",
+                )
+            if 0 < self.array_overall_char_limit < sum(lengths):
+                raise MockServiceError(
+                    400,
+                    f"Texts too long: {sum(lengths)} > {self.array_overall_char_limit}",
+                )
+        elif 0 < self.char_limit < sum(lengths):
+            raise MockServiceError(
+                400, f"Text too long: {sum(lengths)} > {self.char_limit}"
+            )
+
+    def handle(
+        self,
+        texts: List[str],
+        source_lang: str,
+        dest_lang: str,
+        array: bool = False,
+    ) -> List[str]:
+        """Answers a call translating the given texts, waiting for the drawn latency first.
+
+        Args:
+            texts: The texts to translate
+            source_lang: The original language of the texts
+            dest_lang: The language to translate the texts to
+            array: If the texts were sent as an array, so that the limits on arrays apply instead of the character limit
+
+        Raises:
+            MockServiceError: If the call fails, because of the error rates, the limits or the quota
+
+        """
+        characters = sum(len(text) for text in texts)
+        with self._lock:
+            self.stats["calls"] += 1
+            self._in_flight += 1
+            self.stats["max_concurrency"] = max(
+                self.stats["max_concurrency"], self._in_flight
+            )
+            draw = self._random.random()
+        try:
+            time.sleep(self.draw_latency(characters))
+            if draw < self.rate_limit_rate:
+                with self._lock:
+                    self.stats["rate_limited"] += 1
+                raise MockServiceError(429, "Too many requests")
+            if draw < self.rate_limit_rate + self.error_rate:
+                with self._lock:
+                    self.stats["errors"] += 1
+                raise MockServiceError(500, "Internal server error")
+            try:
+                self._check_limits(texts, array)
+            except MockServiceError:
+                with self._lock:
+                    self.stats["rejected"] += 1
+                raise
+            with self._lock:
+                if (
+                    0
+                    < self.overall_char_limit
+                    < (self.stats["characters"] + characters)
+                ):
+                    self.stats["rejected"] += 1
+                    raise MockServiceError(403, "Quota exceeded")
+                self.stats["texts"] += len(texts)
+                self.stats["characters"] += characters
+            return [
+                self.transform(text, source_lang, dest_lang) for text in texts
+            ]
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+class MockTranslationService(TranslationService):
+    """In-process translation service answering through a :py:class:`MockTranslationBackend`.
+
+    Its limits are the ones of the backend, or of a typical service if the backend doesn't enforce any, so that the
+    chunks TransLaTeX plans are accepted. Errors are raised as :py:class:`MockServiceError`.
+    """
+
+    name = "Mock"
+    overall_char_limit = 0
+    char_limit = 5000
+    array_support = True
+    array_item_limit = 128
+    array_item_char_limit = 0
+    array_overall_char_limit = 30000
+    short_description = "Local stand-in for a translation service, for testing and benchmarking offline"
+    languages = {"en": "English", "fr": "French"}
+
+    def __init__(
+        self, backend: Optional[MockTranslationBackend] = None
+    ) -> None:
+        """Creates a mock service, with a backend that answers instantly and never fails by default."""
+        self.backend = backend or MockTranslationBackend()
+        for limit in (
+            "overall_char_limit",
+            "char_limit",
+            "array_item_limit",
+            "array_item_char_limit",
+            "array_overall_char_limit",
+        ):
+            if getattr(self.backend, limit):
+                setattr(self, limit, getattr(self.backend, limit))
+        self.call_latency = self.backend.latency
+
+    def translate(self, text: str, source_lang: str, dest_lang: str) -> str:
+        return self.backend.handle([text], source_lang, dest_lang)[0]
+
+    def translate_array(
+        self, texts: List[str], source_lang: str, dest_lang: str
+    ) -> List[str]:
+        return self.backend.handle(texts, source_lang, dest_lang, array=True)
+
+
+class MockTranslationServer:
+    """Local HTTP server answering through a :py:class:`MockTranslationBackend` like a real translation API.
+
+    Two APIs are mimicked:
+
+    * Google Translate v2 at :py:attr:`GOOGLE_PATH`: form encoded ``q`` (repeated for arrays), ``source`` and
+      ``target`` fields, answered with ``{"data": {"translations": [{"translatedText": ...}]}}``. Point
+      :py:attr:`~translatex.translator.GoogleTranslate.url` of a ``GoogleTranslate`` instance to :py:attr:`google_url`
+      to use it.
+    * IRMA at :py:attr:`IRMA_PATH`: JSON ``text`` (a string or a list of strings), ``source_lang`` and
+      ``target_lang`` fields, answered with ``{"translations": [{"text": ...}]}``.
+
+    Errors are answered with their status code and a JSON body, plus a ``Retry-After`` header for 429. The server
+    listens on localhost in a background thread, with a thread per request so that concurrency can be measured. It can
+    be used as a context manager to start and stop it.
+    """
+
+    DEFAULT_HOST: str = "127.0.0.1"
+    DEFAULT_PORT: int = 0
+    """Port zero lets the system choose a free port, see :py:attr:`url` for the one chosen."""
+    GOOGLE_PATH: str = "/language/translate/v2"
+    IRMA_PATH: str = "/translation"
+
+    def __init__(
+        self,
+        backend: Optional[MockTranslationBackend] = None,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+    ) -> None:
+        self.backend = backend or MockTranslationBackend()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MockTranslationServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def google_url(self) -> str:
+        """The URL of the mimicked Google Translate v2 API."""
+        return self.url + MockTranslationServer.GOOGLE_PATH
+
+    @property
+    def irma_url(self) -> str:
+        """The URL of the mimicked IRMA API."""
+        return self.url + MockTranslationServer.IRMA_PATH
+
+    def start(self) -> None:
+        """Starts answering requests in a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        log.info("Mock translation server listening on %s", self.url)
+
+    def serve_forever(self) -> None:
+        """Answers requests in the current thread until interrupted."""
+        log.info("Mock translation server listening on %s", self.url)
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        """Stops the server and frees its port."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _handler_class(self) -> type:
+        backend = self.backend
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                log.debug(format, *args)
+
+            def _answer(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                # IRMA's service checks that the API is reachable this way
+                self._answer(200, {"status": "ok"})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode()
+                try:
+                    if self.path == MockTranslationServer.GOOGLE_PATH:
+                        fields = parse_qs(body)
+                        texts = fields.get("q", [])
+                        translations = backend.handle(
+                            texts,
+                            fields.get("source", [""])[0],
+                            fields.get("target", [""])[0],
+                            array=len(texts) > 1,
+                        )
+                        self._answer(
+                            200,
+                            {
+                                "data": {
+                                    "translations": [
+                                        {"translatedText": translation}
+                                        for translation in translations
+                                    ]
+                                }
+                            },
+                        )
+                    elif self.path == MockTranslationServer.IRMA_PATH:
+                        fields = json.loads(body)
+                        array = isinstance(fields["text"], list)
+                        texts = fields["text"] if array else [fields["text"]]
+                        translations = backend.handle(
+                            texts,
+                            fields.get("source_lang", ""),
+                            fields.get("target_lang", ""),
+                            array=array,
+                        )
+                        self._answer(
+                            200,
+                            {
+                                "translations": [
+                                    {"text": translation}
+                                    for translation in translations
+                                ]
+                            },
+                        )
+                    else:
+                        self._answer(
+                            404,
+                            {"error": {"code": 404, "message": "Not found"}},
+                        )
+                except MockServiceError as e:
+                    self._answer(
+                        e.status_code,
+                        {
+                            "error": {
+                                "code": e.status_code,
+                                "message": e.message,
+                            }
+                        },
+                    )
+                except (ValueError, KeyError) as e:
+                    self._answer(
+                        400, {"error": {"code": 400, "message": str(e)}}
+                    )
+
+        return Handler
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Runs the mock translation server until interrupted."""
+    parser = argparse.ArgumentParser(
+        prog="python -m translatex.mock",
+        description="Local mock translation server mimicking the Google Translate v2 and IRMA APIs",
+    )
+    parser.add_argument("--host", default=MockTranslationServer.DEFAULT_HOST)
+    parser.add_argument(
+        "--port", type=int, default=8000, help="(default: %(default)s)"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Typical answer time in seconds",
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Spread of the answer time"
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=MockTranslationBackend.DISTRIBUTIONS,
+        default=MockTranslationBackend.DEFAULT_DISTRIBUTION,
+        help="Distribution of the answer time (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--per-char-latency",
+        type=float,
+        default=0.0,
+        help="Additional answer time in seconds for each character",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Probability of a 500 error",
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0.0,
+        help="Probability of a 429 error",
+    )
+    parser.add_argument(
+        "--char-limit",
+        type=int,
+        default=0,
+        help="Maximum length of a single text",
+    )
+    parser.add_argument(
+        "--array-item-limit",
+        type=int,
+        default=0,
+        help="Maximum number of texts in an array",
+    )
+    parser.add_argument(
+        "--array-item-char-limit",
+        type=int,
+        default=0,
+        help="Maximum length of each text of an array",
+    )
+    parser.add_argument(
+        "--array-overall-char-limit",
+        type=int,
+        default=0,
+        help="Maximum length of all the texts of an array",
+    )
+    parser.add_argument("--seed", type=int, help="Seed for reproducible runs")
+    options = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO)
+    backend = MockTranslationBackend(
+        latency=options.latency,
+        jitter=options.jitter,
+        distribution=options.distribution,
+        per_char_latency=options.per_char_latency,
+        error_rate=options.error_rate,
+        rate_limit_rate=options.rate_limit_rate,
+        char_limit=options.char_limit,
+        array_item_limit=options.array_item_limit,
+        array_item_char_limit=options.array_item_char_limit,
+        array_overall_char_limit=options.array_overall_char_limit,
+        seed=options.seed,
+    )
+    MockTranslationServer(backend, options.host, options.port).serve_forever()
+    log.info("%s", backend)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,517 @@
+"""The TransLaTeX pipeline as a reusable object, to embed TransLaTeX in other programs.
+
+A :py:class:`Pipeline` is configured once with the formats, the translation service and the languages, then translates
+any number of LaTeX strings with :py:meth:`Pipeline.run`. Each run goes through the stages (preprocessing, marking,
+tokenization, translation, then the same stages undone in reverse order) and gives back a :py:class:`Result` holding
+the translated LaTeX and the objects of the stages. The translation service is created once and shared by all the runs
+and languages, and so are the worker processes of a CPU bound service until :py:meth:`Pipeline.close`. The compiled
+regular expressions of the stages are cached by the regex module, so that only the first run pays for them.
+
+Hooks can be added to be called at the end of every stage, to inspect or save its intermediary result::
+
+    pipeline = Pipeline(service="DeepL", source_lang="en", dest_langs=["fr", "de"])
+    pipeline.add_hook("Tokenizer", lambda tokenizer, dest_lang: print(tokenizer.tokenized_string))
+    result = pipeline.run(latex)
+    result.outputs["fr"]
+
+The start and end of every stage, and the chunks sent to the translation service and received, are reported to the
+:py:attr:`Pipeline.progress` of the pipeline as they happen, see :py:mod:`~translatex.progress`.
+"""
+import copy
+import gc
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from .constructs import DEFAULT_TABLES, ConstructTables
+from .journal import TranslationJournal
+from .marker import Marker
+from .preprocessor import Preprocessor
+from .progress import Progress
+from .sharding import mark_sharded
+from .tokenizer import Tokenizer
+from .translator import (
+    TRANSLATION_SERVICE_CLASSES,
+    ServiceProcessPool,
+    TranslationCache,
+    TranslationService,
+    Translator,
+)
+
+if TYPE_CHECKING:
+    from .checkpoint import Checkpoint
+
+log = logging.getLogger("translatex.pipeline")
+
+Hook = Callable[[Any, Optional[str]], None]
+"""Called with the object of a stage once it completed and the destination language for the translation stage, or
+``None`` for the stages shared by all the languages."""
+
+
+class Result:
+    """The outcome of a run of a :py:class:`Pipeline`.
+
+    Attributes:
+        outputs: The output of the run for each destination language: the translated LaTeX, or the result of the stage
+            the pipeline stopped at.
+        stopped_at: The stage the pipeline stopped at, ``None`` if it ran to the end.
+        preprocessor: The preprocessing stage, of the last language undone.
+        marker: The marking stage, of the last language undone, ``None`` if not reached.
+        tokenizer: The tokenization stage, of the last language undone, ``None`` if not reached.
+        translators: The translation stage of each destination language, empty if not reached.
+
+    """
+
+    def __init__(self) -> None:
+        self.outputs: Dict[str, str] = dict()
+        self.stopped_at: Optional[str] = None
+        self.preprocessor: Optional[Preprocessor] = None
+        self.marker: Optional[Marker] = None
+        self.tokenizer: Optional[Tokenizer] = None
+        self.translators: Dict[str, Translator] = dict()
+
+    def __str__(self) -> str:
+        return f"The result holds outputs in {', '.join(self.outputs)}."
+
+    @property
+    def output(self) -> str:
+        """The output for the first destination language."""
+        return next(iter(self.outputs.values()))
+
+
+class Pipeline:
+    """The TransLaTeX pipeline, configured once and run on any number of LaTeX strings.
+
+    The stages before translation run once per run. The translation to each destination language is then made
+    concurrently with the shared translation service, and the stages are undone for each language from copies of the
+    shared stages. With a journal, each language records its translated chunks to its own journal file so that an
+    interrupted run can be resumed.
+
+    A pipeline runs one document at a time, every run resetting its :py:attr:`progress`: documents translated at the
+    same time need a pipeline each, which can share a service and its worker processes. The pipeline can be used as a
+    context manager to close it at the end.
+    """
+
+    STAGES = ("Preprocessor", "Marker", "Tokenizer", "Translator")
+    """The stages hooks can be added to and the pipeline can stop at, in order"""
+    LOW_MEMORY_SHARD_LENGTH: int = 20000
+    """The length of text the shards marked in the low memory mode should stay under, see
+    :py:func:`~translatex.sharding.mark_sharded`"""
+
+    def __init__(
+        self,
+        service: Union[str, TranslationService] = Translator.DEFAULT_SERVICE,
+        source_lang: str = Translator.DEFAULT_SOURCE_LANG,
+        dest_langs: Union[str, Sequence[str]] = Translator.DEFAULT_DEST_LANG,
+        marker_format: str = Marker.DEFAULT_MARKER_FORMAT,
+        token_format: str = Tokenizer.DEFAULT_TOKEN_FORMAT,
+        tokenizer_engine: str = Tokenizer.DEFAULT_ENGINE,
+        deduplicate: bool = Translator.DEFAULT_DEDUPLICATE,
+        substitution: bool = Preprocessor.ENABLE_SUBSTITUTION,
+        stop: Optional[str] = None,
+        dry_run: bool = False,
+        journal: Optional[Union[str, Path]] = None,
+        resume: bool = False,
+        keep_journal: bool = False,
+        cache: Optional[TranslationCache] = None,
+        low_memory: bool = False,
+        shard_workers: int = 1,
+        progress: Optional[Progress] = None,
+        tables: ConstructTables = DEFAULT_TABLES,
+        pool: Optional[ServiceProcessPool] = None,
+    ) -> None:
+        """Configures a pipeline.
+
+        Args:
+            service: The translation service, or the name of one to create on the first run
+            source_lang: The language of the LaTeX to translate
+            dest_langs: The language to translate to, or several of them
+            marker_format: The format string of the markers
+            token_format: The format string of the tokens
+            tokenizer_engine: The engine of the tokenizer, one of :py:attr:`~translatex.tokenizer.Tokenizer.ENGINES`
+            deduplicate: Translate the chunks repeating an earlier one only once
+            substitution: Apply the manual substitution blocks when rebuilding
+            stop: The stage to stop at, see :py:attr:`STAGES`
+            dry_run: Skip the translation, giving back the LaTeX untranslated without calling the service
+            journal: The journal file to record the translated chunks to, named after the language when there are
+                several of them, no journal if ``None``
+            resume: Resume from the journal instead of starting it over
+            keep_journal: Keep the journal once the translation is complete
+            cache: The cache of translations shared by the runs, so that running an edited version of the LaTeX
+                again only translates the chunks that changed, no cache if ``None``
+            low_memory: Have every stage drop its copies of the document as soon as the next stage took over, see
+                :py:meth:`~translatex.preprocessor.Preprocessor.release`, mark the document in shards of at most
+                :py:attr:`LOW_MEMORY_SHARD_LENGTH` characters as far as its sections allow, freeing the parse tree of
+                each shard before parsing the next one, and undo the stages in place for every language instead of
+                from copies. The stages of the result then only hold their stores and the translated strings.
+            shard_workers: How many worker processes mark the document, split in shards at its sections (see
+                :py:mod:`~translatex.sharding`), every CPU if zero, the whole document in the current process if one
+            progress: Where to report the progress of the runs, a new one if ``None``
+            tables: The environments and commands the marking and tokenization stages handle apart, see
+                :py:mod:`~translatex.constructs`
+            pool: The worker processes of the CPU bound service, shared with other pipelines and left for the one who
+                gave it to close, see :py:attr:`pool`
+
+        Raises:
+            ValueError: If no destination language is given or the stage to stop at is unknown
+
+        """
+        if isinstance(dest_langs, str):
+            dest_langs = [dest_langs]
+        if not dest_langs:
+            raise ValueError("At least one destination language is needed")
+        if stop is not None and stop not in Pipeline.STAGES:
+            raise ValueError(
+                f"Unknown stage, choose one of: {', '.join(Pipeline.STAGES)}"
+            )
+        self._service = service
+        self._service_lock = threading.Lock()
+        self._pool = pool
+        self._own_pool = pool is None
+        """Whether the pool is started and closed by the pipeline"""
+        self.source_lang = source_lang
+        self.dest_langs: List[str] = list(dest_langs)
+        self.marker_format = marker_format
+        self.token_format = token_format
+        self.tokenizer_engine = tokenizer_engine
+        self.deduplicate = deduplicate
+        self.substitution = substitution
+        self.stop = stop
+        self.dry_run = dry_run
+        self.journal = journal
+        self.resume = resume
+        self.keep_journal = keep_journal
+        self.cache = cache
+        self.low_memory = low_memory
+        self.shard_workers = shard_workers
+        self.tables = tables
+        self.progress: Progress = progress or Progress()
+        """Reports the stages and the chunks translated as they go, subscribe to it to follow the runs"""
+        self._hooks: Dict[str, List[Hook]] = {
+            stage: list() for stage in Pipeline.STAGES
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"The pipeline translates from {self.source_lang} to {', '.join(self.dest_langs)} "
+            f"with {getattr(self._service, 'name', self._service)}."
+        )
+
+    @property
+    def service(self) -> TranslationService:
+        """The translation service, created on first use if it was given by name, once even from several threads."""
+        with self._service_lock:
+            if isinstance(self._service, str):
+                self._service = TRANSLATION_SERVICE_CLASSES[self._service]()
+            return self._service
+
+    @property
+    def pool(self) -> Optional[ServiceProcessPool]:
+        """The worker processes a CPU bound service translates in, ``None`` for other services.
+
+        Unless given to the pipeline, they are started on first use, once even from several threads, and shared by all
+        the runs and languages until :py:meth:`close`.
+        """
+        service = self.service
+        with self._service_lock:
+            if self._pool is None and service.cpu_bound:
+                self._pool = ServiceProcessPool(service)
+            return self._pool
+
+    def close(self) -> None:
+        """Stops the worker processes the pipeline started, if any. A later run starts new ones if needed."""
+        with self._service_lock:
+            pool = self._pool if self._own_pool else None
+            if self._own_pool:
+                self._pool = None
+        if pool is not None:
+            pool.close()
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add_hook(self, stage: str, hook: Hook) -> None:
+        """Adds a function to call at the end of a stage, see :py:data:`Hook`.
+
+        Raises:
+            ValueError: If the stage is unknown
+
+        """
+        if stage not in Pipeline.STAGES:
+            raise ValueError(
+                f"Unknown stage, choose one of: {', '.join(Pipeline.STAGES)}"
+            )
+        self._hooks[stage].append(hook)
+
+    def _stage_started(
+        self, stage: str, dest_lang: Optional[str] = None
+    ) -> float:
+        """Reports the start of a stage and gives the time it started at."""
+        self.progress.emit("stage_started", stage=stage, dest_lang=dest_lang)
+        return time.monotonic()
+
+    def _stage_finished(
+        self, stage: str, started: float, dest_lang: Optional[str] = None
+    ) -> None:
+        self.progress.emit(
+            "stage_finished",
+            stage=stage,
+            dest_lang=dest_lang,
+            seconds=time.monotonic() - started,
+        )
+
+    def _stage_done(
+        self, stage: str, stage_object: Any, dest_lang: Optional[str] = None
+    ) -> None:
+        log.info("---- %s info ---- %s", stage, stage_object)
+        for hook in self._hooks[stage]:
+            hook(stage_object, dest_lang)
+
+    def run(self, latex: str) -> Result:
+        """Translates a LaTeX string to every destination language, or up to the stage to stop at.
+
+        Raises:
+            ValueError: If there's nothing to translate
+
+        """
+        result = Result()
+        result.preprocessor = Preprocessor(latex)
+        return self._run(result, 0)
+
+    def resume_from(
+        self,
+        checkpoint: "Checkpoint",
+        stage: str,
+        output: Optional[str] = None,
+    ) -> Result:
+        """Runs the stages after the given one from a checkpoint, up to the stage to stop at.
+
+        Args:
+            checkpoint: The checkpoint holding the stages up to the given one
+            stage: The stage to resume after
+            output: The result of the stage to use instead of the recorded one, e.g. a translation fixed by hand
+
+        Raises:
+            ValueError: If the checkpoint doesn't hold the stage, or if the stage to stop at isn't after it
+
+        """
+        if self.stop is not None and Pipeline.STAGES.index(
+            self.stop
+        ) <= Pipeline.STAGES.index(stage):
+            raise ValueError(
+                f"Can't stop at {self.stop} when resuming after {stage}"
+            )
+        result = checkpoint.restore(stage, self.dest_langs, output)
+        return self._run(result, Pipeline.STAGES.index(stage) + 1)
+
+    def _run(self, result: Result, start: int) -> Result:
+        """Runs the stages from the one of the given position in :py:attr:`STAGES`, then undoes them."""
+        self.progress.reset()
+        p = result.preprocessor
+        if start <= 0:
+            started = self._stage_started("Preprocessor")
+            p.process()
+            self._stage_finished("Preprocessor", started)
+            self._stage_done("Preprocessor", p)
+            if self.stop == "Preprocessor":
+                return self._stopped(result, p.processed_latex)
+        if start <= 1:
+            started = self._stage_started("Marker")
+            if self.shard_workers == 1 and not self.low_memory:
+                m = result.marker = Marker.from_preprocessor(p)
+                m.marker_format = self.marker_format
+                m.tables = self.tables
+                m.mark()
+            else:
+                m = result.marker = mark_sharded(
+                    p.processed_latex,
+                    self.marker_format,
+                    self.shard_workers or None,
+                    self.tables,
+                    Pipeline.LOW_MEMORY_SHARD_LENGTH if self.low_memory else 0,
+                )
+                if self.low_memory:
+                    p.release()
+            if self.low_memory:
+                # The parse tree of TexSoup is made of reference cycles, free it now rather than at some later
+                # collection
+                gc.collect()
+            self._stage_finished("Marker", started)
+            self._stage_done("Marker", m)
+            if self.stop == "Marker":
+                return self._stopped(result, m.marked_latex)
+        m = result.marker
+        if start <= 2:
+            started = self._stage_started("Tokenizer")
+            t = result.tokenizer = Tokenizer.from_marker(m)
+            if self.low_memory:
+                m.release()
+            t.token_format = self.token_format
+            t.engine = self.tokenizer_engine
+            t.tables = self.tables
+            t.tokenize()
+            self._stage_finished("Tokenizer", started)
+            self._stage_done("Tokenizer", t)
+            if self.stop == "Tokenizer":
+                return self._stopped(result, t.tokenized_string)
+        t = result.tokenizer
+        if start <= 3:
+            result.translators = self._translate_all(t)
+            if self.low_memory:
+                t.release()
+            if self.stop == "Translator":
+                result.stopped_at = self.stop
+                result.outputs = {
+                    dest_lang: a.translated_string
+                    for dest_lang, a in result.translators.items()
+                }
+                return result
+        for dest_lang, a in result.translators.items():
+            # The stages are undone from shared copies for all but the last language. Undoing them only replaces their
+            # strings, so the low memory mode undoes them in place for every language instead.
+            stages = (p, m, t)
+            if dest_lang != self.dest_langs[-1] and not self.low_memory:
+                stages = copy.deepcopy(stages)
+            started = time.monotonic()
+            result.outputs[dest_lang] = self._rebuild(
+                *stages, a, translated=start > 3
+            )
+            self.progress.emit(
+                "document_rebuilt",
+                dest_lang=dest_lang,
+                seconds=time.monotonic() - started,
+                missing_tokens=len(stages[2].missing_tokens),
+                missing_markers=len(stages[1].missing_markers),
+                missing_indicators=len(stages[0].missing_indicators),
+            )
+        return result
+
+    def _stopped(self, result: Result, output: str) -> Result:
+        result.stopped_at = self.stop
+        result.outputs = dict.fromkeys(self.dest_langs, output)
+        return result
+
+    def translator(self, tokenizer: Tokenizer) -> Translator:
+        """Creates a translator for the tokenized string with the options of the pipeline."""
+        a = Translator.from_tokenizer(tokenizer)
+        a.deduplicate = self.deduplicate
+        return a
+
+    def _translate_all(self, t: Tokenizer) -> Dict[str, Translator]:
+        """Translates the tokenized string to every destination language concurrently, with the shared service."""
+        translators = {
+            dest_lang: self.translator(t) for dest_lang in self.dest_langs
+        }
+        if not self.dry_run:
+            # Create the service and its worker processes before the threads, so that an invalid API key fails once
+            self.pool
+            with ThreadPoolExecutor(max_workers=len(translators)) as executor:
+                futures = [
+                    executor.submit(self._translate, a, dest_lang)
+                    for dest_lang, a in translators.items()
+                ]
+                for future in futures:
+                    future.result()
+        for dest_lang, a in translators.items():
+            self._stage_done("Translator", a, dest_lang)
+        return translators
+
+    def journal_path(self, dest_lang: str) -> Optional[Path]:
+        """Gives the journal file of a destination language, named after it when there are several of them."""
+        if self.journal is None:
+            return None
+        path = Path(self.journal)
+        if len(self.dest_langs) == 1:
+            return path
+        return path.with_name(f"{path.stem}_{dest_lang}{path.suffix}")
+
+    def _translate(self, a: Translator, dest_lang: str) -> None:
+        """Runs the translation stage to a language, recording the translated chunks in its journal as they come.
+
+        The journal is deleted once the translation is complete unless it has to be kept.
+        """
+        started = self._stage_started("Translator", dest_lang)
+        journal_path = self.journal_path(dest_lang)
+        journal = None
+        if journal_path is not None:
+            journal = TranslationJournal(journal_path, resume=self.resume)
+            log.info("---- Journal info ---- %s", journal)
+        try:
+            a.translate(
+                service=self.service,
+                source_lang=self.source_lang,
+                destination_lang=dest_lang,
+                journal=journal,
+                cache=self.cache,
+                progress=self.progress,
+                pool=self.pool,
+            )
+            a.retranslate_unrecoverable(
+                service=self.service,
+                source_lang=self.source_lang,
+                destination_lang=dest_lang,
+                journal=journal,
+                cache=self.cache,
+                progress=self.progress,
+                pool=self.pool,
+            )
+        finally:
+            if journal is not None:
+                journal.close()
+        if self.low_memory:
+            a.release()
+        log.info(
+            "Chunks translated to %s by service: %s",
+            dest_lang,
+            ", ".join(
+                f"{name or 'unknown'} {count}"
+                for name, count in Counter(a.chunk_services).most_common()
+            ),
+        )
+        if journal is not None and not self.keep_journal:
+            journal.remove()
+        self._stage_finished("Translator", started, dest_lang)
+
+    def _rebuild(
+        self,
+        p: Preprocessor,
+        m: Marker,
+        t: Tokenizer,
+        a: Translator,
+        translated: bool = False,
+    ) -> str:
+        """Undoes the stages before translation and gives back the translated LaTeX, or the untranslated one in a dry
+        run unless the translation was restored from a checkpoint."""
+        if self.dry_run and not translated:
+            t.tokenized_string = a.tokenized_string
+        else:
+            t.update_from_translator(a)
+        t.detokenize()
+        m.update_from_tokenizer(t)
+        if self.low_memory:
+            t.release()
+        m.unmark()
+        p.update_from_marker(m)
+        if self.low_memory:
+            m.release()
+        p.rebuild(self.substitution)
+        latex = p.unprocessed_latex
+        if self.low_memory:
+            p.release()
+        return latex
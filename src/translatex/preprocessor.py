@@ -1,7 +1,7 @@
 """This is where all the preparations are made before anything. TransLaTeX preprocessor syntax is handled here."""
 import logging
 import re
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Any, Dict, List, Set
 
 if TYPE_CHECKING:
     from translatex.marker import Marker
@@ -12,8 +12,9 @@ log = logging.getLogger("translatex.preprocessor")
 class Preprocessor:
     """This class processes the preprocessor statements in the given LaTeX string.
 
-    For the time being, the only statement is the manual substitution to avoid certain lines from getting tokenized and
-    sent to translation. It offers a way to override the program's default behavior.
+    There are two statements: the manual substitution to avoid certain lines from getting tokenized and sent to
+    translation, and the ignore region to leave certain lines out of every stage and have them back as is. They offer a
+    way to override the program's default behavior.
 
     In the future, the preprocessor statements can be extended further with new features to enable more fine-tuned
     control of the program's behavior by end users without them having to delve into source code.
@@ -32,6 +33,10 @@ class Preprocessor:
     DEFAULT_REPLACEMENT_BLOCK_SEPERATOR: str = "%@--"
     """Default preprocessor syntax to indicate the separation of original LaTeX and replacement suggestion
     of a TransLaTeX replacement block."""
+    DEFAULT_IGNORE_BLOCK_BEGIN: str = "%@ignore{"
+    """Default preprocessor syntax to indicate the start of a TransLaTeX ignore region."""
+    DEFAULT_IGNORE_BLOCK_END: str = "%@ignore}"
+    """Default preprocessor syntax to indicate the end of a TransLaTeX ignore region."""
     ENABLE_SUBSTITUTION: bool = True
     DISABLE_SUBSTITUTION: bool = False
 
@@ -51,8 +56,10 @@ class Preprocessor:
         """Numbering used in the indicators. Its initial value represents -> first indicator number - 1."""
         self.indicator_format: str = Preprocessor.DEFAULT_INDICATOR_FORMAT
         self._indicator_store: Dict[int, str] = dict()
-        """The dictionary that associates to each indicator the corresponding "manual substitution block" string it
-        replaces."""
+        """The dictionary that associates to each indicator the corresponding "manual substitution block" or "ignore
+        region" string it replaces."""
+        self.missing_indicators: List[str] = list()
+        """The indicators found missing or altered by the last :py:meth:`rebuild`"""
 
     def update_from_marker(self, marker: "Marker") -> None:
         """A convenience method to update the processed LaTeX from a Marker."""
@@ -140,8 +147,44 @@ class Preprocessor:
         ]
         return "".join(string_transformed)
 
+    def release(self) -> None:
+        """Drops the strings held once the next stage took over, keeping the indicator store to rebuild later.
+
+        This is for the low memory mode of :py:class:`~translatex.pipeline.Pipeline`: the stage doesn't keep copies of
+        a document that only the next stages need anymore.
+        """
+        self._base_latex = (
+            self._unprocessed_latex
+        ) = self._processed_latex = str()
+
+    def state(self) -> Dict[str, Any]:
+        """Gives the processed LaTeX and what is needed to rebuild it, as JSON serializable values.
+
+        See :py:meth:`from_state` and :py:class:`~translatex.checkpoint.Checkpoint`.
+        """
+        return {
+            "processed_latex": self._processed_latex,
+            "indicator_format": self._indicator_format,
+            "indicator_count": self.indicator_count,
+            "indicator_store": list(self._indicator_store.items()),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "Preprocessor":
+        """Another constructor that creates a Preprocessor ready to rebuild from a state given by :py:meth:`state`."""
+        preprocessor = cls(str())
+        preprocessor.indicator_format = state["indicator_format"]
+        preprocessor.processed_latex = state["processed_latex"]
+        preprocessor.indicator_count = state["indicator_count"]
+        preprocessor._indicator_store = {
+            int(indicator): value
+            for indicator, value in state["indicator_store"]
+        }
+        return preprocessor
+
     def process(self) -> None:
-        r"""This operation makes the Preprocessor replace all manual substitution blocks with indicators.
+        r"""This operation makes the Preprocessor replace all ignore regions and manual substitution blocks with
+        indicators.
 
         The replaced string gets saved into a dictionary to be used in rebuilding later. The whole block,
         meaning complete lines are taken into account. Any other text located after the "begin/end" statements on the
@@ -179,6 +222,23 @@ class Preprocessor:
         After the rebuild, the place where a manual substitution took place gets annotated by TransLaTeX for end users to
         locate them easier when proofreading.
 
+        Ignore regions are replaced first, each one with a single indicator, from the line of the "begin" statement to
+        the end of the line of the "end" statement. Since an indicator is a LaTeX comment, the region costs no parsing
+        by the Marker, no pass of the Tokenizer and no characters sent to translation. It is put back as is during the
+        rebuild, statements included, whether substitution is enabled or not. Ignore regions can't be nested, and
+        manual substitution blocks inside of them are left untouched. An ignore region inside a manual substitution
+        block goes with the lines it is part of: dropped with the original lines, kept as is with the replacement.
+
+        For example:
+
+        .. code-block:: latex
+
+            %@ignore{ A large table, nothing to translate
+            \begin{tabular}{ll}
+            ...
+            \end{tabular}
+            %@ignore}
+
         The resulting string is stored in an instance variable for processed LaTeX.
 
         Raises:
@@ -188,6 +248,7 @@ class Preprocessor:
         current_string = self._unprocessed_latex
         if not current_string:
             raise ValueError("Unprocessed string is empty, nothing to process")
+        current_string = self._process_ignored(current_string)
         pattern = re.compile(
             re.escape(Preprocessor.DEFAULT_REPLACEMENT_BLOCK_BEGIN)
             + r"[\s\S]*"
@@ -210,6 +271,49 @@ class Preprocessor:
                 all_replaced = True
         self._processed_latex = current_string
 
+    def _process_ignored(self, latex: str) -> str:
+        pattern = re.compile(
+            re.escape(Preprocessor.DEFAULT_IGNORE_BLOCK_BEGIN)
+            + r"[\s\S]*?"
+            + re.escape(Preprocessor.DEFAULT_IGNORE_BLOCK_END)
+            + r".*"
+        )
+
+        def replace(match: re.Match) -> str:
+            self._indicator_store[self.indicator_count + 1] = match[0]
+            return self._next_indicator()
+
+        first_indicator = self.indicator_count + 1
+        latex = pattern.sub(replace, latex)
+        ignored = self.indicator_count + 1 - first_indicator
+        if ignored:
+            log.info(
+                "%d ignore region(s), %d characters left out",
+                ignored,
+                sum(
+                    len(self._indicator_store[indicator])
+                    for indicator in range(
+                        first_indicator, self.indicator_count + 1
+                    )
+                ),
+            )
+        if Preprocessor.DEFAULT_IGNORE_BLOCK_BEGIN in latex:
+            log.warning(
+                f"Ignore region without an end: {Preprocessor.DEFAULT_IGNORE_BLOCK_END} missing, left as is"
+            )
+        return latex
+
+    def _ignored_in(self, block: str) -> List[int]:
+        """The indicators of the ignore regions caught inside a manual substitution block, the last ones first."""
+        return [
+            indicator
+            for indicator in sorted(self._indicator_store, reverse=True)
+            if self._indicator_store[indicator].startswith(
+                Preprocessor.DEFAULT_IGNORE_BLOCK_BEGIN
+            )
+            and self._indicator_format.format(indicator) in block
+        ]
+
     def rebuild(
         self, substitution_setting: bool = ENABLE_SUBSTITUTION
     ) -> None:
@@ -219,7 +323,9 @@ class Preprocessor:
         When disabled, the manual replacement blocks are reintroduced back into the string as is and no substitution
         occurs. Otherwise, by default, the second half of the block indicated by the delimiter is extracted, rid of
         any preceding LaTeX line comment or space characters and put where the corresponding indicator is standing in
-        the string prepended with an annotation on a new line. See docstring for :py:meth:`process`.
+        the string prepended with an annotation on a new line. See docstring for :py:meth:`process`. Ignore regions
+        are always reintroduced as is, those caught inside a manual replacement block too unless they are part of the
+        original lines it replaces.
 
         The resulting string is stored in an instance variable for unprocessed LaTeX.
 
@@ -232,28 +338,49 @@ class Preprocessor:
         current_string = self._processed_latex
         if not current_string:
             raise ValueError("Processed string is empty, nothing to rebuild")
+        self.missing_indicators = list()
         pattern = re.compile(
             re.escape(Preprocessor.DEFAULT_REPLACEMENT_BLOCK_SEPERATOR)
             + r".*\n([\s\S]*)\n\s*"
             + re.escape(Preprocessor.DEFAULT_REPLACEMENT_BLOCK_END)
         )
-        # To filter out any line comment characters and spaces
-        pattern2 = re.compile(r"^(\s*)[%\s]*", re.MULTILINE)
-        for indicator, value in self._indicator_store.items():
-            replacement_string = value
-            if substitution_setting:
-                replacement_string = (
-                    Preprocessor.DEFAULT_OPERATION_STAMP
-                    + "\n"
-                    + pattern2.sub(
-                        r"\1", pattern.search(replacement_string)[1]
+        # To filter out any line comment characters and spaces, except before the indicators of ignore regions
+        pattern2 = re.compile(
+            r"^(\s*)(?!\s|"
+            + re.escape(self._indicator_format.split("{}")[0])
+            + r")[%\s]*",
+            re.MULTILINE,
+        )
+        restored = set()
+        # The last indicators first, so that "..._1" never replaces the beginning of "..._12"
+        for indicator in sorted(self._indicator_store, reverse=True):
+            if indicator in restored:
+                continue
+            replacement_string = self._indicator_store[indicator]
+            if not replacement_string.startswith(
+                Preprocessor.DEFAULT_IGNORE_BLOCK_BEGIN
+            ):
+                nested = self._ignored_in(replacement_string)
+                restored.update(nested)
+                if substitution_setting:
+                    replacement_string = (
+                        Preprocessor.DEFAULT_OPERATION_STAMP
+                        + "\n"
+                        + pattern2.sub(
+                            r"\1", pattern.search(replacement_string)[1]
+                        )
+                    )
+                for nested_indicator in nested:
+                    replacement_string = replacement_string.replace(
+                        self._indicator_format.format(nested_indicator),
+                        self._indicator_store[nested_indicator],
                     )
-                )
             formatted_indicator = self._indicator_format.format(indicator)
             if current_string.count(formatted_indicator) == 0:
                 log.error(
                     f"Missing or altered indicator: {formatted_indicator} --> during stage PREPROCESSOR"
                 )
+                self.missing_indicators.append(formatted_indicator)
             else:
                 current_string = current_string.replace(
                     formatted_indicator, replacement_string
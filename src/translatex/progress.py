@@ -0,0 +1,273 @@
+"""Progress events of the pipeline, to follow long translations as they go.
+
+A :py:class:`Progress` is given to a :py:class:`~translatex.pipeline.Pipeline` (every pipeline has one, see
+:py:attr:`~translatex.pipeline.Pipeline.progress`), which passes it on to the translation stage of each language. Both
+emit events as plain dictionaries to the functions subscribed to it, from the thread doing the work. Each event has an
+``event`` kind, one of :py:attr:`Progress.EVENTS`, the ``time`` it was emitted at as a Unix timestamp and fields of its
+own:
+
+- ``stage_started``: ``stage``, ``dest_lang`` (``None`` for the stages shared by all the languages)
+- ``stage_finished``: ``stage``, ``dest_lang`` and the ``seconds`` the stage took
+- ``translation_planned``: ``dest_lang`` and the ``characters`` to translate to it
+- ``chunks_reused``: ``dest_lang``, the number of ``chunks`` and their ``characters``, taken from the ``source``
+  (``journal``, ``cache`` or ``duplicate``) instead of being sent
+- ``chunks_sent``: ``dest_lang``, the number of ``chunks`` in the API call, their ``characters`` and whether it's a
+  ``retry``
+- ``chunks_received``: the same fields, plus the ``received_characters``, the ``seconds`` the call took and the
+  ``service`` that answered
+- ``chunks_retried``: ``dest_lang``, the number of ``chunks`` and their ``characters``, translated again because they
+  lost tokens
+- ``document_rebuilt``: ``dest_lang``, the ``seconds`` undoing the stages took and the numbers of
+  ``missing_tokens``, ``missing_markers`` and ``missing_indicators`` found missing or altered while undoing them
+
+The progress object keeps the totals of the events (see :py:attr:`Progress.stats`) and estimates the time left to
+translate from the throughput observed since the first translation was planned. :py:class:`ProgressBar` draws them on
+a terminal and :py:class:`JsonLinesWriter` writes the events to a file, one JSON object per line::
+
+    pipeline = Pipeline(service="DeepL", dest_langs=["fr", "de"])
+    pipeline.progress.subscribe(lambda event: print(event["event"]))
+    with open("events.jsonl", "w") as f:
+        pipeline.progress.subscribe(JsonLinesWriter(f))
+        pipeline.run(latex)
+"""
+import json
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+Subscriber = Callable[[Dict[str, Any]], None]
+"""Called with every event emitted, see :py:mod:`translatex.progress` for their fields."""
+
+
+class Progress:
+    """Emits the progress events of the runs of a pipeline to its subscribers and keeps their totals.
+
+    Events can be emitted from several threads, e.g. by the translations to several languages. They are handed to the
+    subscribers one at a time, in the order they were emitted.
+
+    Attributes:
+        stage: The stage running, or the last one started, ``None`` before the first one.
+        stats: The numbers of chunks sent, received, reused and translated again and of characters sent and received,
+            over all the languages, since the last :py:meth:`reset`.
+
+    """
+
+    EVENTS = (
+        "stage_started",
+        "stage_finished",
+        "translation_planned",
+        "chunks_reused",
+        "chunks_sent",
+        "chunks_received",
+        "chunks_retried",
+        "document_rebuilt",
+    )
+    """The kinds of events"""
+
+    def __init__(self) -> None:
+        self._subscribers: List[Subscriber] = list()
+        self._lock = threading.RLock()
+        self.reset()
+
+    def __str__(self) -> str:
+        return (
+            f"The progress has {len(self._subscribers)} subscriber(s), {self.stats['chunks_received']} chunk(s) "
+            f"translated."
+        )
+
+    def reset(self) -> None:
+        """Clears the totals, for a new run."""
+        with self._lock:
+            self._totals: Dict[Optional[str], int] = dict()
+            self._done: Dict[Optional[str], int] = dict()
+            self._started: Optional[float] = None
+            self._translated = 0
+            self.stage: Optional[str] = None
+            self.stats: Dict[str, int] = dict.fromkeys(
+                (
+                    "chunks_sent",
+                    "chunks_received",
+                    "chunks_reused",
+                    "chunks_retried",
+                    "characters_sent",
+                    "characters_received",
+                ),
+                0,
+            )
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        """Adds a function to call with every event, see :py:data:`Subscriber`."""
+        with self._lock:
+            self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Removes a function added with :py:meth:`subscribe`."""
+        with self._lock:
+            self._subscribers.remove(subscriber)
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Updates the totals with an event and hands it to the subscribers.
+
+        Raises:
+            ValueError: If the kind of event is unknown
+
+        """
+        if event not in Progress.EVENTS:
+            raise ValueError(
+                f"Unknown event, choose one of: {', '.join(Progress.EVENTS)}"
+            )
+        contents = {"event": event, "time": time.time(), **fields}
+        with self._lock:
+            self._count(contents)
+            for subscriber in self._subscribers:
+                subscriber(contents)
+
+    def _count(self, event: Dict[str, Any]) -> None:
+        kind = event["event"]
+        dest_lang = event.get("dest_lang")
+        if kind == "stage_started":
+            self.stage = event["stage"]
+        elif kind == "translation_planned":
+            if self._started is None:
+                self._started = time.monotonic()
+            self._totals[dest_lang] = event["characters"]
+            self._done[dest_lang] = 0
+        elif kind == "chunks_reused":
+            self.stats["chunks_reused"] += event["chunks"]
+            self._done[dest_lang] = (
+                self._done.get(dest_lang, 0) + event["characters"]
+            )
+        elif kind == "chunks_sent":
+            self.stats["chunks_sent"] += event["chunks"]
+            self.stats["characters_sent"] += event["characters"]
+        elif kind == "chunks_received":
+            self.stats["chunks_received"] += event["chunks"]
+            self.stats["characters_received"] += event["received_characters"]
+            if not event["retry"]:
+                self._translated += event["characters"]
+                self._done[dest_lang] = (
+                    self._done.get(dest_lang, 0) + event["characters"]
+                )
+        elif kind == "chunks_retried":
+            self.stats["chunks_retried"] += event["chunks"]
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """The share of the characters to translate that were translated or reused, ``None`` before planning."""
+        with self._lock:
+            total = sum(self._totals.values())
+            if not total:
+                return None
+            return min(sum(self._done.values()) / total, 1.0)
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """The characters sent and translated per second since the first translation was planned, ``None`` before any.
+
+        The chunks reused from a journal, a cache or an earlier duplicate don't count, they take no time.
+        """
+        with self._lock:
+            if self._started is None:
+                return None
+            elapsed = time.monotonic() - self._started
+            if not elapsed or not self._translated:
+                return None
+            return self._translated / elapsed
+
+    @property
+    def eta(self) -> Optional[float]:
+        """The estimated seconds left to translate at the observed :py:attr:`throughput`, ``None`` if unknown."""
+        with self._lock:
+            throughput = self.throughput
+            if throughput is None:
+                return None
+            remaining = sum(self._totals.values()) - sum(self._done.values())
+            return max(remaining, 0) / throughput
+
+
+class JsonLinesWriter:
+    """Subscriber writing every event to a text file as a line of JSON, flushed right away for other programs to read
+    as it goes."""
+
+    def __init__(self, fp: TextIO) -> None:
+        self.fp = fp
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        self.fp.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self.fp.flush()
+
+
+class ProgressBar:
+    """Subscriber drawing the stage running, and the progress of the translation with its estimated time left, on a
+    single line of a terminal."""
+
+    DEFAULT_WIDTH: int = 30
+    """The number of characters of the bar"""
+    DEFAULT_INTERVAL: float = 0.1
+    """The minimum seconds between two redraws, the start of a stage always redraws"""
+
+    def __init__(
+        self,
+        progress: Progress,
+        stream: Optional[TextIO] = None,
+        width: int = DEFAULT_WIDTH,
+        interval: float = DEFAULT_INTERVAL,
+    ) -> None:
+        """Creates a progress bar subscribed to the given progress.
+
+        Args:
+            progress: The progress to draw
+            stream: The terminal to draw on, ``stderr`` by default
+            width: The number of characters of the bar
+            interval: The minimum seconds between two redraws
+
+        """
+        self.progress = progress
+        self.stream = stream or sys.stderr
+        self.width = width
+        self.interval = interval
+        self._drawn = 0.0
+        self._length = 0
+        progress.subscribe(self)
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        if (
+            event["event"] != "stage_started"
+            and now - self._drawn < self.interval
+        ):
+            return
+        self._drawn = now
+        self.draw()
+
+    def render(self) -> str:
+        """Gives the line drawn for the current progress."""
+        line = f"{self.progress.stage or 'Starting'}"
+        fraction = self.progress.fraction
+        if self.progress.stage != "Translator" or fraction is None:
+            return line
+        filled = round(fraction * self.width)
+        line += (
+            f" [{'#' * filled}{'-' * (self.width - filled)}] {fraction:4.0%}"
+        )
+        eta = self.progress.eta
+        if eta is not None:
+            minutes, seconds = divmod(round(eta), 60)
+            hours, minutes = divmod(minutes, 60)
+            line += f" ETA {hours}:{minutes:02d}:{seconds:02d}"
+        return line
+
+    def draw(self) -> None:
+        """Draws the current progress over the previous line."""
+        line = self.render()
+        self.stream.write(f"\r{line.ljust(self._length)}")
+        self.stream.flush()
+        self._length = len(line)
+
+    def close(self) -> None:
+        """Draws the final progress and ends the line, the next event drawing on a new one."""
+        self.draw()
+        self.stream.write("\n")
+        self.stream.flush()
+        self._length = 0
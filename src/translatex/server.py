@@ -0,0 +1,466 @@
+"""A long running local HTTP server translating LaTeX documents with warm pipelines.
+
+Every run of the command line program pays for starting Python, importing the translation libraries, loading the
+sentence tokenizer and creating the translation service. The server pays for them once: it keeps the services it was
+asked for, and the worker processes of the CPU bound ones, for as long as it runs. Every document gets a
+:py:class:`~translatex.pipeline.Pipeline` of its own using them, so that documents translated at the same time don't
+share the progress of their runs.
+
+Documents are posted as JSON to :py:attr:`TranslationServer.TRANSLATE_PATH`::
+
+    {"latex": "...", "source_lang": "en", "dest_langs": ["fr", "de"], "service": "DeepL"}
+
+and answered with the translated LaTeX of each language and statistics on the run::
+
+    {"outputs": {"fr": "...", "de": "..."}, "stats": {"seconds": 1.2, "queue_seconds": 0.0, "chunks_sent": 4, ...}}
+
+Only the ``latex`` field is required, the others default to the options the server was started with. Documents are
+translated by a pool of workers, the ones waiting for a worker are queued up to a limit past which the server answers
+503 (busy) right away. :py:attr:`TranslationServer.HEALTH_PATH` answers with the state of the server.
+
+Start it with::
+
+    translatex serve --port 8765 --workers 4 --service "Google Translate" -sl en -dl fr
+
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from .pipeline import Pipeline, Result
+from .progress import Progress
+from .translator import (
+    TRANSLATION_SERVICE_CLASSES,
+    ApiKeyError,
+    ServiceProcessPool,
+    TranslationService,
+    Translator,
+    add_custom_translation_services,
+)
+
+log = logging.getLogger("translatex.server")
+
+
+class ServerBusyError(Exception):
+    """Raised when a document can't be queued because the queue of the server is full."""
+
+
+class TranslationServer:
+    """Local HTTP server translating LaTeX documents with a pool of workers running pipelines with warm services.
+
+    At most :py:attr:`workers` documents are translated at the same time and at most :py:attr:`queue_size` more wait
+    for a worker. The translation services are created on their first use and shared by all the pipelines using them,
+    and so are the worker processes of the CPU bound ones until the server stops.
+
+    The server can be used as a context manager to start it in a background thread and stop it at the end.
+    """
+
+    DEFAULT_HOST: str = "127.0.0.1"
+    DEFAULT_PORT: int = 8765
+    DEFAULT_WORKERS: int = 2
+    DEFAULT_QUEUE_SIZE: int = 16
+    TRANSLATE_PATH: str = "/translate"
+    HEALTH_PATH: str = "/health"
+
+    def __init__(
+        self,
+        service: Union[str, TranslationService] = Translator.DEFAULT_SERVICE,
+        source_lang: str = Translator.DEFAULT_SOURCE_LANG,
+        dest_langs: Union[str, Sequence[str]] = Translator.DEFAULT_DEST_LANG,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        """Creates a server, listening as soon as it is created.
+
+        Args:
+            service: The default translation service, or the name of one
+            source_lang: The default language of the documents
+            dest_langs: The default language to translate to, or several of them
+            host: The address to listen on
+            port: The port to listen on, zero to let the system choose a free one
+            workers: How many documents are translated at the same time
+            queue_size: How many documents can wait for a worker
+
+        Raises:
+            ValueError: If there are no workers or the queue size is negative
+
+        """
+        if workers < 1 or queue_size < 0:
+            raise ValueError(
+                "At least one worker and a positive queue size are needed"
+            )
+        self.source_lang = source_lang
+        self.dest_langs: List[str] = TranslationServer.languages(dest_langs)
+        self.workers = workers
+        self.queue_size = queue_size
+        self._services: Dict[str, TranslationService] = dict()
+        if isinstance(service, str):
+            self.service_name = service
+        else:
+            self.service_name = service.name
+            self._services[service.name] = service
+        self._pools: Dict[str, ServiceProcessPool] = dict()
+        """The worker processes of each CPU bound service"""
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="translatex-server"
+        )
+        self._started = time.monotonic()
+        self.stats: Dict[str, int] = dict.fromkeys(
+            ("queued", "running", "completed", "failed", "rejected"), 0
+        )
+        """The documents waiting for a worker and being translated, and counters of the ones translated, failed and
+        rejected because the queue was full."""
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "TranslationServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """Starts answering requests in a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        log.info("Translation server listening on %s", self.url)
+
+    def serve_forever(self) -> None:
+        """Answers requests in the current thread until interrupted."""
+        log.info("Translation server listening on %s", self.url)
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            self._close()
+
+    def stop(self) -> None:
+        """Stops the server, waits for the documents being translated and frees the port."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._close()
+
+    def _close(self) -> None:
+        """Waits for the documents being translated, then stops the worker processes of the services."""
+        self._executor.shutdown()
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
+
+    def health(self) -> Dict[str, Any]:
+        """Gives the state of the server: its workers, queue, counters and uptime."""
+        with self._lock:
+            return {
+                "status": "ok",
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                **self.stats,
+                "services": sorted(self._services),
+                "uptime": time.monotonic() - self._started,
+            }
+
+    @staticmethod
+    def languages(dest_langs: Union[str, Sequence[str]]) -> List[str]:
+        """Gives the languages to translate to, a string being split on commas like on the command line, without
+        duplicates.
+
+        Raises:
+            ValueError: If there is no language
+
+        """
+        if isinstance(dest_langs, str):
+            dest_langs = dest_langs.split(",")
+        codes = [code.strip() for code in dest_langs if code.strip()]
+        if not codes:
+            raise ValueError("No language to translate to")
+        return list(dict.fromkeys(codes))
+
+    def pipeline(
+        self,
+        service: Optional[str] = None,
+        source_lang: Optional[str] = None,
+        dest_langs: Optional[Union[str, Sequence[str]]] = None,
+    ) -> Pipeline:
+        """Gives a new pipeline for a service and languages, with the warm service, created on first use.
+
+        Pipelines are cheap to create, every document gets one of its own since a pipeline runs one document at a time.
+
+        Raises:
+            ValueError: If the service is unknown or there's no language
+            ApiKeyError: If the API key of the service is missing
+
+        """
+        service = service or self.service_name
+        if service not in self._services and (
+            service not in TRANSLATION_SERVICE_CLASSES
+        ):
+            raise ValueError(f"Unknown translation service: {service}")
+        dest_langs = (
+            TranslationServer.languages(dest_langs)
+            if dest_langs
+            else self.dest_langs
+        )
+        with self._lock:
+            if service not in self._services:
+                self._services[service] = TRANSLATION_SERVICE_CLASSES[
+                    service
+                ]()
+            if self._services[service].cpu_bound and (
+                service not in self._pools
+            ):
+                self._pools[service] = ServiceProcessPool(
+                    self._services[service]
+                )
+            return Pipeline(
+                service=self._services[service],
+                source_lang=source_lang or self.source_lang,
+                dest_langs=dest_langs,
+                pool=self._pools.get(service),
+            )
+
+    def translate(
+        self,
+        latex: str,
+        service: Optional[str] = None,
+        source_lang: Optional[str] = None,
+        dest_langs: Optional[Union[str, Sequence[str]]] = None,
+    ) -> Dict[str, Any]:
+        """Queues a document for a worker, waits for its translation and gives it back with statistics on the run.
+
+        Raises:
+            ServerBusyError: If the queue is full
+            ValueError: If the service is unknown, there's no language or nothing to translate
+
+        """
+        # Invalid requests fail before taking a place in the queue, they aren't counted
+        pipeline = self.pipeline(service, source_lang, dest_langs)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise ServerBusyError(
+                f"{self.workers} documents are being translated and "
+                f"{self.queue_size} are waiting, try again later"
+            )
+        queued = time.monotonic()
+        with self._lock:
+            self.stats["queued"] += 1
+        try:
+            return self._executor.submit(
+                self._run, queued, latex, pipeline
+            ).result()
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        finally:
+            self._slots.release()
+
+    def _run(
+        self, queued: float, latex: str, pipeline: Pipeline
+    ) -> Dict[str, Any]:
+        started = time.monotonic()
+        with self._lock:
+            self.stats["queued"] -= 1
+            self.stats["running"] += 1
+        try:
+            result = pipeline.run(latex)
+        finally:
+            with self._lock:
+                self.stats["running"] -= 1
+        with self._lock:
+            self.stats["completed"] += 1
+        return {
+            "outputs": result.outputs,
+            "stats": TranslationServer.run_stats(
+                result,
+                started - queued,
+                time.monotonic() - started,
+                pipeline.progress,
+            ),
+        }
+
+    @staticmethod
+    def run_stats(
+        result: Result,
+        queue_seconds: float,
+        seconds: float,
+        progress: Optional[Progress] = None,
+    ) -> Dict[str, Any]:
+        """Gives the statistics of a run: its timings, the number of chunks of each language with the services that
+        translated them, and the totals of the progress of the run if given (see
+        :py:attr:`~translatex.progress.Progress.stats`)."""
+        return {
+            **(progress.stats if progress is not None else dict()),
+            "queue_seconds": queue_seconds,
+            "seconds": seconds,
+            "characters": len(result.preprocessor.base_latex),
+            "languages": {
+                dest_lang: {
+                    "chunks": len(a.chunk_services),
+                    "services": Counter(a.chunk_services),
+                    "unrecoverable_chunks": len(a.unrecoverable_chunks),
+                }
+                for dest_lang, a in result.translators.items()
+            },
+        }
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                log.debug(format, *args)
+
+            def _answer(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 503:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path == TranslationServer.HEALTH_PATH:
+                    self._answer(200, server.health())
+                else:
+                    self._answer(404, {"error": "Not found"})
+
+            def do_POST(self) -> None:
+                if self.path != TranslationServer.TRANSLATE_PATH:
+                    self._answer(404, {"error": "Not found"})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    fields = json.loads(self.rfile.read(length).decode())
+                    answer = server.translate(
+                        fields["latex"],
+                        fields.get("service"),
+                        fields.get("source_lang"),
+                        fields.get("dest_langs"),
+                    )
+                except ServerBusyError as e:
+                    self._answer(503, {"error": str(e)})
+                except (ValueError, KeyError, TypeError, ApiKeyError) as e:
+                    self._answer(400, {"error": f"Bad request: {e}"})
+                except Exception as e:
+                    log.exception("Translation failed")
+                    self._answer(500, {"error": str(e)})
+                else:
+                    self._answer(200, answer)
+
+        return Handler
+
+
+def parse_args(args: Sequence[str]) -> argparse.Namespace:
+    """Argument parser for the ``serve`` mode of TransLaTeX."""
+    parser = argparse.ArgumentParser(
+        prog="translatex serve",
+        description="Translate LaTeX documents posted to a local HTTP server",
+    )
+    parser.add_argument("--host", default=TranslationServer.DEFAULT_HOST)
+    parser.add_argument(
+        "--port", type=int, default=TranslationServer.DEFAULT_PORT
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=TranslationServer.DEFAULT_WORKERS,
+        help="Documents translated at the same time (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=TranslationServer.DEFAULT_QUEUE_SIZE,
+        help="Documents waiting for a worker before the server answers busy (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-sl",
+        "--src-lang",
+        default=Translator.DEFAULT_SOURCE_LANG,
+        help="Default language of the documents (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-dl",
+        "--dest-lang",
+        default=Translator.DEFAULT_DEST_LANG,
+        help="Default comma separated languages to translate to (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--service",
+        default=Translator.DEFAULT_SERVICE.name,
+        help="Default translation service (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-ca",
+        "--custom_api",
+        type=argparse.FileType("r"),
+        help="Python file that provides a custom translation service class",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="Output information logs, of the requests too with -vv",
+    )
+    return parser.parse_args(args)
+
+
+def main(args: Sequence[str]) -> None:
+    """Run the translation server until interrupted."""
+    args = parse_args(args)
+    logging.basicConfig(
+        level=(logging.WARNING, logging.INFO, logging.DEBUG)[
+            min(args.verbose, 2)
+        ],
+        format="%(name)s: %(levelname)s %(message)s",
+    )
+    if args.custom_api:
+        add_custom_translation_services(args.custom_api)
+    try:
+        server = TranslationServer(
+            service=args.service,
+            source_lang=args.src_lang,
+            dest_langs=args.dest_lang,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            queue_size=args.queue_size,
+        )
+        # Create the default service and load its libraries before the first document
+        server.pipeline()
+    except (ValueError, ApiKeyError) as e:
+        log.error(e)
+        sys.exit(1)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])  # pragma: no cover
@@ -0,0 +1,238 @@
+"""Marking of large documents split in shards at their sections, in a pool of worker processes.
+
+Marking is by far the slowest stage of the pipeline: TexSoup parses the whole document in pure Python, on a single core.
+:py:func:`split_shards` cuts the body of the document right before its ``\\chapter`` and ``\\section`` commands into
+shards of about the same size, and :py:func:`mark_sharded` parses and marks each shard in its own process. Each shard
+numbers its markers from a range of its own, starting at the position of the shard in the document: a marker replaces
+at least one character, so that the ranges can't overlap and the stores of the shards are merged as they are, without
+renumbering any marker. The marked shards are put back together into a single :py:class:`~translatex.marker.Marker`,
+so that the next stages, and the translation scheduler in particular, see one document.
+
+The preamble and the ``document`` environment are marked apart, in the main process, with the body replaced by a
+placeholder.
+
+Sharding also bounds the memory used for marking: a parse tree takes many times the size of the text it was parsed
+from, and only the tree of the shard being marked is alive in each process. With a maximum shard length, a document
+is cut into more shards than workers, each one parsed after the previous one was freed. With a single worker, the
+shards are marked one after the other in the current process.
+"""
+import gc
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import regex as re
+
+from .constructs import DEFAULT_TABLES, ConstructTables
+from .marker import Marker
+
+log = logging.getLogger("translatex.sharding")
+
+BODY_PLACEHOLDER: str = "TRANSLATEXSHARDEDBODY"
+"""Plain text standing for the body while the rest of the document is marked, left untouched by marking"""
+
+SHARD_BOUNDARY_REGEX = re.compile(
+    r"(?P<comment>(?<!\\)%.*)"
+    r"|(?P<begin>\\begin\s*\{)"
+    r"|(?P<end>\\end\s*\{)"
+    r"|^[ \t]*(?P<section>\\(?:chapter|section)\b)",
+    re.MULTILINE,
+)
+"""Finds what decides where a shard can start: the sections, outside of any environment and comment"""
+
+
+def split_shards(latex: str, count: int) -> Tuple[str, List[str], str]:
+    """Splits a document in the parts before, inside and after its body, the body being cut in shards.
+
+    The body is only cut right before a ``\\chapter`` or ``\\section`` command that starts a line outside of any
+    environment. Consecutive sections are grouped into at most ``count`` shards of about the same length.
+
+    Args:
+        latex: The LaTeX document, already preprocessed
+        count: The number of shards wanted
+
+    Returns:
+        The text up to the start of the body, the shards of the body and the text after the body. The first and last
+        ones are empty if there is no ``document`` environment, the whole text being the body then.
+
+    """
+    begin = latex.find("\\begin{document}")
+    end = latex.rfind("\\end{document}")
+    if begin == -1 or end < begin:
+        head, body, tail = str(), latex, str()
+    else:
+        begin += len("\\begin{document}")
+        head, body, tail = latex[:begin], latex[begin:end], latex[end:]
+    cuts = [0]
+    depth = 0
+    for match in SHARD_BOUNDARY_REGEX.finditer(body):
+        if match["begin"]:
+            depth += 1
+        elif match["end"]:
+            depth -= 1
+        elif match["section"] and depth == 0 and match.start() > 0:
+            cuts.append(match.start())
+    cuts.append(len(body))
+    # Group the sections into shards of about the same length
+    shards: List[str] = list()
+    target = len(body) / max(count, 1)
+    start = 0
+    for cut in cuts[1:]:
+        if cut - start >= target or cut == len(body):
+            if cut > start:
+                shards.append(body[start:cut])
+            start = cut
+    return head, shards, tail
+
+
+def _mark_shard(
+    latex: str,
+    marker_format: str,
+    first_marker: int,
+    tables: ConstructTables = DEFAULT_TABLES,
+) -> Tuple[str, Dict[int, str], int]:
+    """Marks a shard in a worker process, numbering its markers after the given one.
+
+    Returns:
+        The marked shard, its marker store and the number of its last marker
+
+    """
+    marker = Marker(latex)
+    marker.marker_format = marker_format
+    marker.tables = tables
+    marker.marker_count = first_marker
+    marker.mark()
+    state = marker.state()
+    return (
+        state["marked_latex"],
+        dict(state["marker_store"]),
+        state["marker_count"],
+    )
+
+
+def mark_sharded(
+    latex: str,
+    marker_format: str = Marker.DEFAULT_MARKER_FORMAT,
+    max_workers: Optional[int] = None,
+    tables: ConstructTables = DEFAULT_TABLES,
+    max_shard_length: int = 0,
+) -> Marker:
+    """Marks a document split in shards (see :py:func:`split_shards`) in a pool of worker processes.
+
+    A document that can't be split is marked in the current process instead. So is one whose shards couldn't be
+    merged, because their marker ranges overlap or because the placeholder of the body wasn't left as is, with a
+    warning.
+
+    Args:
+        latex: The LaTeX document, already preprocessed
+        marker_format: The format string of the markers
+        max_workers: How many worker processes to use and shards to make, the number of CPUs by default
+        tables: The environments and commands marked apart, see :py:mod:`~translatex.constructs`
+        max_shard_length: The length of text the shards should stay under, as far as the sections allow, for more
+            shards than workers if needed, zero for one shard per worker
+
+    Returns:
+        A marker holding the marked document and the markers of all the shards, as if it had marked the whole document
+
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    count = max_workers
+    if max_shard_length > 0:
+        count = max(count, math.ceil(len(latex) / max_shard_length))
+    head, shards, tail = split_shards(latex, count)
+    if len(shards) > 1:
+        marker = _merge_shards(
+            head, shards, tail, marker_format, max_workers, tables
+        )
+        if marker is not None:
+            return marker
+    marker = Marker(latex)
+    marker.marker_format = marker_format
+    marker.tables = tables
+    marker.mark()
+    return marker
+
+
+def _merge_shards(
+    head: str,
+    shards: List[str],
+    tail: str,
+    marker_format: str,
+    max_workers: int,
+    tables: ConstructTables = DEFAULT_TABLES,
+) -> Optional[Marker]:
+    """Marks the shards in worker processes, or here with a single worker, and the rest of the document here, then
+    merges them into one marker.
+
+    Returns:
+        The merged marker, or ``None`` if the shards can't be merged
+
+    """
+    frame = Marker(f"{head}{BODY_PLACEHOLDER}{tail}" if head else str())
+    frame.marker_format = marker_format
+    frame.tables = tables
+    if head:
+        frame.mark()
+    state = frame.state()
+    store: Dict[int, str] = dict(state["marker_store"])
+    # The range of each shard starts at its position in the body
+    first_markers = list()
+    position = state["marker_count"]
+    for shard in shards:
+        first_markers.append(position)
+        position += len(shard)
+    arguments = (
+        shards,
+        [marker_format] * len(shards),
+        first_markers,
+        [tables] * len(shards),
+    )
+    if max_workers == 1:
+        log.info("Marking %d shard(s) one after the other", len(shards))
+        results = list()
+        for shard_arguments in zip(*arguments):
+            results.append(_mark_shard(*shard_arguments))
+            # Free the parse tree of the shard before parsing the next one
+            gc.collect()
+    else:
+        log.info(
+            "Marking %d shard(s) with %d worker process(es)",
+            len(shards),
+            min(max_workers, len(shards)),
+        )
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(shards)),
+            mp_context=multiprocessing.get_context(),
+        ) as executor:
+            results = list(executor.map(_mark_shard, *arguments))
+    for index, (_, shard_store, last_marker) in enumerate(results):
+        if index + 1 < len(results) and last_marker > first_markers[index + 1]:
+            log.warning(
+                "The markers of shard %d overflowed their range, marking the whole document at once",
+                index,
+            )
+            return None
+        store.update(shard_store)
+    body = "".join(marked for marked, _, _ in results)
+    if head:
+        if state["marked_latex"].count(BODY_PLACEHOLDER) != 1:
+            log.warning(
+                "The body placeholder got altered, marking the whole document at once"
+            )
+            return None
+        marked_latex = state["marked_latex"].replace(BODY_PLACEHOLDER, body)
+    else:
+        marked_latex = body
+    return Marker.from_state(
+        {
+            "marked_latex": marked_latex,
+            "marker_format": marker_format,
+            "marker_count": max(
+                [state["marker_count"]] + [last for _, _, last in results]
+            ),
+            "marker_store": list(store.items()),
+        }
+    )
@@ -6,10 +6,21 @@ and the tokens left. The tokens are to be chosen in a way that won't disturb the
 during the said process.
 """
 import logging
-from typing import TYPE_CHECKING, Dict
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import regex as re
 
+from .constructs import DEFAULT_TABLES, ConstructTables
 from .data import *
 from .marker import Marker
 
@@ -36,6 +47,16 @@ class Tokenizer:
     DEFAULT_TOKEN_SUBLIMIT: int = 16
     DEFAULT_TOKEN_FORMAT: str = "[{}-{}]"
     DEFAULT_DETOKENIZER_CONTENT_INDICATOR: str = "%%"
+    ENGINE_PASSES: str = "passes"
+    """Tokenization engine that runs one regex substitution pass for each kind of structure, one after the other."""
+    ENGINE_SINGLE_SCAN: str = "single-scan"
+    """Tokenization engine that walks the marked string once with a combined regex."""
+    ENGINES: Tuple[str, ...] = (ENGINE_PASSES, ENGINE_SINGLE_SCAN)
+    DEFAULT_ENGINE: str = ENGINE_PASSES
+    DEFAULT_PASS_TIMEOUT: Optional[float] = 1.0
+    """Time budget in seconds for a single match of the recursive regexes, see :py:attr:`pass_timeout`."""
+    DEFAULT_PASS_DEADLINE: Optional[float] = 30.0
+    """Time budget in seconds for a whole pass of the recursive regexes, see :py:attr:`pass_deadline`."""
 
     def __init__(
         self,
@@ -63,6 +84,19 @@ class Tokenizer:
         """The marker format used in the given marked string"""
         self._token_store: Dict[str, str] = dict()
         """The dictionary that associates the tokens to the strings that they replace"""
+        self.engine: str = Tokenizer.DEFAULT_ENGINE
+        self.pass_timeout: Optional[float] = Tokenizer.DEFAULT_PASS_TIMEOUT
+        self.pass_deadline: Optional[float] = Tokenizer.DEFAULT_PASS_DEADLINE
+        self._scan_deadline: Optional[float] = None
+        """The time the running single scan has to end by, see :py:meth:`_match_timeout`"""
+        self._item_token: Optional[str] = None
+        """The single token shared by all the items of lists during a single scan"""
+        self._single_scan_starts: re.Pattern = re.compile("(?!)")
+        """Finds the positions where a structure can start during a single scan"""
+        self.missing_tokens: List[str] = list()
+        """The tokens found missing or altered by the last :py:meth:`detokenize`"""
+        self.tables: ConstructTables = DEFAULT_TABLES
+        """The commands tokenized with their arguments, see :py:mod:`~translatex.constructs`"""
 
     @classmethod
     def from_marker(cls, marker: Marker) -> "Tokenizer":
@@ -152,6 +186,95 @@ class Tokenizer:
         Tokenizer.token_format_check(format_str)
         self._token_format = format_str
 
+    @property
+    def engine(self) -> str:
+        """The tokenization engine to use, one of :py:attr:`ENGINES`.
+
+        Raises:
+            ValueError: If the given engine is unknown.
+
+        """
+        return self._engine
+
+    @engine.setter
+    def engine(self, engine: str) -> None:
+        if engine not in Tokenizer.ENGINES:
+            raise ValueError(
+                f"Unknown tokenization engine, choose one of: {', '.join(Tokenizer.ENGINES)}"
+            )
+        self._engine = engine
+
+    @property
+    def pass_timeout(self) -> Optional[float]:
+        """The time budget in seconds given to each match attempt of the recursive regexes, or ``None`` for no limit.
+
+        The regexes that match balanced curly braces and square brackets recurse and can backtrack for a very long time
+        on unbalanced pairs or long runs of backslashes. When a match attempt runs out of time, the structure is
+        tokenized conservatively: everything from its start until the end of its paragraph is replaced by a single
+        opaque token and a warning is logged.
+
+        This budget applies to each match attempt on its own, so a pass over many structures that each take a little
+        less than it can run for much longer, see :py:attr:`pass_deadline` for the budget of a whole pass.
+
+        Raises:
+            ValueError: If the given time budget is not a positive number.
+
+        """
+        return self._pass_timeout
+
+    @pass_timeout.setter
+    def pass_timeout(self, pass_timeout: Optional[float]) -> None:
+        if pass_timeout is not None and pass_timeout <= 0:
+            raise ValueError(
+                "Pass timeout must be a positive number of seconds"
+            )
+        self._pass_timeout = pass_timeout
+
+    @property
+    def pass_deadline(self) -> Optional[float]:
+        """The time budget in seconds given to each pass of the recursive regexes as a whole, or ``None`` for no limit.
+
+        Once a pass ran out of time, the match attempts left are not made: every structure left in the pass is
+        tokenized conservatively, the same way as a structure whose match attempt ran out of time (see
+        :py:attr:`pass_timeout`). The single scan engine counts as a single pass.
+
+        Raises:
+            ValueError: If the given time budget is not a positive number.
+
+        """
+        return self._pass_deadline
+
+    @pass_deadline.setter
+    def pass_deadline(self, pass_deadline: Optional[float]) -> None:
+        if pass_deadline is not None and pass_deadline <= 0:
+            raise ValueError(
+                "Pass deadline must be a positive number of seconds"
+            )
+        self._pass_deadline = pass_deadline
+
+    def _deadline(self) -> Optional[float]:
+        """Gives the time a pass starting now has to end by, as given by :py:func:`time.monotonic`."""
+        if self._pass_deadline is None:
+            return None
+        return time.monotonic() + self._pass_deadline
+
+    def _match_timeout(self, deadline: Optional[float]) -> Optional[float]:
+        """Gives the time budget of the next match attempt of a pass that has to end by the given time.
+
+        Raises:
+            TimeoutError: If the pass ran out of time, so that the structure is handled like one that couldn't be
+                matched in time.
+
+        """
+        if deadline is None:
+            return self._pass_timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Pass deadline exceeded")
+        if self._pass_timeout is None:
+            return remaining
+        return min(self._pass_timeout, remaining)
+
     @staticmethod
     def token_format_check(format_str: str) -> None:
         pattern = r"\{\}"
@@ -176,6 +299,79 @@ class Tokenizer:
         )
         return escaped_token_format.format(r"(?:\d+)", r"(?:\d+)")
 
+    @staticmethod
+    def tolerant_token_regex(format_str: str) -> str:
+        """Construct a regex that matches the given token format and the variants automatic translators turn it into.
+
+        Whitespace is allowed between all the parts of the token, any kind of opening or closing bracket can stand for
+        another and any kind of dash or hyphen for another, so that ``[ 3 - 4 ]``, ``[3–4]`` and ``(3-4)`` are all
+        matched for the default format. The two numbers are captured.
+        """
+        Tokenizer.token_format_check(format_str)
+        first_curly_start = format_str.find(r"{}")
+        second_curly_start = format_str.find(r"{}", first_curly_start + 2)
+
+        def tolerant(literal: str) -> List[str]:
+            parts = list()
+            for character in literal:
+                if character.isspace():
+                    continue
+                if character in TOLERANT_TOKEN_OPENERS:
+                    parts.append(f"[{re.escape(TOLERANT_TOKEN_OPENERS)}]")
+                elif character in TOLERANT_TOKEN_CLOSERS:
+                    parts.append(f"[{re.escape(TOLERANT_TOKEN_CLOSERS)}]")
+                elif character in TOLERANT_TOKEN_DASHES:
+                    parts.append(f"[{re.escape(TOLERANT_TOKEN_DASHES)}]")
+                else:
+                    parts.append(re.escape(character))
+            return parts
+
+        parts = (
+            tolerant(format_str[:first_curly_start])
+            + [r"(\d+)"]
+            + tolerant(format_str[first_curly_start + 2 : second_curly_start])
+            + [r"(\d+)"]
+            + tolerant(format_str[second_curly_start + 2 :])
+        )
+        return r"\s*".join(parts)
+
+    def release(self) -> None:
+        """Drops the strings held once the next stage took over, keeping the token store to detokenize later.
+
+        This is for the low memory mode of :py:class:`~translatex.pipeline.Pipeline`, see
+        :py:meth:`~translatex.preprocessor.Preprocessor.release`.
+        """
+        self._base_string = (
+            self._marked_string
+        ) = self._tokenized_string = str()
+
+    def state(self) -> Dict[str, Any]:
+        """Gives the tokenized string and what is needed to detokenize it, as JSON serializable values.
+
+        See :py:meth:`from_state` and :py:class:`~translatex.checkpoint.Checkpoint`.
+        """
+        return {
+            "tokenized_string": self._tokenized_string,
+            "token_format": self._token_format,
+            "marker_format": self._marker_format,
+            "token_count": self._token_count,
+            "token_subcount": self._token_subcount,
+            "token_sublimit": self._token_sublimit,
+            "token_store": self._token_store.copy(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "Tokenizer":
+        """Another constructor that creates a Tokenizer ready to detokenize from a state given by :py:meth:`state`."""
+        tokenizer = cls(str(), state["marker_format"])
+        tokenizer.token_format = state["token_format"]
+        tokenizer.tokenized_string = state["tokenized_string"]
+        tokenizer._token_count = state["token_count"]
+        tokenizer._token_subcount = state["token_subcount"]
+        tokenizer._token_sublimit = state["token_sublimit"]
+        tokenizer._token_store = dict(state["token_store"])
+        return tokenizer
+
     def dump_store(self) -> str:
         string_transformed = [
             f"{item}\n" for item in self._token_store.items()
@@ -186,41 +382,112 @@ class Tokenizer:
         """Construct a regex corresponding to the current instance token format."""
         return Tokenizer.token_regex(self._token_format)
 
+    def _store_match(self, match: re.Match) -> str:
+        """Saves a matched string in the dictionary under a new token and gives this token back.
+
+        Used as the replacement callback of the substitutions done by the tokenization passes, so that each pass is a
+        single sweep of the string and the tokens are numbered in the order of the matches.
+        """
+        next_token = self._next_token()
+        self._token_store.update({next_token: match[0]})
+        return next_token
+
+    def _store_opaque(
+        self, string: str, start: int, end: Optional[int] = None
+    ) -> Tuple[str, int]:
+        """Saves everything from the given position until the end of its paragraph under a single new token.
+
+        This is the conservative tokenization used for structures that the regexes couldn't match in time. The stored
+        string is given back as is during detokenization.
+
+        Returns:
+            The new token and the position where the stored string ends
+
+        """
+        if end is None:
+            end = len(string)
+        # The paragraph starts at the first non blank character so that the stored string is never empty
+        paragraph_start = re.compile(r"\s*").match(string, start, end).end()
+        paragraph_end = re.compile(r"\n[^\S\n]*\n").search(
+            string, paragraph_start, end
+        )
+        if paragraph_end:
+            end = paragraph_end.start()
+        log.warning(
+            "Regex timed out at position %d, tokenizing until the end of the paragraph as is: %.40r",
+            start,
+            string[start:end],
+        )
+        next_token = self._next_token()
+        self._token_store.update({next_token: string[start:end]})
+        return next_token, end
+
+    def _guarded_sub(
+        self,
+        pattern: re.Pattern,
+        anchor: re.Pattern,
+        replace: Callable[[re.Match], str],
+        string: str,
+        on_timeout: Optional[Callable[[str, int], Tuple[str, int]]] = None,
+    ) -> str:
+        """Does the same as ``pattern.sub(replace, string)`` with a time budget for each match attempt and for the pass.
+
+        Match attempts are only made where the anchor, which has to be the literal beginning of the pattern, is found,
+        so that it is known which structure made the regex run out of time. Such a structure is handed to ``on_timeout``
+        that gives back its replacement and where it ends, by default :py:meth:`_store_opaque`.
+        """
+        if on_timeout is None:
+            on_timeout = self._store_opaque
+        deadline = self._deadline()
+        pieces: List[str] = list()
+        position = 0
+        for candidate in anchor.finditer(string):
+            start = candidate.start()
+            if start < position:
+                continue
+            try:
+                match = pattern.match(
+                    string, start, timeout=self._match_timeout(deadline)
+                )
+            except TimeoutError:
+                replacement, end = on_timeout(string, start)
+            else:
+                if match is None:
+                    continue
+                replacement, end = replace(match), match.end()
+            pieces.append(string[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(string[position:])
+        return "".join(pieces)
+
     def _tokenize_completely_removed(self, process_string: str) -> str:
-        """Tokenizes all structures listed as to be completely removed in the data module."""
-        current_string = process_string
-        for command in COMPLETELY_REMOVED_COMMANDS:
-            # Explanation for the following regex: The command has to have at least a single pair of curly braces
-            # following it. This can be located directly after the command or optionally be preceded by a set of
-            # square brackets. It can also optionally be followed by a set of square brackets. If there is a pair
-            # mismatch, regex fails (due to missing compliment, or backslash escaped opening and closing characters
-            # respectively). Each group is recursive to be able to match the outermost pair and its complete
-            # contents, which is why a pair mismatch is intolerable. Additionally, some tolerance is built-in. The
-            # regex is hardened against backslash escaped opening characters which fail on an odd number of preceding
-            # backslashes. All outermost pairs can have up to a single space between them since they don't have a
-            # meaning in LaTeX in this case and can be coming across frequently with non-formatted/linted LaTeX files.
-            # The regex stops on the encounter of the token format while matching curly braces and square brackets to
-            # avoid tokenizing tokens.
-            # fmt: off
-            pattern = re.compile(
-                r"\\" + command +
-                r"(?<!\\)(?:\\\\)*(\s?(?!" + self._token_regex() + r")\[(?:[^\[\]]+|(?1))*\])*"
-                r"(?<!\\)(?:\\\\)*(\s?(?!" + self._token_regex() + r")\{(?:[^{}]+|(?2))*\})+"
-                r"(?<!\\)(?:\\\\)*(\s?(?!" + self._token_regex() + r")\[(?:[^\[\]]+|(?3))*\])*"
-            )
-            # fmt: on
-            all_replaced = False
-            while not all_replaced:
-                match = pattern.search(current_string)
-                if match:
-                    next_token = self._next_token()
-                    self._token_store.update({next_token: match[0]})
-                    current_string, _ = pattern.subn(
-                        next_token, current_string, 1
-                    )
-                else:
-                    all_replaced = True
-        return current_string
+        """Tokenizes all structures listed as to be completely removed in the construct tables, in a single sweep."""
+        # Explanation for the following regex: Any of the commands has to have at least a single pair of curly braces
+        # following it. This can be located directly after the command or optionally be preceded by a set of
+        # square brackets. It can also optionally be followed by a set of square brackets. If there is a pair
+        # mismatch, regex fails (due to missing compliment, or backslash escaped opening and closing characters
+        # respectively). Each group is recursive to be able to match the outermost pair and its complete
+        # contents, which is why a pair mismatch is intolerable. Additionally, some tolerance is built-in. The
+        # regex is hardened against backslash escaped opening characters which fail on an odd number of preceding
+        # backslashes. All outermost pairs can have up to a single space between them since they don't have a
+        # meaning in LaTeX in this case and can be coming across frequently with non-formatted/linted LaTeX files.
+        # The regex stops on the encounter of the token format while matching curly braces and square brackets to
+        # avoid tokenizing tokens.
+        # fmt: off
+        pattern = re.compile(
+            self.tables.removed_commands_regex +
+            r"(?<!\\)(?:\\\\)*(\s?(?!" + self._token_regex() + r")\[(?:[^\[\]]+|(?1))*\])*"
+            r"(?<!\\)(?:\\\\)*(\s?(?!" + self._token_regex() + r")\{(?:[^{}]+|(?2))*\})+"
+            r"(?<!\\)(?:\\\\)*(\s?(?!" + self._token_regex() + r")\[(?:[^\[\]]+|(?3))*\])*"
+        )
+        # fmt: on
+        return self._guarded_sub(
+            pattern,
+            self.tables.removed_commands_anchor,
+            self._store_match,
+            process_string,
+        )
 
     def _tokenize_specials(self, process_string: str) -> str:
         """Tokenizes all special case structures listed in the data module.
@@ -231,22 +498,18 @@ class Tokenizer:
 
         """
         current_string = process_string
-        pattern = r"\\item"
-        match = re.search(pattern, current_string)
-        if match:
-            next_token = self._next_token()
-            self._token_store.update({next_token: match[0]})
-            current_string = re.sub(pattern, next_token, current_string)
+        pattern = re.compile(r"\\item")
+        item_token: List[str] = list()
+
+        def store_item(match: re.Match) -> str:
+            # All items share a single token
+            if not item_token:
+                item_token.append(self._store_match(match))
+            return item_token[0]
+
+        current_string = pattern.sub(store_item, current_string)
         pattern = re.compile(r"\\verb(\S).*\1")
-        all_replaced = False
-        while not all_replaced:
-            match = pattern.search(current_string)
-            if match:
-                next_token = self._next_token()
-                self._token_store.update({next_token: match[0]})
-                current_string, _ = pattern.subn(next_token, current_string, 1)
-            else:
-                all_replaced = True
+        current_string = pattern.sub(self._store_match, current_string)
         return current_string
 
     def _tokenize_unnamed_math_optimized(self, process_string: str) -> str:
@@ -264,27 +527,11 @@ class Tokenizer:
             + r"\s*)*(\\\]|\\\)|\$|\$\$)?"
         )
         current_string = process_string
-        all_replaced = False
-        while not all_replaced:
-            match = pattern.search(current_string)
-            if match:
-                next_token = self._next_token()
-                self._token_store.update({next_token: match[0]})
-                current_string, _ = pattern.subn(next_token, current_string, 1)
-            else:
-                all_replaced = True
+        current_string = pattern.sub(self._store_match, current_string)
         pattern = re.compile(
             r"(?:" + marker_regex + r")*(?<!\\)(?:\\\\)*(\\\]|\\\)|\$|\$\$)"
         )
-        all_replaced = False
-        while not all_replaced:
-            match = pattern.search(current_string)
-            if match:
-                next_token = self._next_token()
-                self._token_store.update({next_token: match[0]})
-                current_string, _ = pattern.subn(next_token, current_string, 1)
-            else:
-                all_replaced = True
+        current_string = pattern.sub(self._store_match, current_string)
         return current_string
 
     def _tokenize_commands(self, process_string: str) -> str:
@@ -312,27 +559,27 @@ class Tokenizer:
             r"(?<!\\)(?:\\\\)*(\s?(?!" + self._token_regex() + r")\[(?:[^\[\]]+|(?4))*\])*"
         )
         # fmt: on
-        current_string = process_string
-        all_replaced = False
-        while not all_replaced:
-            match = pattern.search(current_string)
-            if match:
-                next_token = self._next_token()
-                if match[2]:
-                    stored_string = (
-                        match[0][: match.start(2) - match.start(0)]
-                        + Tokenizer.DEFAULT_DETOKENIZER_CONTENT_INDICATOR
-                        + match[0][match.end(2) - match.start(0) :]
-                    )
-                    self._token_store.update({next_token: stored_string})
-                else:
-                    self._token_store.update({next_token: match[0]})
-                current_string, _ = pattern.subn(
-                    next_token + r"\2", current_string, 1
-                )
-            else:
-                all_replaced = True
-        return current_string
+        anchor = re.compile(r"\\" + marker_regex)
+
+        def store_command(match: re.Match) -> str:
+            next_token = self._next_token()
+            if not match[2]:
+                self._token_store.update({next_token: match[0]})
+                return next_token
+            stored_string = (
+                match[0][: match.start(2) - match.start(0)]
+                + Tokenizer.DEFAULT_DETOKENIZER_CONTENT_INDICATOR
+                + match[0][match.end(2) - match.start(0) :]
+            )
+            self._token_store.update({next_token: stored_string})
+            # The kept curly braces stay in the string and may hold other commands to tokenize right after this one
+            return next_token + self._guarded_sub(
+                pattern, anchor, store_command, match[2]
+            )
+
+        return self._guarded_sub(
+            pattern, anchor, store_command, process_string
+        )
 
     def _tokenize_named_envs(self, process_string: str) -> str:
         r"""Tokenizes all marked pairs of ``\begin{}...\end{}`` and their contents.
@@ -354,15 +601,12 @@ class Tokenizer:
         )
         # fmt: on
         current_string = process_string
-        all_replaced = False
-        while not all_replaced:
-            match = pattern.search(current_string)
-            if match:
-                next_token = self._next_token()
-                self._token_store.update({next_token: match[0]})
-                current_string, _ = pattern.subn(next_token, current_string, 1)
-            else:
-                all_replaced = True
+        current_string = self._guarded_sub(
+            pattern,
+            re.compile(r"\\begin\{" + marker_regex + r"\}"),
+            self._store_match,
+            current_string,
+        )
         pattern = re.compile(
             r"(?:\s*[^\\]"
             + marker_regex
@@ -370,15 +614,7 @@ class Tokenizer:
             + marker_regex
             + r"\})"
         )
-        all_replaced = False
-        while not all_replaced:
-            match = pattern.search(current_string)
-            if match:
-                next_token = self._next_token()
-                self._token_store.update({next_token: match[0]})
-                current_string, _ = pattern.subn(next_token, current_string, 1)
-            else:
-                all_replaced = True
+        current_string = pattern.sub(self._store_match, current_string)
         return current_string
 
     def _tokenize_markers(self, process_string: str) -> str:
@@ -391,30 +627,14 @@ class Tokenizer:
         marker_regex = Marker.marker_regex(self._marker_format)
         pattern = re.compile(marker_regex)
         current_string = process_string
-        all_replaced = False
-        while not all_replaced:
-            match = pattern.search(current_string)
-            if match:
-                next_token = self._next_token()
-                self._token_store.update({next_token: match[0]})
-                current_string, _ = pattern.subn(next_token, current_string, 1)
-            else:
-                all_replaced = True
+        current_string = pattern.sub(self._store_match, current_string)
         return current_string
 
     def _tokenize_comments(self, process_string: str) -> str:
         """All LaTeX single line comments are tokenized here."""
         pattern = re.compile(r"(?<!\\)(?:\\\\)*%.*$", re.MULTILINE)
         current_string = process_string
-        all_replaced = False
-        while not all_replaced:
-            match = pattern.search(current_string)
-            if match:
-                next_token = self._next_token()
-                self._token_store.update({next_token: match[0]})
-                current_string, _ = pattern.subn(next_token, current_string, 1)
-            else:
-                all_replaced = True
+        current_string = pattern.sub(self._store_match, current_string)
         return current_string
 
     def _tokenize_latex_escapes(self, process_string: str) -> str:
@@ -425,17 +645,207 @@ class Tokenizer:
         """
         current_string = process_string
         pattern = re.compile(r"(?:\\\S|\\)(?!\w)+")
-        all_replaced = False
-        while not all_replaced:
-            match = re.search(pattern, current_string)
-            if match:
-                next_token = self._next_token()
-                self._token_store.update({next_token: match[0]})
-                current_string = re.sub(pattern, next_token, current_string, 1)
-            else:
-                all_replaced = True
+        current_string = pattern.sub(self._store_match, current_string)
         return current_string
 
+    def _single_scan_regex(self) -> re.Pattern:
+        """Construct the combined regex used by the single scan engine.
+
+        It is an alternation of the regexes used by the tokenization passes (see :py:meth:`tokenize`), in the same order
+        as the passes are run so that the same structure is chosen when more than one can start at the same position.
+        Each alternative has a named group to tell which one matched, and the recursive groups are named so that they
+        can coexist in a single regex.
+        """
+        marker_regex = Marker.marker_regex(self._marker_format)
+        token_regex = self._token_regex()
+
+        # fmt: off
+        def brackets(name: str) -> str:
+            return (
+                r"(?<!\\)(?:\\\\)*(?P<" + name + r">\s?(?!" + token_regex + r")"
+                r"\[(?:[^\[\]]+|(?&" + name + r"))*\])"
+            )
+
+        def braces(name: str) -> str:
+            return (
+                r"(?<!\\)(?:\\\\)*(?P<" + name + r">\s?(?!" + token_regex + r")"
+                r"\{(?:[^{}]+|(?&" + name + r"))*\})"
+            )
+
+        math_delimiters = r"\\\[|\\\(|\$|\$\$"
+        alternatives = [
+            r"(?P<comment>(?<!\\)(?:\\\\)*%.*$)",
+            r"(?P<removed>" + self.tables.removed_commands_regex
+            + brackets("removed_options") + r"*"
+            + braces("removed_arguments") + r"+"
+            + brackets("removed_last_options") + r"*)",
+            r"(?P<item>\\item)",
+            r"(?P<verb>\\verb(?P<verb_delimiter>\S).*(?P=verb_delimiter))",
+            r"(?P<math_open>(?<!\\)(?:\\\\)*(?:" + math_delimiters + r")(?:"
+            + marker_regex + r"\s*)*(?:\\\]|\\\)|\$|\$\$)?)",
+            # Dollars are always taken by the opening alternative above, just like in the passes
+            r"(?P<math_close>(?:" + marker_regex
+            + r")*(?<!\\)(?:\\\\)*(?:\\\]|\\\)))",
+            r"(?P<command>\\" + marker_regex
+            + brackets("command_options") + r"*"
+            + braces("command_arguments") + r"*"
+            + braces("command_last_argument") + r"?"
+            + brackets("command_last_options") + r"*)",
+            r"(?P<env_begin>\\begin\{" + marker_regex + r"\}"
+            + braces("env_arguments") + r"*"
+            + brackets("env_options") + r"*"
+            + braces("env_last_arguments") + r"*"
+            + r"(?:\s*" + marker_regex + r"\s*)*"
+            + r"(?:\\end\{" + marker_regex + r"\})?)",
+            r"(?P<env_end>(?:\s*[^\\]" + marker_regex + r")*(?:\\end\{"
+            + marker_regex + r"\}))",
+            r"(?P<marker>" + marker_regex + r")",
+            r"(?P<escape>(?:\\\S|\\)(?!\w)+)",
+        ]
+        # fmt: on
+        return re.compile("|".join(alternatives), re.MULTILINE)
+
+    def _single_scan_starts_regex(self) -> re.Pattern:
+        """Construct the regex finding the positions where an alternative of :py:meth:`_single_scan_regex` can start.
+
+        Every structure starts with a backslash, a percent sign, a dollar or a marker, except for the end of an
+        environment, which can start with the character right before a marker, after some spaces.
+        """
+        marker_regex = Marker.marker_regex(self._marker_format)
+        return re.compile(
+            r"[\\%$]|" + marker_regex + r"|\s*[^\\](?=" + marker_regex + r")"
+        )
+
+    def _single_scan(
+        self,
+        string: str,
+        pattern: re.Pattern,
+        start: int,
+        end: int,
+        pieces: List[str],
+    ) -> None:
+        """Tokenizes ``string[start:end]`` with the combined regex, appending the resulting pieces to the given list.
+
+        The kept curly braces of a command are scanned recursively, so that the structures they contain get their
+        tokens right after the command's token, in document order.
+        """
+        position = start
+        candidate = position
+        # Bound once, this loop runs for every structure of the document
+        search = self._single_scan_starts.search
+        while True:
+            # Only the positions a structure can start at are tried, instead of every alternative at every position
+            starts = search(string, candidate, end)
+            if starts is None:
+                break
+            try:
+                match = pattern.match(
+                    string,
+                    starts.start(),
+                    end,
+                    timeout=self._match_timeout(self._scan_deadline),
+                )
+            except TimeoutError:
+                position = candidate = self._single_scan_timed_out(
+                    string, pattern, position, end, pieces
+                )
+                continue
+            if match is None:
+                candidate = starts.start() + 1
+                continue
+            pieces.append(string[position : match.start()])
+            position = candidate = match.end()
+            kind = match.lastgroup
+            if kind == "item":
+                if self._item_token is None:
+                    self._item_token = self._next_token()
+                    self._token_store.update({self._item_token: match[0]})
+                pieces.append(self._item_token)
+                continue
+            next_token = self._next_token()
+            if kind == "command" and match.group("command_arguments"):
+                kept_start, kept_end = match.span("command_arguments")
+                self._token_store.update(
+                    {
+                        next_token: string[match.start() : kept_start]
+                        + Tokenizer.DEFAULT_DETOKENIZER_CONTENT_INDICATOR
+                        + string[kept_end : match.end()]
+                    }
+                )
+                opening_brace = string.index("{", kept_start) + 1
+                pieces.append(next_token + string[kept_start:opening_brace])
+                self._single_scan(
+                    string, pattern, opening_brace, kept_end - 1, pieces
+                )
+                pieces.append("}")
+            else:
+                self._token_store.update({next_token: match[0]})
+                pieces.append(next_token)
+        pieces.append(string[position:end])
+
+    def _single_scan_timed_out(
+        self,
+        string: str,
+        pattern: re.Pattern,
+        start: int,
+        end: int,
+        pieces: List[str],
+    ) -> int:
+        """Handles a search of the single scan engine that ran out of time from ``start`` on.
+
+        The structure responsible is the first one starting with a recursive regex that can't be matched in time. What
+        comes before it is scanned as usual and the structure is stored with :py:meth:`_store_opaque`.
+
+        Returns:
+            The position where the scan can go on from
+
+        """
+        marker_regex = Marker.marker_regex(self._marker_format)
+        anchor = re.compile(
+            self.tables.removed_commands_regex
+            + r"|\\"
+            + marker_regex
+            + r"|\\begin\{"
+            + marker_regex
+            + r"\}"
+        )
+        culprit = start
+        for candidate in anchor.finditer(string, start, end):
+            try:
+                pattern.match(
+                    string,
+                    candidate.start(),
+                    end,
+                    timeout=self._match_timeout(self._scan_deadline),
+                )
+            except TimeoutError:
+                culprit = candidate.start()
+                break
+        self._single_scan(string, pattern, start, culprit, pieces)
+        next_token, culprit_end = self._store_opaque(string, culprit, end)
+        pieces.append(next_token)
+        return culprit_end
+
+    def _tokenize_single_scan(self, process_string: str) -> str:
+        """Tokenizes all structures in a single walk through the string.
+
+        This is the single scan engine. The structures handled are the same as the ones of the tokenization passes, but
+        the string is only walked once instead of being rewritten by each pass, and the tokens are numbered in document
+        order. The stored strings never contain other tokens.
+        """
+        self._item_token = None
+        self._single_scan_starts = self._single_scan_starts_regex()
+        self._scan_deadline = self._deadline()
+        pieces: List[str] = list()
+        self._single_scan(
+            process_string,
+            self._single_scan_regex(),
+            0,
+            len(process_string),
+            pieces,
+        )
+        return "".join(pieces)
+
     def tokenize(self) -> None:
         r"""Tokenizes the marked LaTeX string of the instance it is called on and places it in the tokenized string
         property.
@@ -446,7 +856,10 @@ class Tokenizer:
 
         According to the marker format of the instance, one by one (mostly from most specific to least specific to avoid
         interference), various subroutines that make heavy use of regular expressions are called to tokenize the marked
-        string layer by layer. The result is then stored in the tokenized string instance variable.
+        string layer by layer. The result is then stored in the tokenized string instance variable. If the engine is set to
+        :py:attr:`ENGINE_SINGLE_SCAN`, the same structures are instead tokenized in a single walk through the string (see
+        :py:meth:`_tokenize_single_scan`), which keeps the time spent proportional to the length of the string no matter
+        how many structures it contains.
 
         During this stage, thanks to the subroutines, all strings replaced by tokens are stored in the dictionary; thus
         it is populated after a call to this method (a first tokenization run).
@@ -470,24 +883,26 @@ class Tokenizer:
             return
         header_string: str = split_strings[0]
         main_string: str = split_strings[1] + split_strings[2]
-        main_string = self._tokenize_comments(main_string)
-        main_string = self._tokenize_completely_removed(main_string)
-        main_string = self._tokenize_specials(main_string)
-        main_string = self._tokenize_unnamed_math_optimized(main_string)
-        main_string = self._tokenize_commands(main_string)
-        main_string = self._tokenize_named_envs(main_string)
-        main_string = self._tokenize_markers(main_string)
-        main_string = self._tokenize_latex_escapes(main_string)
+        if self._engine == Tokenizer.ENGINE_SINGLE_SCAN:
+            main_string = self._tokenize_single_scan(main_string)
+        else:
+            main_string = self._tokenize_comments(main_string)
+            main_string = self._tokenize_completely_removed(main_string)
+            main_string = self._tokenize_specials(main_string)
+            main_string = self._tokenize_unnamed_math_optimized(main_string)
+            main_string = self._tokenize_commands(main_string)
+            main_string = self._tokenize_named_envs(main_string)
+            main_string = self._tokenize_markers(main_string)
+            main_string = self._tokenize_latex_escapes(main_string)
         self._tokenized_string = header_string + main_string
 
     def detokenize(self) -> None:
         """Replaces all tokens from a previous tokenization run with their associated original strings.
 
-        First, a regex assisted search and replace is performed to process all tokens with a curly brace syntax. These
-        need special handling since the contents of the curly braces need to be first put inside the original string in
-        the dictionary and then the whole token-curly brace should be replaced with the modified dictionary value.
-
-        Later, a simple string replace is performed for all the rest of the "normal/simple" tokens.
+        All tokens are replaced in a single regex assisted sweep of the string. Tokens followed by curly braces need
+        special handling since the contents of the curly braces need to be first put inside the original string in the
+        dictionary, in place of the content indicator, and then the whole token-curly brace should be replaced with the
+        modified dictionary value. The original strings can themselves contain tokens, which are replaced the same way.
 
         Write logs on encounter of any missing or altered tokens in the string to detokenize.
 
@@ -500,31 +915,72 @@ class Tokenizer:
             raise ValueError(
                 "Tokenized string is empty, nothing to detokenize"
             )
-        for token in self._token_store.keys():
-            if main_string.count(token) == 0:
-                log.error(
-                    "Found missing or altered TOKEN: %s --> during stage TOKENIZER",
-                    token,
-                )
         pattern = re.compile(
             r"("
             + self._token_regex()
-            + r")(?<!\\)(?:\\\\)*\s?((?!"
+            + r")(?:(?<!\\)(?:\\\\)*(\s?(?!"
             + self._token_regex()
-            + r")\{(?:[^{}]+|(?2))*\})"
+            + r")\{(?:[^{}]++|(?2))*+\}))?"
         )
-        all_commands_replaced = False
-        while not all_commands_replaced:
-            match = pattern.search(main_string)
-            if match:
-                replace_string = self._token_store[match[1]].replace(
-                    Tokenizer.DEFAULT_DETOKENIZER_CONTENT_INDICATOR,
-                    match[2],
-                    1,
-                )
-                main_string = pattern.sub(replace_string, main_string, 1)
-            else:
-                all_commands_replaced = True
-        for token, value in self._token_store.items():
-            main_string = main_string.replace(token, value)
+        anchor = re.compile(self._token_regex())
+        found_tokens: Set[str] = set()
+        expanding_tokens: Set[str] = set()
+        unmatched_tokens: List[str] = list()
+
+        def sweep(string: str) -> str:
+            return self._guarded_sub(
+                pattern, anchor, restore, string, restore_alone
+            )
+
+        def restore(match: re.Match) -> str:
+            following = match[0][match.end(1) - match.start(0) :]
+            return expand(match[1], following, match[2])
+
+        def restore_alone(string: str, start: int) -> Tuple[str, int]:
+            # The curly braces following the token couldn't be matched in time, they are left as is
+            token = anchor.match(string, start)[0]
+            log.warning(
+                "Regex timed out at position %d, restoring TOKEN: %s without its curly braces",
+                start,
+                token,
+            )
+            return expand(token, "", None), start + len(token)
+
+        def expand(token: str, following: str, braces: Optional[str]) -> str:
+            if token not in self._token_store or token in expanding_tokens:
+                # Unknown token or one that was in the original string itself
+                return token + sweep(following)
+            found_tokens.add(token)
+            expanding_tokens.add(token)
+            before, indicator, after = self._token_store[token].partition(
+                Tokenizer.DEFAULT_DETOKENIZER_CONTENT_INDICATOR
+            )
+            before = sweep(before)
+            after = sweep(after)
+            expanding_tokens.discard(token)
+            if not braces:
+                if indicator:
+                    # Its curly braces were lost or can't be matched, the content indicator is a LaTeX comment that
+                    # mustn't end up in the output
+                    unmatched_tokens.append(token)
+                return before + after
+            if indicator:
+                return before + sweep(braces) + after
+            return before + after + sweep(following)
+
+        main_string = sweep(main_string)
+        self.missing_tokens = [
+            token for token in self._token_store if token not in found_tokens
+        ]
+        for token in self.missing_tokens:
+            log.error(
+                "Found missing or altered TOKEN: %s --> during stage TOKENIZER",
+                token,
+            )
+        for token in unmatched_tokens:
+            log.error(
+                "Found TOKEN: %s without the curly braces of its content --> during stage TOKENIZER",
+                token,
+            )
+        self.missing_tokens += unmatched_tokens
         self._marked_string = main_string
@@ -5,11 +5,33 @@ resides.
 Abstractions for different translation services and APIs as well as methods to
 resize strings to optimize the number of API calls.
 """
+import bisect
+import csv
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
 import re
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, TextIO
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+)
 
 import deepl
 import googletrans
@@ -17,6 +39,8 @@ import nltk
 import requests
 from nltk.tokenize import punkt
 
+from .journal import TranslationJournal
+from .progress import Progress
 from .tokenizer import Tokenizer
 
 log = logging.getLogger("translatex.translator")
@@ -68,6 +92,13 @@ Please set the {self.env_variable_name} environment variable to your \
         super().__init__(self.message)
 
 
+class TranslationServiceError(Exception):
+    """
+    Raised when a translation service fails to give back a translation,
+    instead of returning the untranslated text.
+    """
+
+
 class TranslationService(ABC):
     """An abstract class that represents a translation service.
 
@@ -78,7 +109,14 @@ class TranslationService(ABC):
         array_support: If an API supports using arrays of strings in the call body.
         array_item_limit: How large an array of strings can be in terms of number of strings.
         array_item_char_limit: Maximum number of characters an array item can hold.
-        array_overall_char_limit: Maximum number of characters an array can hold including all its items.
+        array_overall_char_limit: Maximum number of characters an array can hold including all its items, each one
+            counted with :py:meth:`array_length`.
+        rate_limit: The maximum number of API calls per second, zero if there is no known limit. Rough, only used for
+            estimates.
+        call_latency: The typical time in seconds an API call takes. Rough, only used for estimates.
+        cpu_bound: If the service translates locally with the CPU (e.g. a local model) rather than waiting on an API.
+            Its calls are then sent to a pool of worker processes, each one creating an instance of the service without
+            arguments (see :py:class:`ServiceProcessPool`).
         url: The url to send requests to, the API endpoint.
         doc_url: Where to find the docs for the service.
         short_description: Short explanation for the service.
@@ -94,6 +132,9 @@ class TranslationService(ABC):
     array_item_limit: int = int()
     array_item_char_limit: int = int()
     array_overall_char_limit: int = int()
+    rate_limit: float = float()
+    call_latency: float = float()
+    cpu_bound: bool = bool()
     url: str = str()
     doc_url: str = str()
     short_description = str()
@@ -107,6 +148,36 @@ class TranslationService(ABC):
         """
         return text
 
+    def translate_array(
+        self, texts: List[str], source_lang: str, dest_lang: str
+    ) -> List[str]:
+        """
+        Return the translations of an array of strings from source language
+        to destination language, in the same order.
+
+        Services with array support should send the array in a single API
+        call. By default, the strings are translated one by one.
+        """
+        return [self.translate(text, source_lang, dest_lang) for text in texts]
+
+    @classmethod
+    def array_length(cls, text: str) -> int:
+        """
+        Return the length of a string counted against
+        ``array_overall_char_limit``, its number of characters by default.
+
+        Services whose limit is on the size of the request body should give
+        the size of the string once encoded instead.
+        """
+        return len(text)
+
+    def answering_service(self) -> str:
+        """
+        Return the name of the service that answered the last call made
+        from the current thread, for services that delegate to others.
+        """
+        return self.name
+
 
 class GoogleTranslateNoKey(TranslationService):
     """
@@ -122,6 +193,8 @@ class GoogleTranslateNoKey(TranslationService):
     array_item_limit = 1024
     array_item_char_limit = 0
     array_overall_char_limit = 30000
+    rate_limit = 1.0
+    call_latency = 0.5
     doc_url = "https://github.com/ssut/py-googletrans"
     short_description = (
         "Google's translation service without an API key "
@@ -138,6 +211,14 @@ class GoogleTranslateNoKey(TranslationService):
             .text
         )
 
+    def translate_array(
+        self, texts: List[str], source_lang: str, dest_lang: str
+    ) -> List[str]:
+        translations = googletrans.Translator().translate(
+            texts, src=source_lang, dest=dest_lang
+        )
+        return [translation.text for translation in translations]
+
 
 class APIKeyTranslationService(TranslationService, ABC):
     """An abstract class that represents a translation service that requires
@@ -158,6 +239,8 @@ class GoogleTranslate(GoogleTranslateNoKey, APIKeyTranslationService):
     """Translate using Google API."""
 
     name = "Google Translate"
+    rate_limit = 10.0
+    call_latency = 0.3
     url = "https://translation.googleapis.com/language/translate/v2"
     doc_url = "https://cloud.google.com/translate/docs/"
     short_description = "Google's translation service using an API key"
@@ -179,44 +262,169 @@ class GoogleTranslate(GoogleTranslateNoKey, APIKeyTranslationService):
         r = requests.post(self.url, headers=headers, data=payload, timeout=10)
         try:
             return r.json()["data"]["translations"][0]["translatedText"]
-        except Exception:
-            from pprint import pformat
+        except Exception as exc:
+            raise TranslationServiceError(
+                f"{self.name} error: {r.text}"
+            ) from exc
 
-            log.error("%s error:\n%s", self.name, pformat(r.json()))
-            return text
+    def translate_array(
+        self, texts: List[str], source_lang: str, dest_lang: str
+    ) -> List[str]:
+        """
+        Return the translations of an array of strings from source language
+        to destination language, in a single API call.
+        """
+        headers = {"X-goog-api-key": self.api_key}
+        payload = {
+            "q": texts,
+            "source": source_lang,
+            "target": dest_lang,
+            "format": "text",
+        }
+        log.debug("payload = %s", payload)
+        r = requests.post(self.url, headers=headers, data=payload, timeout=10)
+        try:
+            return [
+                translation["translatedText"]
+                for translation in r.json()["data"]["translations"]
+            ]
+        except Exception as exc:
+            raise TranslationServiceError(
+                f"{self.name} error: {r.text}"
+            ) from exc
 
 
 class DeepL(APIKeyTranslationService):
-    """Translate using DeepL API."""
+    """
+    Translate using DeepL API.
+
+    The list of supported languages is cached on disk for a while so that
+    creating the service doesn't need a network round trip every time.
+
+    Attributes:
+        language_cache_path: Where the list of supported languages is cached.
+        language_cache_ttl: How long in seconds the cached list is trusted.
+        glossary: Terms with their fixed translations, sent to DeepL as a
+            glossary instead of having to protect them in the text.
+    """
 
     name: str = "DeepL"
     char_limit = 1024
     array_support = True
     array_item_limit = 50
     array_item_char_limit = 1024
-    array_overall_char_limit = 1024
+    # The body of a request can't exceed 128 KiB, the texts are counted in
+    # bytes once encoded (see array_length) with room left for the other
+    # parameters
+    array_overall_char_limit = 120 * 1024
+    rate_limit = 5.0
+    call_latency = 0.5
     doc_url = "https://www.deepl.com/docs-api"
     short_description = "DeepL translation service using an API key"
     api_key_env_variable_name = "DEEPL_AUTH_KEY"
+    language_cache_path: Path = (
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "translatex"
+        / "deepl_languages.json"
+    )
+    language_cache_ttl: float = 7 * 24 * 3600.0
 
-    def __init__(self):
+    @classmethod
+    def array_length(cls, text: str) -> int:
+        """
+        Return the size in bytes of a string in the JSON body of a request,
+        where characters outside of ASCII are escaped as ``\\uXXXX``.
+        """
+        return len(json.dumps(text))
+
+    def __init__(self, glossary: Optional[Dict[str, str]] = None):
         """
         Initialize the DeepL translator.
+
+        Args:
+            glossary: Terms with their fixed translations, for every pair of
+                languages translated between
         """
 
         super().__init__()
         self.translator = deepl.Translator(self.api_key)
+        self.languages = self._cached_languages()
+        self.glossary: Dict[str, str] = dict(glossary or dict())
+        self._glossaries: Dict[Tuple[str, str], Any] = dict()
+
+    def _cached_languages(self) -> Dict[str, str]:
+        """
+        Give the supported source languages from the cache on disk, fetching
+        them from DeepL and caching them if the cache is missing or stale.
+        """
+        path = Path(self.language_cache_path)
+        try:
+            if time.time() - path.stat().st_mtime < self.language_cache_ttl:
+                return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
         language_list = self.translator.get_source_languages()
         language_list.sort(key=lambda x: x.name)
-        self.languages = {
+        languages = {
             language.code.lower(): language.name for language in language_list
         }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(languages), encoding="utf-8")
+        except OSError as exc:
+            log.debug("Could not cache the DeepL languages: %s", exc)
+        return languages
+
+    @staticmethod
+    def load_glossary(path: Union[str, Path]) -> Dict[str, str]:
+        """
+        Read a glossary from a CSV file of two columns, a term and its
+        translation on each row.
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            return {row[0]: row[1] for row in csv.reader(f) if len(row) >= 2}
+
+    def _glossary_for(self, source_lang: str, dest_lang: str) -> Any:
+        """
+        Give the DeepL glossary for a pair of languages, reusing the one
+        created by an earlier run if the terms didn't change.
+        """
+        if not self.glossary:
+            return None
+        # Glossaries are defined between base languages ("EN" for "EN-GB")
+        source_lang = source_lang.split("-")[0].upper()
+        dest_lang = dest_lang.split("-")[0].upper()
+        key = (source_lang, dest_lang)
+        if key not in self._glossaries:
+            digest = hashlib.sha256(
+                json.dumps(self.glossary, sort_keys=True).encode()
+            ).hexdigest()[:16]
+            name = f"translatex-{source_lang}-{dest_lang}-{digest}"
+            for glossary in self.translator.list_glossaries():
+                if glossary.name == name:
+                    break
+            else:
+                log.info("Creating the DeepL glossary %s", name)
+                glossary = self.translator.create_glossary(
+                    name, source_lang, dest_lang, self.glossary
+                )
+            self._glossaries[key] = glossary
+        return self._glossaries[key]
 
     def translate(self, text: str, source_lang: str, dest_lang: str) -> str:
         """
         Return a translated string from source language to destination
         language.
         """
+        return self.translate_array([text], source_lang, dest_lang)[0]
+
+    def translate_array(
+        self, texts: List[str], source_lang: str, dest_lang: str
+    ) -> List[str]:
+        """
+        Return the translations of an array of strings from source language
+        to destination language, in a single API call.
+        """
         # "EN" is deprecated with DeepL, use "EN-GB" instead
         if dest_lang == "en":
             log.warning(
@@ -226,17 +434,20 @@ class DeepL(APIKeyTranslationService):
             dest_lang = "en-gb"
         # Language shortcodes for DeepL are in uppercase,
         # so we convert them in case they are lowercase
-        result = self.translator.translate_text(
-            text,
+        results = self.translator.translate_text(
+            texts,
             source_lang=source_lang.upper(),
             target_lang=dest_lang.upper(),
+            glossary=self._glossary_for(source_lang, dest_lang),
         )
-        return result.text
+        return [result.text for result in results]
 
 
 TRANSLATION_SERVICE_CLASSES = {
     cls.name: cls for cls in (GoogleTranslate, GoogleTranslateNoKey, DeepL)
 }
+CUSTOM_SERVICE_FILES: Dict[str, str] = dict()
+"""The files the custom services were loaded from, by service name"""
 
 
 class Translator:
@@ -246,7 +457,8 @@ class Translator:
 
     Splits the source string into reasonable chunks using a full stop as
     a seperator while trying to approach the used service's limit per request
-    as closely as possible to make the least number of API calls.
+    as closely as possible to make the least number of API calls. Services
+    translating arrays get one chunk per sentence, packed into their calls.
 
     The operation is one way only. Once an instance is created, the tokenized
     source string is translated to the given language in the related instance
@@ -259,6 +471,11 @@ class Translator:
     ]()
     DEFAULT_SOURCE_LANG: str = "fr"
     DEFAULT_DEST_LANG: str = "en"
+    DEFAULT_DEDUPLICATE: bool = True
+    PACKING_WINDOW: int = 16
+    """The number of API calls worth of chunks bin-packed together with
+    array support. A wider window wastes less room at the end of its last
+    call, but the first calls are planned later."""
 
     def __init__(
         self,
@@ -278,6 +495,23 @@ class Translator:
         self._tokenized_string: str = tokenized_string
         self._translated_string: str = str()
         self._token_format: str = token_format
+        self._header: str = str()
+        """The part of the string before the first token, left untranslated"""
+        self._chunks: List[str] = list()
+        """The chunks of the string sent to the translation service"""
+        self._translated_chunks: List[str] = list()
+        """The translation of each chunk, as given back by the service"""
+        self._unrecoverable_chunks: List[int] = list()
+        """Indices of the chunks whose translation lost tokens for good"""
+        self._chunk_services: List[str] = list()
+        """The name of the service that translated each chunk"""
+        self._duplicates: Dict[int, int] = dict()
+        """The index of the first occurrence of each duplicate chunk"""
+        self._deduplicate: bool = Translator.DEFAULT_DEDUPLICATE
+        self._progress: Optional[Progress] = None
+        """Where the progress of the translation running is reported"""
+        self._destination_lang: str = str()
+        """The language of the translation running, for its progress"""
 
     @classmethod
     def from_tokenizer(cls, tokenizer: Tokenizer) -> "Translator":
@@ -287,6 +521,44 @@ class Translator:
         """
         return cls(tokenizer.tokenized_string, tokenizer.token_format)
 
+    def release(self) -> None:
+        """
+        Drops the tokenized string and the chunks once the translation is
+        complete, keeping the translated string and the service that
+        translated each chunk.
+
+        This is for the low memory mode of
+        :py:class:`~translatex.pipeline.Pipeline`, see
+        :py:meth:`~translatex.preprocessor.Preprocessor.release`.
+        """
+        self._base_string = self._tokenized_string = str()
+        self._chunks = list()
+        self._translated_chunks = list()
+        self._duplicates = dict()
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Gives the translated string and its token format, as JSON
+        serializable values.
+
+        See :py:meth:`from_state` and
+        :py:class:`~translatex.checkpoint.Checkpoint`.
+        """
+        return {
+            "translated_string": self._translated_string,
+            "token_format": self._token_format,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "Translator":
+        """
+        Another constructor that creates a Translator holding a
+        translation from a state given by :py:meth:`state`.
+        """
+        translator = cls(str(), state["token_format"])
+        translator.translated_string = state["translated_string"]
+        return translator
+
     def __str__(self) -> str:
         return (
             f"The translator has a base string of length "
@@ -308,6 +580,7 @@ class Translator:
     def tokenized_string(self, tokenized_string: str) -> None:
         self._tokenized_string = tokenized_string
         self._translated_string = str()
+        self._reset_chunks()
 
     @property
     def translated_string(self) -> str:
@@ -324,6 +597,7 @@ class Translator:
     def translated_string(self, translated_string: str) -> None:
         self._translated_string = translated_string
         self._tokenized_string = str()
+        self._reset_chunks()
 
     @property
     def base_string(self) -> str:
@@ -340,34 +614,237 @@ class Translator:
     def base_string(self, base_string: str) -> None:
         self._base_string = self._tokenized_string = base_string
         self._translated_string = str()
+        self._reset_chunks()
+
+    @property
+    def unrecoverable_chunks(self) -> List[int]:
+        """
+        The indices of the chunks whose translation lost tokens that
+        couldn't be recovered (see :py:meth:`recover_tokens`).
+
+        Only these chunks need to be translated again, with
+        :py:meth:`retranslate_unrecoverable`.
+        """
+        return list(self._unrecoverable_chunks)
+
+    @property
+    def deduplicate(self) -> bool:
+        """
+        Whether chunks that repeat an earlier one are sent only once.
+
+        Two chunks are the same if they only differ by the numbers of
+        their tokens and by their leading and trailing whitespace. The
+        translation of the first occurrence is given to the others, with
+        their own tokens. With array support, each sentence is a chunk (see
+        :py:meth:`_plan`), so sentences are deduplicated one by one.
+        """
+        return self._deduplicate
+
+    @deduplicate.setter
+    def deduplicate(self, deduplicate: bool) -> None:
+        self._deduplicate = deduplicate
+        self._reset_chunks()
+
+    def _reset_chunks(self) -> None:
+        self._header = str()
+        self._chunks = list()
+        self._translated_chunks = list()
+        self._unrecoverable_chunks = list()
+        self._chunk_services = list()
+        self._duplicates = dict()
+
+    @property
+    def chunk_services(self) -> List[str]:
+        """
+        The name of the service that translated each chunk, the one that
+        answered for services failing over to others (see
+        :py:meth:`TranslationService.answering_service`). Chunks taken from
+        a journal have the service recorded in it.
+        """
+        return list(self._chunk_services)
 
     @staticmethod
-    def split_string_by_length(string: str, max_length: int) -> List[str]:
+    def split_string_by_length(
+        string: str,
+        max_length: int,
+        token_format: str = Tokenizer.DEFAULT_TOKEN_FORMAT,
+    ) -> List[str]:
         """
         Splits a string into chunks of sentences of a given maximum length.
         Preserves carriage returns and newlines.
+
+        See :py:meth:`iter_chunks` which does the actual work, lazily.
         """
+        return list(Translator.iter_chunks(string, max_length, token_format))
 
-        chunks = []
-        current_chunk = ""
-        sentences = custom_tknzr.tokenize(string)
+    @staticmethod
+    def iter_chunks(
+        string: str,
+        max_length: int,
+        token_format: str = Tokenizer.DEFAULT_TOKEN_FORMAT,
+        paragraphs: bool = False,
+    ) -> Iterator[str]:
+        """
+        Generates the chunks of sentences of a string, each at most
+        ``max_length`` characters long, as the string is segmented.
+
+        Sentences (see :py:meth:`_sentence_units`) are packed into a chunk
+        as long as they fit. A sentence longer than ``max_length`` is split
+        on its own (see :py:meth:`_split_sentence`). The chunks put back
+        together give the whole string, carriage returns and newlines
+        included. A maximum length of zero or less means there is no limit.
+
+        With ``paragraphs``, a chunk also ends where a paragraph does, so
+        that editing a sentence only changes the chunks of its paragraph
+        instead of moving the boundaries of all the chunks after it.
+        """
+        if max_length <= 0 and not paragraphs:
+            if string:
+                yield string
+            return
+        if max_length <= 0:
+            max_length = len(string)
+        token_pattern = re.compile(Tokenizer.token_regex(token_format))
+        chunk: List[str] = list()
+        chunk_length = 0
+        for sentence in Translator._sentence_units(string, token_pattern):
+            if len(sentence) > max_length:
+                pieces = Translator._split_sentence(
+                    sentence, max_length, token_pattern
+                )
+            else:
+                pieces = iter((sentence,))
+            for piece in pieces:
+                if chunk and chunk_length + len(piece) > max_length:
+                    yield "".join(chunk)
+                    chunk = list()
+                    chunk_length = 0
+                chunk.append(piece)
+                chunk_length += len(piece)
+            # The whitespace ending a paragraph ends its last sentence
+            if (
+                paragraphs
+                and sentence[len(sentence.rstrip()) :].count("\n") > 1
+            ):
+                yield "".join(chunk)
+                chunk = list()
+                chunk_length = 0
+        if chunk:
+            yield "".join(chunk)
+
+    @staticmethod
+    def iter_sentences(
+        string: str,
+        max_length: int,
+        token_format: str = Tokenizer.DEFAULT_TOKEN_FORMAT,
+    ) -> Iterator[str]:
+        """
+        Generates the sentences of a string (see :py:meth:`_sentence_units`)
+        one by one, each at most ``max_length`` characters long, as the
+        string is segmented.
+
+        A sentence longer than ``max_length`` is split (see
+        :py:meth:`_split_sentence`). The sentences put back together give the
+        whole string. A maximum length of zero or less means there is no
+        limit.
+        """
+        token_pattern = re.compile(Tokenizer.token_regex(token_format))
+        for sentence in Translator._sentence_units(string, token_pattern):
+            if 0 < max_length < len(sentence):
+                yield from Translator._split_sentence(
+                    sentence, max_length, token_pattern
+                )
+            else:
+                yield sentence
+
+    @staticmethod
+    def _sentence_units(
+        string: str, token_pattern: re.Pattern
+    ) -> Iterator[str]:
+        """
+        Generates the sentences of a string as the Punkt tokenizer finds
+        them.
+
+        The text between two sentences goes with the next one and what is
+        left after the last sentence with the last one, so that no
+        character is lost. A sentence boundary that falls inside a token
+        is moved to the end of the token.
+        """
+        tokens = token_pattern.finditer(string)
+        token = next(tokens, None)
+        position = 0
+        sentence = str()
+        for _, end in custom_tknzr.span_tokenize(string):
+            while token is not None and token.end() <= end:
+                token = next(tokens, None)
+            if token is not None and token.start() < end:
+                end = token.end()
+            if end <= position:
+                continue
+            if sentence:
+                yield sentence
+            sentence = string[position:end]
+            position = end
+        sentence += string[position:]
+        if sentence:
+            yield sentence
+
+    @staticmethod
+    def _split_sentence(
+        sentence: str, max_length: int, token_pattern: re.Pattern
+    ) -> Iterator[str]:
+        """
+        Splits a sentence that is longer than ``max_length`` into pieces
+        that aren't.
 
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) <= max_length:
-                current_chunk += sentence
+        Pieces end right after whitespace that isn't inside a token,
+        as late as possible. If there is no such whitespace, a word is cut
+        instead, but never a token. A piece can only be longer than
+        ``max_length`` if it is a single token that is.
+        """
+        token_spans = [
+            match.span() for match in token_pattern.finditer(sentence)
+        ]
+        token_starts = [start for start, _ in token_spans]
+
+        def token_around(position: int) -> Optional[Tuple[int, int]]:
+            index = bisect.bisect_left(token_starts, position) - 1
+            if index >= 0 and token_spans[index][1] > position:
+                return token_spans[index]
+            return None
+
+        cuts = [
+            match.end()
+            for match in re.finditer(r"\s", sentence)
+            if token_around(match.end()) is None
+        ]
+        start = 0
+        while len(sentence) - start > max_length:
+            limit = start + max_length
+            index = bisect.bisect_right(cuts, limit) - 1
+            if index >= 0 and cuts[index] > start:
+                cut = cuts[index]
             else:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = sentence
-        if current_chunk:
-            chunks.append(current_chunk)
-        return chunks
+                token = token_around(limit)
+                if token is None:
+                    cut = limit
+                elif token[0] > start:
+                    cut = token[0]
+                else:
+                    cut = token[1]
+            yield sentence[start:cut]
+            start = cut
+        yield sentence[start:]
 
     def translate(
         self,
         service: TranslationService = DEFAULT_SERVICE,
         source_lang: str = DEFAULT_SOURCE_LANG,
         destination_lang: str = DEFAULT_DEST_LANG,
+        journal: Optional[TranslationJournal] = None,
+        cache: Optional["TranslationCache"] = None,
+        progress: Optional[Progress] = None,
+        pool: Optional["ServiceProcessPool"] = None,
     ) -> None:
         """
         Translation is performed with the set source and destination
@@ -375,10 +852,25 @@ class Translator:
 
         The Result is stored in an instance variable.
 
+        If a journal is given, the chunks it already holds are taken from it
+        instead of being translated again, and every chunk translated is
+        recorded in it as soon as it is received.
+
+        If a cache is given, the chunks are cut at paragraph boundaries too
+        (see :py:meth:`iter_chunks`), the chunks it already holds are taken
+        from it and the translated ones are added to it.
+
         Args:
             service: The translation service instance to use
             source_lang: The original language of the given string in ISO short form
             destination_lang: The target language to translate to in ISO short form
+            journal: The journal to resume from and to record to
+            cache: The cache of translations to reuse and to fill
+            progress: Where to report the chunks planned, reused, sent
+                and received (see :py:mod:`~translatex.progress`)
+            pool: The worker processes a CPU bound service translates in,
+                started for this translation only if ``None`` (see
+                :py:class:`ServiceProcessPool`)
 
         Raises:
             ValueError: If the source string is empty
@@ -386,6 +878,149 @@ class Translator:
         """
         if not self._tokenized_string:
             raise ValueError("Tokenized string is empty, nothing to translate")
+        self._translated_chunks = list()
+        self._chunk_services = list()
+        self._progress = progress
+        self._destination_lang = destination_lang
+        try:
+            self._dispatch(
+                service,
+                self._unjournaled(
+                    service, source_lang, destination_lang, journal, cache
+                ),
+                source_lang,
+                destination_lang,
+                journal,
+                pool=pool,
+            )
+        finally:
+            self._progress = None
+        if self._duplicates:
+            self._fan_out_duplicates()
+        self.recover_tokens()
+        if cache is not None:
+            self._fill_cache(cache, source_lang, destination_lang)
+
+    def _unjournaled(
+        self,
+        service: TranslationService,
+        source_lang: str,
+        destination_lang: str,
+        journal: Optional[TranslationJournal] = None,
+        cache: Optional["TranslationCache"] = None,
+    ) -> Iterator[List[int]]:
+        """
+        Plans the API calls, taking the chunks the journal or the cache
+        holds from them and only yielding the missing ones.
+        """
+        replayed = 0
+        cached = 0
+        for request in self._plan(service, paragraphs=cache is not None):
+            # Room for the chunks cut to plan this call
+            missing = len(self._chunks) - len(self._translated_chunks)
+            self._translated_chunks += [str()] * missing
+            self._chunk_services += [str()] * missing
+            if journal is not None:
+                remaining = list()
+                for index in request:
+                    translation = journal.lookup(
+                        index,
+                        self._chunks[index],
+                        source_lang,
+                        destination_lang,
+                    )
+                    if translation is None:
+                        remaining.append(index)
+                    else:
+                        self._translated_chunks[index] = translation
+                        self._chunk_services[index] = journal.lookup_service(
+                            index,
+                            self._chunks[index],
+                            source_lang,
+                            destination_lang,
+                        )
+                replayed += len(request) - len(remaining)
+                self._report_reused(request, remaining, "journal")
+                request = remaining
+            if cache is not None:
+                remaining = list()
+                for index in request:
+                    entry = cache.lookup(
+                        self._chunks[index], source_lang, destination_lang
+                    )
+                    if entry is None:
+                        remaining.append(index)
+                    else:
+                        (
+                            self._translated_chunks[index],
+                            self._chunk_services[index],
+                        ) = entry
+                cached += len(request) - len(remaining)
+                self._report_reused(request, remaining, "cache")
+                request = remaining
+            if request:
+                yield request
+        if replayed:
+            log.info("%d chunk(s) taken from the journal", replayed)
+        if cached:
+            log.info("%d chunk(s) taken from the cache", cached)
+
+    def _emit(self, event: str, **fields: Any) -> None:
+        """Reports an event to the progress of the translation running, if any."""
+        if self._progress is not None:
+            self._progress.emit(
+                event, dest_lang=self._destination_lang, **fields
+            )
+
+    def _report_reused(
+        self, request: List[int], remaining: List[int], source: str
+    ) -> None:
+        """Reports the chunks of a request left out of the remaining ones as reused from the given source."""
+        reused = set(request).difference(remaining)
+        if reused:
+            self._emit(
+                "chunks_reused",
+                chunks=len(reused),
+                characters=sum(len(self._chunks[index]) for index in reused),
+                source=source,
+            )
+
+    def plan(
+        self, service: Union[TranslationService, Type[TranslationService]]
+    ) -> List[List[int]]:
+        """
+        Cuts the tokenized string in chunks and plans the API calls needed
+        to translate them with the given service, without making any.
+
+        Args:
+            service: The translation service, an instance or its class
+
+        Returns:
+            The planned API calls, each being the list of the indices of the
+            chunks it sends
+
+        """
+        return list(self._plan(service))
+
+    def _plan(
+        self,
+        service: Union[TranslationService, Type[TranslationService]],
+        paragraphs: bool = False,
+    ) -> Iterator[List[int]]:
+        """
+        Cuts the tokenized string in chunks, kept in the instance, and
+        generates the planned API calls as lists of chunk indices.
+
+        Chunks are at most :py:meth:`chunk_length_limit` long. Without
+        array support, each chunk is its own API call and is planned as
+        soon as it is cut, and chunks end with paragraphs if asked to (see
+        :py:meth:`iter_chunks`). Otherwise, each sentence is a chunk of its
+        own (see :py:meth:`iter_sentences`), so that a repeated sentence is
+        deduplicated wherever it is, and the chunks are bin-packed into as
+        few API calls as possible (see :py:meth:`pack_requests`), a window
+        of :py:attr:`PACKING_WINDOW` calls at a time so that the first calls
+        are planned before the whole string is cut.
+        """
         latex_header, *tokenized_rest = re.split(
             f"({Tokenizer.token_regex(self._token_format)})",
             self._tokenized_string,
@@ -394,17 +1029,509 @@ class Translator:
         if len(tokenized_rest) == 0:
             # The case where there are no tokens: standard translation
             tokenized_rest = self._tokenized_string
-            self._translated_string = ""
+            self._header = ""
         else:
-            self._translated_string = latex_header
-        chunks = Translator.split_string_by_length(
-            "".join(tokenized_rest), service.char_limit
+            self._header = latex_header
+        self._emit(
+            "translation_planned",
+            characters=len(self._tokenized_string) - len(self._header),
         )
-        self._translated_string += "".join(
-            service.translate(
-                chunk, source_lang=source_lang, dest_lang=destination_lang
+        self._chunks = list()
+        self._duplicates = dict()
+        first_occurrences: Dict[str, int] = dict()
+        if not service.array_support:
+            for chunk in Translator.iter_chunks(
+                "".join(tokenized_rest),
+                Translator.chunk_length_limit(service),
+                self._token_format,
+                paragraphs,
+            ):
+                self._chunks.append(chunk)
+                if not self._is_duplicate(
+                    len(self._chunks) - 1, first_occurrences
+                ):
+                    yield [len(self._chunks) - 1]
+            return
+        # The chunks cut so far that aren't duplicates, packed once they are
+        # worth a window of calls
+        unique: List[int] = list()
+        length = 0
+        for chunk in Translator.iter_sentences(
+            "".join(tokenized_rest),
+            Translator.chunk_length_limit(service),
+            self._token_format,
+        ):
+            self._chunks.append(chunk)
+            if self._is_duplicate(len(self._chunks) - 1, first_occurrences):
+                continue
+            unique.append(len(self._chunks) - 1)
+            length += service.array_length(chunk)
+            if Translator._window_full(len(unique), length, service):
+                yield from self._pack(unique, service)
+                unique = list()
+                length = 0
+        yield from self._pack(unique, service)
+
+    @staticmethod
+    def _window_full(
+        chunks: int,
+        length: int,
+        service: Union[TranslationService, Type[TranslationService]],
+    ) -> bool:
+        """
+        Tells if chunks of the given number and total length, as given by
+        :py:meth:`TranslationService.array_length`, fill a packing window
+        of :py:attr:`PACKING_WINDOW` API calls of the given service.
+
+        Without any array limit, a single call takes all the chunks and the
+        window is never full.
+        """
+        window = Translator.PACKING_WINDOW
+        return (0 < service.array_item_limit * window <= chunks) or (
+            0 < service.array_overall_char_limit * window <= length
+        )
+
+    def _pack(
+        self,
+        indices: List[int],
+        service: Union[TranslationService, Type[TranslationService]],
+    ) -> Iterator[List[int]]:
+        """Generates the API calls the chunks of the given indices are bin-packed into (see :py:meth:`pack_requests`)."""
+        for request in Translator.pack_requests(
+            [service.array_length(self._chunks[index]) for index in indices],
+            service,
+        ):
+            yield [indices[index] for index in request]
+
+    @staticmethod
+    def chunk_key(
+        chunk: str, token_format: str = Tokenizer.DEFAULT_TOKEN_FORMAT
+    ) -> str:
+        """
+        Gives what identifies a chunk up to the numbers of its tokens and
+        its surrounding whitespace: the chunk with its tokens numbered by
+        order of appearance in the chunk instead, and without leading and
+        trailing whitespace.
+        """
+        ordinals: Dict[str, int] = dict()
+        return re.sub(
+            Tokenizer.token_regex(token_format),
+            lambda match: f"\0{ordinals.setdefault(match[0], len(ordinals))}\0",
+            chunk,
+        ).strip()
+
+    @staticmethod
+    def remap_translation(
+        chunk: str,
+        original: str,
+        translation: str,
+        token_format: str = Tokenizer.DEFAULT_TOKEN_FORMAT,
+    ) -> str:
+        """
+        Gives a chunk the translation of another chunk with the same key
+        (see :py:meth:`chunk_key`), with its own tokens and its own leading
+        and trailing whitespace.
+
+        Args:
+            chunk: The chunk to give a translation to
+            original: The chunk that was translated
+            translation: The translation of the original chunk
+            token_format: The format string used for tokens
+
+        """
+        token_pattern = re.compile(Tokenizer.token_regex(token_format))
+        tokens = dict(
+            zip(token_pattern.findall(original), token_pattern.findall(chunk))
+        )
+        # Tokens altered by the service are matched too, see recover_tokens
+        translation = re.sub(
+            Tokenizer.tolerant_token_regex(token_format),
+            lambda match: tokens.get(
+                token_format.format(int(match[1]), int(match[2])), match[0]
+            ),
+            translation,
+        )
+        return (
+            chunk[: len(chunk) - len(chunk.lstrip())]
+            + translation.strip()
+            + chunk[len(chunk.rstrip()) :]
+        )
+
+    def _is_duplicate(
+        self, index: int, first_occurrences: Dict[str, int]
+    ) -> bool:
+        """
+        Tells if the chunk of the given index repeats an earlier one (see
+        :py:meth:`chunk_key`), keeping track of it, or of its first
+        occurrence otherwise.
+        """
+        if not self._deduplicate:
+            return False
+        key = Translator.chunk_key(self._chunks[index], self._token_format)
+        if key in first_occurrences:
+            self._duplicates[index] = first_occurrences[key]
+            self._emit(
+                "chunks_reused",
+                chunks=1,
+                characters=len(self._chunks[index]),
+                source="duplicate",
+            )
+            return True
+        first_occurrences[key] = index
+        return False
+
+    def _fan_out_duplicates(self) -> None:
+        """
+        Gives each duplicate chunk the translation of its first occurrence,
+        with its own tokens and its own leading and trailing whitespace, then
+        logs how much deduplication saved.
+        """
+        # Room for the duplicates cut after the last planned call
+        missing = len(self._chunks) - len(self._translated_chunks)
+        self._translated_chunks += [str()] * missing
+        self._chunk_services += [str()] * missing
+        for index, original in self._duplicates.items():
+            self._translated_chunks[index] = Translator.remap_translation(
+                self._chunks[index],
+                self._chunks[original],
+                self._translated_chunks[original],
+                self._token_format,
+            )
+            self._chunk_services[index] = self._chunk_services[original]
+        log.info(
+            "Deduplicated %d of %d chunk(s) (%.1f%%), saving %d characters",
+            len(self._duplicates),
+            len(self._chunks),
+            100 * len(self._duplicates) / len(self._chunks),
+            sum(len(self._chunks[index]) for index in self._duplicates),
+        )
+
+    def _fill_cache(
+        self,
+        cache: "TranslationCache",
+        source_lang: str,
+        destination_lang: str,
+    ) -> None:
+        """Adds the translated chunks whose tokens are all there to the cache."""
+        unrecoverable = set(self._unrecoverable_chunks)
+        for index, chunk in enumerate(self._chunks):
+            if index not in unrecoverable and index not in self._duplicates:
+                cache.record(
+                    chunk,
+                    source_lang,
+                    destination_lang,
+                    self._translated_chunks[index],
+                    self._chunk_services[index],
+                )
+
+    def _send(
+        self,
+        service: TranslationService,
+        request: List[int],
+        source_lang: str,
+        destination_lang: str,
+        journal: Optional[TranslationJournal] = None,
+        retry: bool = False,
+    ) -> None:
+        """Makes a single API call to translate the chunks of the given indices, recording them to the journal if any."""
+        characters = sum(len(self._chunks[index]) for index in request)
+        self._emit(
+            "chunks_sent",
+            chunks=len(request),
+            characters=characters,
+            retry=retry,
+        )
+        start = time.monotonic()
+        translations = _call_service(
+            service,
+            [self._chunks[index] for index in request],
+            source_lang,
+            destination_lang,
+        )
+        self._store(
+            request,
+            translations,
+            service.answering_service(),
+            source_lang,
+            destination_lang,
+            journal,
+        )
+        self._emit(
+            "chunks_received",
+            chunks=len(request),
+            characters=characters,
+            received_characters=sum(map(len, translations)),
+            seconds=time.monotonic() - start,
+            service=service.answering_service(),
+            retry=retry,
+        )
+
+    def _dispatch(
+        self,
+        service: TranslationService,
+        requests: Iterable[List[int]],
+        source_lang: str,
+        destination_lang: str,
+        journal: Optional[TranslationJournal] = None,
+        retry: bool = False,
+        pool: Optional["ServiceProcessPool"] = None,
+    ) -> None:
+        """
+        Makes the given API calls one after the other, or all at once in a
+        pool of worker processes for CPU bound services (see
+        :py:class:`ServiceProcessPool`), the given one or one started for
+        these calls only.
+        """
+        if not service.cpu_bound:
+            for request in requests:
+                self._send(
+                    service,
+                    request,
+                    source_lang,
+                    destination_lang,
+                    journal,
+                    retry,
+                )
+            return
+        if pool is None:
+            with ServiceProcessPool(service) as pool:
+                self._dispatch(
+                    service,
+                    requests,
+                    source_lang,
+                    destination_lang,
+                    journal,
+                    retry,
+                    pool,
+                )
+            return
+        futures = dict()
+        for request in requests:
+            characters = sum(len(self._chunks[index]) for index in request)
+            self._emit(
+                "chunks_sent",
+                chunks=len(request),
+                characters=characters,
+                retry=retry,
+            )
+            future = pool.submit(
+                [self._chunks[index] for index in request],
+                source_lang,
+                destination_lang,
+            )
+            futures[future] = (request, characters, time.monotonic())
+        for future in as_completed(futures):
+            request, characters, start = futures[future]
+            self._store(
+                request,
+                future.result(),
+                service.name,
+                source_lang,
+                destination_lang,
+                journal,
+            )
+            self._emit(
+                "chunks_received",
+                chunks=len(request),
+                characters=characters,
+                received_characters=sum(map(len, future.result())),
+                seconds=time.monotonic() - start,
+                service=service.name,
+                retry=retry,
+            )
+
+    def _store(
+        self,
+        request: List[int],
+        translations: List[str],
+        answering_service: str,
+        source_lang: str,
+        destination_lang: str,
+        journal: Optional[TranslationJournal] = None,
+    ) -> None:
+        """Keeps the translations of the chunks of the given indices, recording them to the journal if any."""
+        for index, translation in zip(request, translations):
+            self._translated_chunks[index] = translation
+            self._chunk_services[index] = answering_service
+            if journal is not None:
+                journal.record(
+                    index,
+                    self._chunks[index],
+                    source_lang,
+                    destination_lang,
+                    translation,
+                    answering_service,
+                )
+
+    def estimate(
+        self, service: Union[TranslationService, Type[TranslationService]]
+    ) -> Dict[str, Any]:
+        """
+        Estimates what translating the tokenized string with the given
+        service costs, without making any API call.
+
+        The time is estimated for API calls made one after the other, each
+        taking the typical latency of the service or waiting for its rate
+        limit, whichever is longer.
+
+        Args:
+            service: The translation service, an instance or its class
+
+        Returns:
+            The name of the service (``service``), the number of characters
+            sent (``characters``), the number of API calls (``requests``),
+            the estimated time in seconds (``seconds``) and whether the
+            overall quota of the service is exceeded (``over_limit``)
+
+        """
+        requests = self.plan(service)
+        characters = sum(
+            len(self._chunks[index])
+            for request in requests
+            for index in request
+        )
+        call_time = service.call_latency
+        if service.rate_limit > 0:
+            call_time = max(call_time, 1 / service.rate_limit)
+        return {
+            "service": service.name,
+            "characters": characters,
+            "requests": len(requests),
+            "seconds": len(requests) * call_time,
+            "over_limit": 0 < service.overall_char_limit < characters,
+        }
+
+    @staticmethod
+    def chunk_length_limit(
+        service: Union[TranslationService, Type[TranslationService]]
+    ) -> int:
+        """
+        The maximum length of a chunk for the given service, taking the
+        limits on arrays into account if the service supports them.
+
+        Limits of zero are ignored. Zero is returned if there is no limit.
+        """
+        limits = [service.char_limit]
+        if service.array_support:
+            limits += [
+                service.array_item_char_limit,
+                service.array_overall_char_limit,
+            ]
+        return min((limit for limit in limits if limit > 0), default=0)
+
+    @staticmethod
+    def pack_requests(
+        lengths: List[int],
+        service: Union[TranslationService, Type[TranslationService]],
+    ) -> List[List[int]]:
+        """
+        Packs chunks of the given lengths into as few API calls as possible.
+        The shorter the chunks, the less room is lost in each call, which is
+        why :py:meth:`_plan` packs sentences rather than chunks already
+        filled up to the length limit with them.
+
+        An API call holds at most ``array_item_limit`` chunks whose total
+        length, as given by :py:meth:`TranslationService.array_length`, is
+        at most ``array_overall_char_limit`` (limits of zero are
+        ignored), or a single chunk if the service doesn't support arrays.
+        Chunks being translated independently of each other, they don't have
+        to be packed in document order; first fit decreasing is used. The
+        chunk indices of each call are in document order and the calls are
+        ordered by their first chunk.
+
+        Args:
+            lengths: The lengths of the chunks, in document order
+            service: The translation service, an instance or its class
+
+        Returns:
+            The API calls, each being the list of the indices of the chunks it
+            sends
+
+        """
+        if service.array_support:
+            item_limit = service.array_item_limit
+            overall_limit = service.array_overall_char_limit
+        else:
+            item_limit, overall_limit = 1, 0
+        requests: List[List[int]] = list()
+        totals: List[int] = list()
+        # Calls that may still take a chunk, the others are left out of the
+        # search so that it doesn't get slower as calls fill up
+        open_requests: List[int] = list()
+        shortest = min(lengths, default=0)
+        for index in sorted(
+            range(len(lengths)), key=lambda index: lengths[index], reverse=True
+        ):
+            for position in open_requests:
+                if (
+                    overall_limit <= 0
+                    or totals[position] + lengths[index] <= overall_limit
+                ):
+                    break
+            else:
+                position = len(requests)
+                requests.append(list())
+                totals.append(0)
+                open_requests.append(position)
+            requests[position].append(index)
+            totals[position] += lengths[index]
+            if (0 < item_limit <= len(requests[position])) or (
+                0 < overall_limit < totals[position] + shortest
+            ):
+                open_requests.remove(position)
+        for request in requests:
+            request.sort()
+        return sorted(requests)
+
+    def recover_tokens(self) -> None:
+        """
+        Normalizes the tokens altered by the translation service back to
+        their canonical form and rebuilds the translated string.
+
+        Automatic translators sometimes give back ``[ 3 - 4 ]``, ``[3–4]``
+        or ``(3-4)`` instead of ``[3-4]``. Each translated chunk is swept
+        once with a tolerant regex derived from the token format (see
+        :py:meth:`Tokenizer.tolerant_token_regex`). A variant is only
+        replaced by its canonical form when that token is missing from
+        the translated chunk, so that text that merely looks like a token
+        is left alone.
+
+        Chunks that still miss tokens afterwards are logged and listed in
+        :py:attr:`unrecoverable_chunks`.
+        """
+        token_pattern = re.compile(Tokenizer.token_regex(self._token_format))
+        tolerant_pattern = re.compile(
+            Tokenizer.tolerant_token_regex(self._token_format)
+        )
+        self._unrecoverable_chunks = list()
+        for index, chunk in enumerate(self._chunks):
+            missing = Counter(token_pattern.findall(chunk))
+            missing.subtract(
+                token_pattern.findall(self._translated_chunks[index])
+            )
+            if not any(count > 0 for count in missing.values()):
+                continue
+
+            def recover(match: re.Match) -> str:
+                token = self._token_format.format(int(match[1]), int(match[2]))
+                if match[0] != token and missing[token] > 0:
+                    missing[token] -= 1
+                    return token
+                return match[0]
+
+            self._translated_chunks[index] = tolerant_pattern.sub(
+                recover, self._translated_chunks[index]
             )
-            for chunk in chunks
+            lost_tokens = sorted(+missing)
+            if lost_tokens:
+                self._unrecoverable_chunks.append(index)
+                log.warning(
+                    "Chunk %d lost TOKEN(s) %s during translation",
+                    index,
+                    ", ".join(lost_tokens),
+                )
+        self._translated_string = self._header + "".join(
+            self._translated_chunks
         )
         # For multiline strings, add a newline at the end if it was lost
         # during the process
@@ -414,6 +1541,133 @@ class Translator:
         ):
             self._translated_string += "\n"
 
+    def retranslate_unrecoverable(
+        self,
+        service: TranslationService = DEFAULT_SERVICE,
+        source_lang: str = DEFAULT_SOURCE_LANG,
+        destination_lang: str = DEFAULT_DEST_LANG,
+        journal: Optional[TranslationJournal] = None,
+        cache: Optional["TranslationCache"] = None,
+        progress: Optional[Progress] = None,
+        pool: Optional["ServiceProcessPool"] = None,
+    ) -> None:
+        """
+        Translates again only the chunks whose tokens couldn't be
+        recovered after a previous translation, then recovers the tokens
+        again. Does nothing if there are no such chunks.
+
+        Args:
+            service: The translation service instance to use
+            source_lang: The original language of the given string in ISO short form
+            destination_lang: The target language to translate to in ISO short form
+            journal: The journal to record the new translations to
+            cache: The cache to add the new translations to
+            progress: Where to report the chunks translated again
+            pool: The worker processes a CPU bound service translates in,
+                started for this translation only if ``None``
+
+        """
+        if not self._unrecoverable_chunks:
+            return
+        log.info(
+            "Translating again %d chunk(s) whose tokens couldn't be recovered",
+            len(self._unrecoverable_chunks),
+        )
+        chunks = self._unrecoverable_chunks
+        self._progress = progress
+        self._destination_lang = destination_lang
+        self._emit(
+            "chunks_retried",
+            chunks=len(chunks),
+            characters=sum(len(self._chunks[index]) for index in chunks),
+        )
+        try:
+            self._dispatch(
+                service,
+                self._pack(chunks, service),
+                source_lang,
+                destination_lang,
+                journal,
+                retry=True,
+                pool=pool,
+            )
+        finally:
+            self._progress = None
+        self.recover_tokens()
+        if cache is not None:
+            self._fill_cache(cache, source_lang, destination_lang)
+
+
+class TranslationCache:
+    """In memory translations of chunks, to reuse them when translating an edited version of a document again.
+
+    Chunks are looked up by their key (see :py:meth:`Translator.chunk_key`), so that a chunk is still found when the
+    numbers of its tokens changed because tokens were added or removed before it. Its translation is given back with
+    its own tokens and whitespace (see :py:meth:`Translator.remap_translation`). The cache is safe to share between
+    threads translating to different languages.
+    """
+
+    def __init__(
+        self, token_format: str = Tokenizer.DEFAULT_TOKEN_FORMAT
+    ) -> None:
+        """Creates an empty cache for chunks tokenized with the given token format."""
+        self.token_format = token_format
+        self._entries: Dict[
+            Tuple[str, str, str], Tuple[str, str, str]
+        ] = dict()
+        """The chunk, its translation and the service that gave it, by key and languages"""
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = dict.fromkeys(("hits", "misses"), 0)
+        """Counters of the chunks found in the cache and the ones that weren't."""
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        return (
+            f"The translation cache holds {len(self)} chunk(s), "
+            f"{self.stats['hits']} hit(s) and {self.stats['misses']} miss(es)."
+        )
+
+    def lookup(
+        self, chunk: str, source_lang: str, destination_lang: str
+    ) -> Optional[Tuple[str, str]]:
+        """Gives the cached translation of a chunk and the service that gave it, or ``None`` if it isn't cached."""
+        key = (
+            Translator.chunk_key(chunk, self.token_format),
+            source_lang,
+            destination_lang,
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            self.stats["hits" if entry else "misses"] += 1
+        if entry is None:
+            return None
+        original, translation, service = entry
+        return (
+            Translator.remap_translation(
+                chunk, original, translation, self.token_format
+            ),
+            service,
+        )
+
+    def record(
+        self,
+        chunk: str,
+        source_lang: str,
+        destination_lang: str,
+        translation: str,
+        service: str = str(),
+    ) -> None:
+        """Adds the translation of a chunk to the cache."""
+        key = (
+            Translator.chunk_key(chunk, self.token_format),
+            source_lang,
+            destination_lang,
+        )
+        with self._lock:
+            self._entries[key] = (chunk, translation, service)
+
 
 def add_custom_translation_services(fp: TextIO):
     """
@@ -435,3 +1689,139 @@ def add_custom_translation_services(fp: TextIO):
             and issubclass(obj, TranslationService)
         ):
             TRANSLATION_SERVICE_CLASSES[obj.name] = obj
+            CUSTOM_SERVICE_FILES[obj.name] = fp.name
+
+
+def _call_service(
+    service: TranslationService,
+    texts: List[str],
+    source_lang: str,
+    dest_lang: str,
+) -> List[str]:
+    """Translates the texts in a single API call, an array if there are several."""
+    if len(texts) == 1:
+        return [
+            service.translate(
+                texts[0], source_lang=source_lang, dest_lang=dest_lang
+            )
+        ]
+    return service.translate_array(
+        texts, source_lang=source_lang, dest_lang=dest_lang
+    )
+
+
+_worker_service: Optional[TranslationService] = None
+"""The service instance of a worker process of a :py:class:`ServiceProcessPool`"""
+
+
+def _init_worker(
+    service_class: Optional[Type[TranslationService]],
+    name: str,
+    custom_file: Optional[str],
+) -> None:
+    """Creates the service of a worker process once for all the calls it makes."""
+    global _worker_service
+    if service_class is None:
+        # Custom services are defined in a file rather than a module, they
+        # are loaded again unless the worker was forked after they were added
+        if name not in TRANSLATION_SERVICE_CLASSES and custom_file:
+            with open(custom_file) as f:
+                add_custom_translation_services(f)
+        service_class = TRANSLATION_SERVICE_CLASSES[name]
+    _worker_service = service_class()
+
+
+def _translate_in_worker(
+    texts: List[str], source_lang: str, dest_lang: str
+) -> List[str]:
+    """Translates with the service of the worker process."""
+    return _call_service(_worker_service, texts, source_lang, dest_lang)
+
+
+class ServiceProcessPool:
+    """
+    Pool of worker processes translating with a CPU bound service.
+
+    A CPU bound service called from the main thread holds the GIL, so its
+    calls can only be made one after the other. Each worker process of the
+    pool creates its own instance of the service when it starts, without
+    arguments, and keeps it warm for all the calls it makes until the pool
+    is closed. Calls are submitted as futures.
+
+    The class of the service has to be found by the workers: either by
+    importing its module, or as a custom service loaded with
+    :py:func:`add_custom_translation_services` whose file is loaded again
+    if needed.
+
+    The pool can be used as a context manager to close it at the end. It
+    can be shared by several translations, even from several threads, see
+    :py:attr:`~translatex.pipeline.Pipeline.pool`.
+    """
+
+    DEFAULT_MAX_WORKERS: Optional[int] = None
+    """The number of worker processes, the number of CPUs if ``None``"""
+    DEFAULT_START_METHOD: Optional[str] = "spawn"
+    """How worker processes are started, the default of the platform if
+    ``None``. The pool can be started while other threads run, translating
+    other languages or hedging calls, and forking a process with several
+    threads can deadlock on a lock one of them held (logging, HTTP
+    connection pools), so the workers are spawned instead."""
+
+    def __init__(
+        self,
+        service: Union[TranslationService, Type[TranslationService]],
+        max_workers: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ) -> None:
+        """
+        Starts the worker processes.
+
+        Args:
+            service: The CPU bound service, an instance or its class
+            max_workers: The number of worker processes, defaults to
+                :py:attr:`DEFAULT_MAX_WORKERS`
+            start_method: The multiprocessing start method of the workers
+                (``"fork"``, ``"spawn"`` or ``"forkserver"``), defaults to
+                :py:attr:`DEFAULT_START_METHOD`
+        """
+        service_class = service if isinstance(service, type) else type(service)
+        module = sys.modules.get(service_class.__module__)
+        importable = (
+            getattr(module, service_class.__qualname__, None) is service_class
+        )
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers or ServiceProcessPool.DEFAULT_MAX_WORKERS,
+            mp_context=multiprocessing.get_context(
+                start_method or ServiceProcessPool.DEFAULT_START_METHOD
+            ),
+            initializer=_init_worker,
+            initargs=(
+                service_class if importable else None,
+                service_class.name,
+                CUSTOM_SERVICE_FILES.get(service_class.name),
+            ),
+        )
+
+    def __enter__(self) -> "ServiceProcessPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def submit(
+        self, texts: List[str], source_lang: str, dest_lang: str
+    ) -> Future:
+        """
+        Submits an API call translating the texts, an array if there are
+        several, to a worker process.
+
+        Returns:
+            The future of the list of the translations
+        """
+        return self._executor.submit(
+            _translate_in_worker, texts, source_lang, dest_lang
+        )
+
+    def close(self) -> None:
+        """Waits for the submitted calls and stops the worker processes."""
+        self._executor.shutdown()
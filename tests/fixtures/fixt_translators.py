@@ -1,5 +1,7 @@
 import pytest
 
+from translatex.mock import MockTranslationBackend, MockTranslationService
+from translatex.pipeline import Pipeline
 from translatex.translator import TRANSLATION_SERVICE_CLASSES, Translator
 
 TEST_SERVICE = TRANSLATION_SERVICE_CLASSES["DeepL"]
@@ -21,3 +23,24 @@ def math_trans(math_tokenizer) -> Translator:
     tok = math_tokenizer
     tok.tokenize()
     return Translator.from_tokenizer(tok)
+
+
+@pytest.fixture
+def mock_service() -> MockTranslationService:
+    return MockTranslationService(MockTranslationBackend(seed=0))
+
+
+@pytest.fixture
+def tagging_service() -> MockTranslationService:
+    return MockTranslationService(
+        MockTranslationBackend(
+            transform=lambda text, source_lang, dest_lang: f"{dest_lang}:{text}"
+        )
+    )
+
+
+@pytest.fixture
+def tagging_pipeline(tagging_service) -> Pipeline:
+    return Pipeline(
+        service=tagging_service, source_lang="en", dest_langs=["fr", "de"]
+    )
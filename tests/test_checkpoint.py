@@ -0,0 +1,60 @@
+"""checkpoint module test suite"""
+import json
+from pathlib import Path
+
+import pytest
+
+from translatex.checkpoint import Checkpoint
+from translatex.pipeline import Pipeline
+
+TEXFILES_DIR_PATH = Path(__file__).parent.resolve() / "texfiles"
+
+
+def test_save_and_resume(tagging_pipeline, tagging_service, tmp_path):
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    pipeline = tagging_pipeline
+    checkpoint = Checkpoint()
+    checkpoint.add_hooks(pipeline)
+    outputs = pipeline.run(latex).outputs
+    checkpoint_path = tmp_path / "checkpoint.json"
+    checkpoint.save(checkpoint_path)
+    checkpoint = Checkpoint.load(checkpoint_path)
+    assert list(checkpoint.stages) == list(Pipeline.STAGES)
+    assert list(checkpoint.stages["Translator"]) == ["fr", "de"]
+    calls = tagging_service.backend.stats["calls"]
+    # Resuming after translation doesn't call the service
+    assert pipeline.resume_from(checkpoint, "Translator").outputs == outputs
+    assert tagging_service.backend.stats["calls"] == calls
+    for stage in Pipeline.STAGES[:-1]:
+        assert pipeline.resume_from(checkpoint, stage).outputs == outputs
+    # A translation fixed by hand is rebuilt
+    fixed = checkpoint.stages["Translator"]["fr"]["translated_string"]
+    fixed = fixed.replace("Hello World", "Bonjour le monde")
+    result = Pipeline(
+        service=tagging_service, source_lang="en", dest_langs="fr"
+    ).resume_from(checkpoint, "Translator", fixed)
+    assert "Bonjour le monde" in result.output
+    assert "\\begin{document}" in result.output
+
+
+def test_invalid_checkpoints(tagging_service, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    pipeline = Pipeline(service=tagging_service, stop="Marker")
+    checkpoint = Checkpoint()
+    checkpoint.add_hooks(pipeline)
+    pipeline.run((TEXFILES_DIR_PATH / "helloworld.tex").read_text())
+    with pytest.raises(ValueError, match="Tokenizer"):
+        Pipeline(service=tagging_service).resume_from(checkpoint, "Tokenizer")
+    with pytest.raises(ValueError):
+        pipeline.resume_from(checkpoint, "Marker")
+    with pytest.raises(ValueError):
+        checkpoint.restore("Translator", ["fr", "de"], "Bonjour")
+    checkpoint.save(checkpoint_path)
+    contents = json.loads(checkpoint_path.read_text())
+    contents["version"] = Checkpoint.VERSION + 1
+    checkpoint_path.write_text(json.dumps(contents))
+    with pytest.raises(ValueError, match="version"):
+        Checkpoint.load(checkpoint_path)
+    checkpoint_path.write_text("{}")
+    with pytest.raises(ValueError):
+        Checkpoint.load(checkpoint_path)
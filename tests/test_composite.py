@@ -0,0 +1,66 @@
+"""composite module test suite"""
+import time
+
+import pytest
+
+from translatex.composite import CompositeService
+from translatex.mock import MockTranslationBackend, MockTranslationService
+from translatex.translator import TranslationServiceError, Translator
+
+TOKENS = "[0-1] One sentence. [0-2] Another one. [0-3] Last one.\n"
+
+
+def mock(name, **backend_options):
+    service = MockTranslationService(
+        MockTranslationBackend(
+            transform=lambda text, source_lang, dest_lang: text.upper(),
+            **backend_options,
+        )
+    )
+    service.name = name
+    return service
+
+
+def test_limits():
+    primary = mock("Primary", char_limit=30, array_item_limit=4)
+    backup = mock("Backup", char_limit=20)
+    with CompositeService([primary, backup]) as service:
+        assert service.name == "Primary > Backup"
+        assert service.char_limit == 20
+        assert service.array_item_limit == 4
+    with pytest.raises(ValueError):
+        CompositeService([])
+
+
+def test_failover():
+    primary = mock("Primary", error_rate=1.0)
+    backup = mock("Backup")
+    trans = Translator(TOKENS)
+    with CompositeService([primary, backup]) as service:
+        trans.translate(service=service)
+        assert service.stats["failed_over"] == service.stats["calls"]
+    assert trans.translated_string == TOKENS.upper()
+    assert set(trans.chunk_services) == {"Backup"}
+    with CompositeService([primary, mock("Other", error_rate=1.0)]) as service:
+        with pytest.raises(TranslationServiceError):
+            service.translate("Hello", "en", "fr")
+
+
+def test_hedging():
+    primary = mock("Primary", latency=0.01)
+    backup = mock("Backup", latency=0.01)
+    with CompositeService([primary, backup], min_samples=5) as service:
+        # No hedging until enough latencies are known
+        assert service.hedge_delay(0) is None
+        for _ in range(5):
+            service.translate("Hello", "en", "fr")
+        assert service.answering_service() == "Primary"
+        assert service.hedge_delay(0) >= 0.01
+        assert service.hedge_delay(1) is None
+        # The primary gets stuck, the backup answers instead
+        primary.backend.latency = 1.0
+        start = time.perf_counter()
+        assert service.translate("Hello", "en", "fr") == "HELLO"
+        assert time.perf_counter() - start < 0.5
+        assert service.answering_service() == "Backup"
+        assert service.stats["hedged"] == 1
@@ -0,0 +1,99 @@
+"""constructs module test suite"""
+import json
+from textwrap import dedent
+
+import pytest
+
+from translatex.constructs import DEFAULT_TABLES, ConstructTables
+from translatex.data import MATH_ENVS, SKIPPED_COMMANDS
+from translatex.mock import MockTranslationService
+from translatex.pipeline import Pipeline
+
+LATEX = dedent(
+    r"""
+    \documentclass{article}
+    \begin{document}
+    Some text \eqref{eq} and \url{https://example.org}.
+    \begin{align}
+    x^2 \text{for all} x
+    \end{align}
+    \end{document}
+    """
+)
+
+
+def test_defaults():
+    assert DEFAULT_TABLES.math_envs == frozenset(MATH_ENVS)
+    assert DEFAULT_TABLES.skipped_commands == frozenset(SKIPPED_COMMANDS)
+    # The longest names come first in the combined pattern
+    assert DEFAULT_TABLES.removed_commands_anchor.match(
+        "\\inputencoding{utf8}"
+    )[0] == ("\\inputencoding")
+    assert (
+        ConstructTables(
+            completely_removed_commands=[]
+        ).removed_commands_anchor.search("\\label{a}")
+        is None
+    )
+
+
+def test_load(tmp_path):
+    toml_path = tmp_path / "constructs.toml"
+    toml_path.write_text(
+        dedent(
+            """
+            math_envs = ["align"]
+
+            [completely_removed_commands]
+            add = ["eqref"]
+            remove = ["url"]
+            """
+        )
+    )
+    tables = ConstructTables.load(toml_path)
+    json_path = tmp_path / "constructs.json"
+    json_path.write_text(
+        json.dumps(
+            {
+                "math_envs": {"add": ["align"]},
+                "completely_removed_commands": {
+                    "add": ["eqref"],
+                    "remove": ["url"],
+                },
+            }
+        )
+    )
+    assert ConstructTables.load(json_path) == tables != DEFAULT_TABLES
+    assert "align" in tables.math_envs and "equation" in tables.math_envs
+    assert "eqref" in tables.skipped_commands
+    assert "url" not in tables.skipped_commands
+    for contents in (
+        "[1, 2]",
+        '{"unknown_envs": ["a"]}',
+        '{"math_envs": {"replace": ["a"]}}',
+        '{"math_envs": "align"}',
+        "not json",
+    ):
+        json_path.write_text(contents)
+        with pytest.raises(ValueError):
+            ConstructTables.load(json_path)
+
+
+def test_pipeline():
+    tables = DEFAULT_TABLES.merged(
+        {"math_envs": ["align"], "completely_removed_commands": ["eqref"]}
+    )
+    default = Pipeline(stop="Tokenizer").run(LATEX).output
+    tokenized = Pipeline(stop="Tokenizer", tables=tables).run(LATEX).output
+    assert "{eq}" in default and "{eq}" not in tokenized
+    # The align environment is marked as math, only its text is left
+    assert "x^2" in default and "x^2" not in tokenized
+    assert "for all" in tokenized
+    assert (
+        Pipeline(
+            service=MockTranslationService(), tables=tables, shard_workers=2
+        )
+        .run(LATEX)
+        .output
+        == LATEX
+    )
@@ -0,0 +1,76 @@
+"""journal module test suite"""
+import pytest
+
+from translatex.journal import TranslationJournal
+from translatex.translator import TranslationService, Translator
+
+
+class CrashingService(TranslationService):
+    """Translates to upper case and can simulate a crash after some calls."""
+
+    name = "Crashing service"
+    char_limit = 20
+
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.calls = list()
+
+    def translate(self, text: str, source_lang: str, dest_lang: str) -> str:
+        if (
+            self.crash_after is not None
+            and len(self.calls) >= self.crash_after
+        ):
+            raise ConnectionError("Network is down")
+        self.calls.append(text)
+        return text.upper()
+
+
+def test_record_and_replay(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    with TranslationJournal(path) as journal:
+        journal.record(0, "Hello", "en", "fr", "Bonjour")
+        journal.record(1, "World", "en", "fr", "Monde")
+        assert journal.lookup(0, "Hello", "en", "fr") == "Bonjour"
+    with TranslationJournal(path, resume=True) as journal:
+        assert len(journal) == 2
+        assert journal.lookup(1, "World", "en", "fr") == "Monde"
+        # Position, contents and languages all have to match
+        assert journal.lookup(0, "World", "en", "fr") is None
+        assert journal.lookup(1, "World", "en", "de") is None
+    with TranslationJournal(path) as journal:
+        assert len(journal) == 0
+
+
+def test_torn_line(tmp_path, caplog):
+    path = tmp_path / "journal.jsonl"
+    with TranslationJournal(path) as journal:
+        journal.record(0, "Hello", "en", "fr", "Bonjour")
+    with open(path, "a") as f:
+        f.write('{"index": 1, "hash": "12')
+    with caplog.at_level("WARNING"):
+        journal = TranslationJournal(path, resume=True)
+    assert caplog.text
+    assert len(journal) == 1
+    journal.record(1, "World", "en", "fr", "Monde")
+    journal.close()
+    with TranslationJournal(path, resume=True) as journal:
+        assert len(journal) == 2
+
+
+def test_resume_translation(tmp_path):
+    tokens = "[0-1] One sentence. [0-2] Another one. [0-3] Last one.\n"
+    path = tmp_path / "journal.jsonl"
+    trans = Translator(tokens)
+    with TranslationJournal(path) as journal:
+        with pytest.raises(ConnectionError):
+            trans.translate(service=CrashingService(2), journal=journal)
+        assert len(journal) == 2
+    service = CrashingService()
+    trans = Translator(tokens)
+    with TranslationJournal(path, resume=True) as journal:
+        trans.translate(service=service, journal=journal)
+        assert len(journal) == len(trans.plan(service))
+    assert len(service.calls) == len(trans.plan(service)) - 2
+    assert trans.translated_string == tokens.upper()
+    # The service is known for the chunks replayed from the journal too
+    assert set(trans.chunk_services) == {CrashingService.name}
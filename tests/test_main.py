@@ -1,15 +1,21 @@
 import filecmp
+import json
+import os
 from pathlib import Path
 from textwrap import dedent
 
 import pytest
 from conftest import TEST_SERVICE
+from custom import DoNoTTranslate
 
-from translatex.main import parse_args, translatex
+from translatex.composite import CompositeService
+from translatex.journal import TranslationJournal
+from translatex.main import default_journal, parse_args, translatex
 from translatex.marker import Marker
+from translatex.mock import MockTranslationBackend, MockTranslationService
 from translatex.preprocessor import Preprocessor
 from translatex.tokenizer import Tokenizer
-from translatex.translator import Translator
+from translatex.translator import TRANSLATION_SERVICE_CLASSES, Translator
 
 TEXFILES_DIR_PATH = Path(__file__).parent.resolve() / "texfiles"
 
@@ -126,3 +132,333 @@ def test_custom_api(tmp_path, request):
     translatex(args)
     # Check that the original and translated versions are identical
     assert filecmp.cmp(source_file_path, destination_file_path)
+
+
+def test_failing_services(tmp_path, monkeypatch, caplog):
+    class FailingService(MockTranslationService):
+        def __init__(self):
+            super().__init__(MockTranslationBackend(error_rate=1.0))
+
+    class FailingBackup(FailingService):
+        name = "Failing backup"
+
+    for service in (FailingService, FailingBackup):
+        monkeypatch.setitem(TRANSLATION_SERVICE_CLASSES, service.name, service)
+    closed = list()
+    close = CompositeService.close
+    monkeypatch.setattr(
+        CompositeService, "close", lambda self: closed.append(close(self))
+    )
+    journal_path = tmp_path / "journal.jsonl"
+    args = parse_args(
+        [
+            "--service",
+            FailingService.name,
+            "--backup-service",
+            FailingBackup.name,
+            "--journal",
+            journal_path.as_posix(),
+            (TEXFILES_DIR_PATH / "helloworld.tex").as_posix(),
+            (tmp_path / "out.tex").as_posix(),
+        ]
+    )
+    with pytest.raises(SystemExit) as e:
+        translatex(args)
+    assert e.value.code == 1
+    assert "--resume" in caplog.text
+    # The journal is kept to resume from, the hedging threads are stopped
+    assert journal_path.exists()
+    assert len(closed) == 1
+
+
+def test_dry_run_planned_calls(tmp_path, capsys):
+    source_file_path = TEXFILES_DIR_PATH / "helloworld.tex"
+    destination_file_path = tmp_path / "helloworld_out.tex"
+    args = parse_args(
+        [
+            "--dry-run",
+            "--service",
+            "DeepL",
+            source_file_path.as_posix(),
+            destination_file_path.as_posix(),
+        ]
+    )
+    translatex(args)
+    assert "1 API call(s) planned with DeepL" in capsys.readouterr().err
+    assert filecmp.cmp(source_file_path, destination_file_path)
+
+
+def test_estimate(tmp_path):
+    source_file_path = TEXFILES_DIR_PATH / "helloworld.tex"
+    destination_file_path = tmp_path / "estimate.txt"
+    args = parse_args(
+        [
+            "--estimate",
+            "--service",
+            "DeepL",
+            source_file_path.as_posix(),
+            destination_file_path.as_posix(),
+        ]
+    )
+    with pytest.raises(SystemExit):
+        translatex(args)
+    lines = destination_file_path.read_text().splitlines()
+    assert len(lines) == 1 + len(TRANSLATION_SERVICE_CLASSES)
+    assert lines[1].startswith("DeepL")
+
+
+def test_resume(tmp_path, request):
+    source_file_path = TEXFILES_DIR_PATH / "helloworld.tex"
+    destination_file_path = tmp_path / "helloworld_out.tex"
+    journal_path = tmp_path / "journal.jsonl"
+    p = Preprocessor(source_file_path.read_text())
+    p.process()
+    m = Marker.from_preprocessor(p)
+    m.mark()
+    t = Tokenizer.from_marker(m)
+    t.tokenize()
+    a = Translator.from_tokenizer(t)
+    with TranslationJournal(journal_path) as journal:
+        for (index,) in a.plan(DoNoTTranslate):
+            journal.record(
+                index,
+                a._chunks[index],
+                "en",
+                "fr",
+                a._chunks[index].replace("Hello World", "Bonjour le monde"),
+            )
+    args = parse_args(
+        [
+            "-sl",
+            "en",
+            "-dl",
+            "fr",
+            "--custom_api",
+            (request.path.parent / "custom.py").as_posix(),
+            "--service",
+            "Do not translate",
+            "--journal",
+            journal_path.as_posix(),
+            "--resume",
+            source_file_path.as_posix(),
+            destination_file_path.as_posix(),
+        ]
+    )
+    translatex(args)
+    assert "Bonjour le monde" in destination_file_path.read_text()
+    # The journal is deleted once the translation is complete
+    assert not journal_path.exists()
+
+
+def test_default_journal(tmp_path):
+    infile = tmp_path / "input.tex"
+    infile.write_text("Hello")
+    args = parse_args([infile.as_posix()])
+    assert default_journal(args, "_input", "Hello") == "_input_journal.jsonl"
+    # Runs reading stdin only share a journal with the same input
+    args = parse_args([])
+    first = default_journal(args, "_<stdin>", "Hello")
+    assert first.startswith("_<stdin>_") and first.endswith("_journal.jsonl")
+    assert first == default_journal(args, "_<stdin>", "Hello")
+    assert first != default_journal(args, "_<stdin>", "Goodbye")
+
+
+def test_multiple_destination_languages(tmp_path, request):
+    source_file_path = TEXFILES_DIR_PATH / "helloworld.tex"
+    destination_file_path = tmp_path / "helloworld_out.tex"
+    arguments = [
+        "-sl",
+        "en",
+        "-dl",
+        "fr, de,es,fr",
+        "--custom_api",
+        (request.path.parent / "custom.py").as_posix(),
+        "--service",
+        "Do not translate",
+        "--journal",
+        (tmp_path / "journal.jsonl").as_posix(),
+        source_file_path.as_posix(),
+        destination_file_path.as_posix(),
+    ]
+    args = parse_args(arguments)
+    assert args.dest_lang == ["fr", "de", "es"]
+    translatex(args)
+    for lang in args.dest_lang:
+        assert filecmp.cmp(
+            source_file_path, tmp_path / f"helloworld_out.{lang}.tex"
+        )
+    # Only the output and journal of each language were kept, then removed
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"helloworld_out.{lang}.tex" for lang in ("de", "es", "fr")
+    ]
+    # The given output file only names the ones of the languages, an existing
+    # one is left untouched
+    destination_file_path.write_text("Keep me")
+    translatex(parse_args(arguments))
+    assert destination_file_path.read_text() == "Keep me"
+
+
+def test_watch(tmp_path, request, monkeypatch, capsys):
+    source_file_path = tmp_path / "helloworld.tex"
+    source_file_path.write_text(
+        (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    )
+    destination_file_path = tmp_path / "helloworld_out.tex"
+    edited = source_file_path.read_text().replace("Hello", "Hello again")
+    sleeps = list()
+
+    def sleep(seconds):
+        # Save an edit, then stop watching on the next poll
+        sleeps.append(seconds)
+        if len(sleeps) == 1:
+            source_file_path.write_text(edited)
+            mtime = source_file_path.stat().st_mtime_ns + 10**9
+            os.utime(source_file_path, ns=(mtime, mtime))
+        else:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr("translatex.main.time.sleep", sleep)
+    args = parse_args(
+        [
+            "-sl",
+            "en",
+            "-dl",
+            "fr",
+            "--custom_api",
+            (request.path.parent / "custom.py").as_posix(),
+            "--service",
+            "Do not translate",
+            "--journal",
+            (tmp_path / "journal.jsonl").as_posix(),
+            "--watch",
+            source_file_path.as_posix(),
+            destination_file_path.as_posix(),
+        ]
+    )
+    translatex(args)
+    assert destination_file_path.read_text() == edited
+    assert "1 chunk(s) sent" in capsys.readouterr().err
+
+
+def test_progress(tmp_path, request, capsys):
+    source_file_path = TEXFILES_DIR_PATH / "helloworld.tex"
+    destination_file_path = tmp_path / "helloworld_out.tex"
+    progress_log_path = tmp_path / "progress.jsonl"
+    args = parse_args(
+        [
+            "-sl",
+            "en",
+            "-dl",
+            "fr",
+            "--custom_api",
+            (request.path.parent / "custom.py").as_posix(),
+            "--service",
+            "Do not translate",
+            "--journal",
+            (tmp_path / "journal.jsonl").as_posix(),
+            "--progress",
+            "--progress-log",
+            progress_log_path.as_posix(),
+            source_file_path.as_posix(),
+            destination_file_path.as_posix(),
+        ]
+    )
+    translatex(args)
+    args.progress_log.close()
+    assert "Translator [" in capsys.readouterr().err
+    events = [
+        json.loads(line) for line in progress_log_path.read_text().splitlines()
+    ]
+    assert events[0]["event"] == "stage_started"
+    assert events[-2] == {
+        **events[-2],
+        "event": "stage_finished",
+        "stage": "Translator",
+        "dest_lang": "fr",
+    }
+    assert events[-1]["event"] == "document_rebuilt"
+    assert events[-1]["missing_tokens"] == 0
+
+
+def test_metrics(tmp_path, request):
+    source_file_path = TEXFILES_DIR_PATH / "helloworld.tex"
+    destination_file_path = tmp_path / "helloworld_out.tex"
+    args = parse_args(
+        [
+            "-sl",
+            "en",
+            "-dl",
+            "fr",
+            "--custom_api",
+            (request.path.parent / "custom.py").as_posix(),
+            "--service",
+            "Do not translate",
+            "--journal",
+            (tmp_path / "journal.jsonl").as_posix(),
+            "--metrics",
+            (tmp_path / "metrics.prom").as_posix(),
+            "--metrics-json",
+            (tmp_path / "metrics.json").as_posix(),
+            source_file_path.as_posix(),
+            destination_file_path.as_posix(),
+        ]
+    )
+    translatex(args)
+    assert (
+        'translatex_requests_total{service="Do not translate"} 1'
+        in (tmp_path / "metrics.prom").read_text()
+    )
+    summary = json.loads((tmp_path / "metrics.json").read_text())
+    assert summary["documents_total"]["samples"][0]["value"] == 1
+
+
+def test_resume_from_checkpoint(tmp_path, request):
+    source_file_path = TEXFILES_DIR_PATH / "helloworld.tex"
+    translation_file_path = tmp_path / "helloworld_translated.txt"
+    destination_file_path = tmp_path / "helloworld_out.tex"
+    checkpoint_path = tmp_path / "checkpoint.json"
+    options = [
+        "-sl",
+        "en",
+        "-dl",
+        "fr",
+        "--custom_api",
+        (request.path.parent / "custom.py").as_posix(),
+        "--service",
+        "Do not translate",
+        "--journal",
+        (tmp_path / "journal.jsonl").as_posix(),
+        "--checkpoint",
+        checkpoint_path.as_posix(),
+    ]
+    translatex(
+        parse_args(
+            options
+            + [
+                "--stop",
+                "Translator",
+                source_file_path.as_posix(),
+                translation_file_path.as_posix(),
+            ]
+        )
+    )
+    assert checkpoint_path.exists()
+    translation_file_path.write_text(
+        translation_file_path.read_text().replace(
+            "Hello World", "Bonjour le monde"
+        )
+    )
+    translatex(
+        parse_args(
+            options
+            + [
+                "--resume-from",
+                "Translator",
+                translation_file_path.as_posix(),
+                destination_file_path.as_posix(),
+            ]
+        )
+    )
+    assert destination_file_path.read_text() == (
+        source_file_path.read_text().replace("Hello World", "Bonjour le monde")
+    )
@@ -169,3 +169,31 @@ def test_warning_unmarking(small_marker, caplog):
     with caplog.at_level("ERROR"):
         m.unmark()
     assert caplog.text
+
+
+def test_mark_node_contents5():
+    """Ensure Marker leaves the arguments of a marked environment out of the stored string"""
+    latex = r"""\begin{document}
+$\begin{array}{cc} x \text{a} & b \end{array}$
+\begin{lstlisting}[language=Python]
+language=Python
+\end{lstlisting}
+\end{document}
+"""
+    m = Marker(latex)
+    m.mark()
+    assert "[language=Python]" in m.marked_latex
+    assert "\nlanguage=Python\n" in m._marker_store.values()
+    assert not any("cc" in value for value in m._marker_store.values())
+    m.unmark()
+    assert m.unmarked_latex == latex
+
+
+def test_source_span(math_text_marker):
+    """Ensure Marker stores the same string whether it is sliced from the source or rebuilt from the nodes"""
+    m = math_text_marker
+    n = TexSoup(m.unmarked_latex).displaymath
+    body = m._node_body(n)
+    assert m._source_span(body) == "".join(str(x) for x in body)
+    assert m._source_span(body[2:5]) == "".join(str(x) for x in body[2:5])
+    assert m._source_span([]) == ""
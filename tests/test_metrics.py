@@ -0,0 +1,94 @@
+"""metrics module test suite"""
+import json
+import re
+from pathlib import Path
+
+from translatex.metrics import Histogram, Metrics
+from translatex.mock import MockTranslationBackend, MockTranslationService
+from translatex.pipeline import Pipeline
+from translatex.translator import TranslationCache
+
+TEXFILES_DIR_PATH = Path(__file__).parent.resolve() / "texfiles"
+
+LATEX = r"""\documentclass{article}
+\begin{document}
+Hello \textbf{bold} world.
+
+Some \emph{emphasized} text.
+\end{document}
+"""
+
+
+def test_histogram():
+    histogram = Histogram([0.1, 1])
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [1, 3, 4]
+    assert histogram.count == 4 and histogram.sum == 6.05
+
+
+def test_pipeline_metrics(tmp_path):
+    service = MockTranslationService()
+    pipeline = Pipeline(
+        service=service,
+        source_lang="en",
+        dest_langs=["fr", "de"],
+        cache=TranslationCache(),
+    )
+    metrics = Metrics()
+    metrics.add_hooks(pipeline)
+    pipeline.run(LATEX)
+    pipeline.run(LATEX)
+    requests = metrics.get("requests_total", service=service.name)
+    assert requests > 0
+    assert metrics.get("request_seconds", service=service.name).count == (
+        requests
+    )
+    assert metrics.get("characters_sent_total", service=service.name) > 0
+    # The second run only hits the cache
+    assert metrics.get("chunks_reused_total", source="cache") > 0
+    assert metrics.get("documents_total") == 2
+    assert 0 < metrics.get("tokens_per_1k_characters") < 1000
+    assert metrics.get("missing_total", stage="Tokenizer") == 0
+    assert metrics.get("stage_seconds", stage="Marker").count == 2
+    assert metrics.get("stage_seconds", stage="Translator").count == 4
+    assert metrics.get("stage_seconds", stage="Rebuild").count == 4
+    metrics.write(tmp_path / "metrics.prom", tmp_path / "metrics.json")
+    text = (tmp_path / "metrics.prom").read_text()
+    assert "# TYPE translatex_request_seconds histogram" in text
+    assert (
+        f'translatex_requests_total{{service="{service.name}"}} {requests}'
+        in text
+    )
+    assert 'translatex_stage_seconds_bucket{stage="Marker",le="+Inf"} 2' in (
+        text
+    )
+    assert 'translatex_stage_seconds_count{stage="Marker"} 2' in text
+    summary = json.loads((tmp_path / "metrics.json").read_text())
+    assert summary["documents_total"]["samples"] == [
+        {"labels": {}, "value": 2}
+    ]
+    assert summary["stage_seconds"]["type"] == "histogram"
+    assert summary["stage_seconds"]["samples"][0]["buckets"]["+Inf"] > 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "metrics.json",
+        "metrics.prom",
+    ]
+
+
+def test_missing_tokens():
+    # The service drops the first token of every text
+    service = MockTranslationService(
+        MockTranslationBackend(
+            transform=lambda text, source_lang, dest_lang: re.sub(
+                r"\[\d+-\d+\]", "", text, count=1
+            )
+        )
+    )
+    pipeline = Pipeline(service=service, source_lang="en", dest_langs="fr")
+    metrics = Metrics()
+    metrics.add_hooks(pipeline)
+    pipeline.run(LATEX)
+    assert metrics.get("chunks_retried_total") > 0
+    assert metrics.get("missing_total", stage="Tokenizer") > 0
+    assert "translatex_missing_total{stage=" in metrics.prometheus_text()
@@ -0,0 +1,91 @@
+"""mock module test suite"""
+import pytest
+import requests
+
+from translatex.mock import (
+    MockServiceError,
+    MockTranslationBackend,
+    MockTranslationServer,
+    MockTranslationService,
+)
+from translatex.translator import GoogleTranslate, Translator
+
+
+def test_backend_creation():
+    with pytest.raises(ValueError):
+        MockTranslationBackend(distribution="spam")
+    with pytest.raises(ValueError):
+        MockTranslationBackend(error_rate=2)
+
+
+@pytest.mark.parametrize("distribution", MockTranslationBackend.DISTRIBUTIONS)
+def test_latency_reproducible(distribution):
+    draws = list()
+    for _ in range(2):
+        backend = MockTranslationBackend(
+            0.1, 0.05, distribution, per_char_latency=0.001, seed=42
+        )
+        draws.append([backend.draw_latency(10) for _ in range(20)])
+    assert draws[0] == draws[1]
+    assert all(latency >= 0.01 for latency in draws[0])
+
+
+def test_backend_errors():
+    backend = MockTranslationBackend(rate_limit_rate=1)
+    with pytest.raises(MockServiceError) as e:
+        backend.handle(["Hello"], "en", "fr")
+    assert e.value.status_code == 429
+    backend = MockTranslationBackend(error_rate=1)
+    with pytest.raises(MockServiceError) as e:
+        backend.handle(["Hello"], "en", "fr")
+    assert e.value.status_code == 500
+    backend = MockTranslationBackend(
+        char_limit=5, array_item_limit=2, overall_char_limit=12
+    )
+    assert backend.handle(["Hello"], "en", "fr") == ["Hello"]
+    with pytest.raises(MockServiceError):
+        backend.handle(["Hello!"], "en", "fr")
+    with pytest.raises(MockServiceError):
+        backend.handle(["a", "b", "c"], "en", "fr", array=True)
+    with pytest.raises(MockServiceError) as e:
+        backend.handle(["Hello", "World"], "en", "fr", array=True)
+    assert e.value.status_code == 403
+    assert backend.stats["calls"] == 4
+    assert backend.stats["characters"] == 5
+    assert backend.stats["rejected"] == 3
+
+
+def test_service(mock_service):
+    tokens = "[0-1] Some words [0-2]{[0-3] around} tokens. " * 100
+    trans = Translator(tokens)
+    trans.deduplicate = False
+    trans.translate(service=mock_service)
+    assert trans.translated_string == tokens
+    assert mock_service.backend.stats["characters"] == len(tokens)
+    assert mock_service.backend.stats["calls"] == len(trans.plan(mock_service))
+    service = MockTranslationService(MockTranslationBackend(char_limit=100))
+    assert service.char_limit == 100
+    assert service.array_item_limit == MockTranslationService.array_item_limit
+
+
+def test_server(monkeypatch):
+    backend = MockTranslationBackend(
+        transform=lambda text, source_lang, dest_lang: text.upper()
+    )
+    with MockTranslationServer(backend) as server:
+        monkeypatch.setenv(GoogleTranslate.api_key_env_variable_name, "key")
+        service = GoogleTranslate()
+        service.url = server.google_url
+        assert service.translate("Hello", "en", "fr") == "HELLO"
+        assert service.translate_array(["a", "b"], "en", "fr") == ["A", "B"]
+        r = requests.post(
+            server.irma_url,
+            json={"text": "Hello", "source_lang": "en", "target_lang": "fr"},
+            timeout=10,
+        )
+        assert r.json() == {"translations": [{"text": "HELLO"}]}
+        backend.rate_limit_rate = 1
+        r = requests.post(server.irma_url, json={"text": "Hi"}, timeout=10)
+        assert r.status_code == 429
+        assert "Retry-After" in r.headers
+    assert backend.stats["calls"] == 4
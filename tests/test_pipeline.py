@@ -0,0 +1,184 @@
+"""pipeline module test suite"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from test_translator import CPUBoundService
+
+from translatex.mock import MockTranslationService
+from translatex.pipeline import Pipeline
+from translatex.translator import (
+    TRANSLATION_SERVICE_CLASSES,
+    ServiceProcessPool,
+    TranslationCache,
+)
+
+TEXFILES_DIR_PATH = Path(__file__).parent.resolve() / "texfiles"
+
+
+def test_run(tagging_pipeline, tagging_service):
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    pipeline = tagging_pipeline
+    calls = list()
+    for stage in Pipeline.STAGES:
+        pipeline.add_hook(
+            stage,
+            lambda stage_object, dest_lang, stage=stage: calls.append(
+                (stage, dest_lang)
+            ),
+        )
+    result = pipeline.run(latex)
+    assert result.stopped_at is None
+    assert "fr:" in result.outputs["fr"] and "de:" in result.outputs["de"]
+    assert calls == [
+        ("Preprocessor", None),
+        ("Marker", None),
+        ("Tokenizer", None),
+        ("Translator", "fr"),
+        ("Translator", "de"),
+    ]
+    # The service is kept for the next runs, each language of each run is sent
+    assert pipeline.run(latex).outputs == result.outputs
+    assert tagging_service.backend.stats["calls"] == 2 * 2 * len(
+        result.translators["fr"].plan(tagging_service)
+    )
+
+
+def test_ignore_regions(tagging_service):
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    head, tail = latex.split("\\end{document}")
+    region = "%@ignore{\nNot translated, \\textbf{not parsed}\n%@ignore}\n"
+    latex = f"{head}{region}\\end{{document}}{tail}"
+    tokenized = Pipeline(stop="Tokenizer").run(latex).output
+    assert "parsed" not in tokenized
+    result = Pipeline(
+        service=tagging_service, source_lang="en", dest_langs=["fr"]
+    ).run(latex)
+    assert region in result.outputs["fr"]
+
+
+def test_stop_and_dry_run(tagging_service):
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    result = Pipeline(service=tagging_service, stop="Tokenizer").run(latex)
+    assert result.stopped_at == "Tokenizer"
+    assert result.output == result.tokenizer.tokenized_string
+    assert not result.translators
+    result = Pipeline(service=tagging_service, dry_run=True).run(latex)
+    assert result.output == latex
+    assert tagging_service.backend.stats["calls"] == 0
+    with pytest.raises(ValueError):
+        Pipeline(stop="Detokenizer")
+    with pytest.raises(ValueError):
+        Pipeline().add_hook("Detokenizer", print)
+
+
+def test_cache(tagging_service):
+    paragraphs = [
+        f"Paragraph \\textbf{{{n}}} has a first sentence. "
+        f"And a \\emph{{second}} one about {n}."
+        for n in ("one", "two", "three", "four")
+    ]
+    latex = (
+        "\\documentclass{article}\n\\begin{document}\n"
+        + "\n\n".join(paragraphs)
+        + "\n\\end{document}\n"
+    )
+    pipeline = Pipeline(
+        service=tagging_service,
+        source_lang="en",
+        dest_langs="fr",
+        cache=TranslationCache(),
+    )
+    pipeline.run(latex)
+    # Each sentence is a chunk of its own with a service supporting arrays
+    sentences = tagging_service.backend.stats["texts"]
+    assert sentences == 9
+    # A new token in the first paragraph renumbers the tokens of the others
+    edited = latex.replace("{one} has", "{one} \\emph{now} has")
+    result = pipeline.run(edited)
+    # Only the edited sentence is translated again
+    assert tagging_service.backend.stats["calls"] == 2
+    assert tagging_service.backend.stats["texts"] == sentences + 1
+    assert pipeline.cache.stats["hits"] == sentences - 1
+    assert result.output.count("fr:") == sentences
+    assert (
+        result.output
+        == Pipeline(
+            service=tagging_service,
+            source_lang="en",
+            dest_langs="fr",
+            cache=TranslationCache(),
+        )
+        .run(edited)
+        .output
+    )
+
+
+def test_low_memory(tagging_pipeline, tagging_service):
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    outputs = tagging_pipeline.run(latex)
+    result = Pipeline(
+        service=tagging_service,
+        source_lang="en",
+        dest_langs=["fr", "de"],
+        low_memory=True,
+    ).run(latex)
+    assert result.outputs == outputs.outputs
+    # Only the stores and translations are left
+    assert result.preprocessor.base_latex == ""
+    assert result.marker.marked_latex == result.marker.unmarked_latex == ""
+    assert result.tokenizer.tokenized_string == ""
+    assert result.tokenizer.marked_string == ""
+    assert result.translators["fr"].tokenized_string == ""
+    assert result.translators["fr"].chunk_services
+
+
+def test_service_created_once(monkeypatch):
+    created = list()
+
+    class SlowService(MockTranslationService):
+        def __init__(self):
+            time.sleep(0.05)
+            created.append(self)
+            super().__init__()
+
+    monkeypatch.setitem(TRANSLATION_SERVICE_CLASSES, "Slow", SlowService)
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    pipeline = Pipeline(service="Slow", dest_langs=["fr", "de", "es"])
+    result = pipeline.run(latex)
+    assert len(created) == 1
+    assert set(result.outputs) == {"fr", "de", "es"}
+    pipeline = Pipeline(service="Slow")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        services = list(executor.map(lambda _: pipeline.service, range(4)))
+    assert len(set(map(id, services))) == 1
+    assert len(created) == 2
+
+
+def test_pool_shared(monkeypatch):
+    """Ensure the worker processes of a CPU bound service are started once for all the runs and languages"""
+    started = list()
+
+    class CountingPool(ServiceProcessPool):
+        def __init__(self, *args, **kwargs):
+            started.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr("translatex.pipeline.ServiceProcessPool", CountingPool)
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    with Pipeline(
+        service=CPUBoundService(), source_lang="en", dest_langs=["fr", "de"]
+    ) as pipeline:
+        for _ in range(2):
+            result = pipeline.run(latex)
+            assert "HELLO WORLD" in result.outputs["fr"]
+            assert "HELLO WORLD" in result.outputs["de"]
+        assert len(started) == 1
+    assert pipeline._pool is None
+    # A pool given to the pipeline is left for the one who gave it to close
+    with ServiceProcessPool(CPUBoundService, max_workers=1) as pool:
+        with Pipeline(service=CPUBoundService(), pool=pool) as pipeline:
+            assert pipeline.pool is pool
+        assert pool.submit(["a"], "en", "fr").result() == ["A"]
+    assert len(started) == 1
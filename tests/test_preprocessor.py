@@ -59,3 +59,82 @@ def test_warning_rebuild(small_preprocessor, caplog):
     with caplog.at_level("ERROR"):
         p.rebuild()
     assert caplog.text
+
+
+IGNORED_LATEX = r"""\documentclass{article}
+\begin{document}
+Hello world.
+%@ignore{ Nothing to translate here
+\begin{tabular}{ll}
+Name & Value \\
+\end{tabular}
+%@ignore} End of the region
+%@{
+Goodbye.
+%@--
+% Au revoir.
+%@}
+\end{document}
+"""
+
+
+def test_ignore_regions():
+    """Ensure Preprocessor replaces each ignore region with a single indicator and always puts it back as is"""
+    p = Preprocessor(IGNORED_LATEX)
+    p.process()
+    assert "tabular" not in p.processed_latex
+    assert "%@ignore" not in p.processed_latex
+    assert p.processed_latex.count("TRANSLATEX_MANUAL_REPLACEMENT") == 2
+    p.rebuild()
+    region = IGNORED_LATEX[
+        IGNORED_LATEX.index("%@ignore{") : IGNORED_LATEX.index("%@{")
+    ]
+    assert region in p.unprocessed_latex
+    assert "Au revoir." in p.unprocessed_latex
+    p = Preprocessor(IGNORED_LATEX)
+    p.process()
+    p.rebuild(Preprocessor.DISABLE_SUBSTITUTION)
+    assert p.unprocessed_latex == IGNORED_LATEX
+
+
+def test_ignore_regions_several_and_unterminated(caplog):
+    """Ensure each ignore region ends at the first end statement after it and an unterminated one is left as is"""
+    latex = "a\n%@ignore{\nb\n%@ignore}\nc\n%@ignore{\nd\n%@ignore}\ne\n"
+    p = Preprocessor(latex)
+    p.process()
+    assert p.processed_latex.split("\n")[::2] == ["a", "c", "e"]
+    p.rebuild()
+    assert p.unprocessed_latex == latex
+    p = Preprocessor("a\n%@ignore{\nb\n")
+    with caplog.at_level("WARNING"):
+        p.process()
+    assert "without an end" in caplog.text
+    assert p.processed_latex == "a\n%@ignore{\nb\n"
+
+
+@pytest.mark.parametrize(
+    "latex",
+    [
+        "%@{\norig1\n%@ignore{\nIGN\n%@ignore}\n%@--\n% repl1\n%@}\n",
+        "%@{\norig1\n%@--\n% repl1\n%@ignore{\nIGN\n%@ignore}\n%@}\n",
+        "%@{\na\n%@--\n% b\n%@}\n%@ignore{\nIGN\n%@ignore}\n"
+        "%@{\nc\n%@--\n% d\n%@}\n",
+    ],
+    ids=["in-original", "in-replacement", "between-blocks"],
+)
+def test_ignore_regions_in_substitution_blocks(latex, caplog):
+    """Ensure ignore regions caught inside manual substitution blocks are put back, as is unless replaced"""
+    region = "%@ignore{\nIGN\n%@ignore}\n"
+    p = Preprocessor(latex)
+    p.process()
+    with caplog.at_level("ERROR"):
+        p.rebuild(Preprocessor.DISABLE_SUBSTITUTION)
+        assert p.unprocessed_latex == latex
+        p.rebuild()
+    assert not caplog.text
+    assert not p.missing_indicators
+    assert "repl1" in p.unprocessed_latex or "b\n" in p.unprocessed_latex
+    # Dropped with the original lines, kept as is in the replacement
+    assert (region in p.unprocessed_latex) != latex.startswith(
+        "%@{\norig1\n%@ignore{"
+    )
@@ -0,0 +1,111 @@
+"""progress module test suite"""
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from translatex.progress import JsonLinesWriter, Progress, ProgressBar
+
+TEXFILES_DIR_PATH = Path(__file__).parent.resolve() / "texfiles"
+
+
+def test_events(tagging_pipeline, tagging_service):
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    body = "Hello world. " * 3
+    latex = latex.replace("Hello world", f"{body}\n\n{body}\n\n\\emph{{x}}")
+    pipeline = tagging_pipeline
+    events = list()
+    pipeline.progress.subscribe(events.append)
+    pipeline.run(latex)
+    kinds = [event["event"] for event in events]
+    assert set(kinds) <= set(Progress.EVENTS)
+    started = [
+        (event["stage"], event["dest_lang"])
+        for event in events
+        if event["event"] == "stage_started"
+    ]
+    assert started[:3] == [
+        ("Preprocessor", None),
+        ("Marker", None),
+        ("Tokenizer", None),
+    ]
+    assert sorted(started[3:]) == [("Translator", "de"), ("Translator", "fr")]
+    assert kinds.count("stage_finished") == 5
+    assert all(
+        event["seconds"] >= 0
+        for event in events
+        if event["event"] == "stage_finished"
+    )
+    sent = [event for event in events if event["event"] == "chunks_sent"]
+    received = [
+        event for event in events if event["event"] == "chunks_received"
+    ]
+    assert len(sent) == len(received) > 0
+    assert {event["service"] for event in received} == {tagging_service.name}
+    stats = pipeline.progress.stats
+    assert stats["chunks_sent"] == stats["chunks_received"] == len(sent)
+    assert stats["characters_received"] > stats["characters_sent"]
+    # Every character planned was translated or reused
+    assert pipeline.progress.fraction == 1.0
+    assert pipeline.progress.eta == 0
+    # Running again starts over
+    pipeline.run(latex)
+    assert pipeline.progress.stats == stats
+
+
+def test_duplicates_and_cache():
+    progress = Progress()
+    progress.emit("translation_planned", dest_lang="fr", characters=100)
+    assert progress.fraction == 0 and progress.eta is None
+    progress.emit(
+        "chunks_reused",
+        dest_lang="fr",
+        chunks=1,
+        characters=50,
+        source="cache",
+    )
+    assert progress.fraction == 0.5 and progress.eta is None
+    progress.emit(
+        "chunks_received",
+        dest_lang="fr",
+        chunks=1,
+        characters=25,
+        received_characters=30,
+        seconds=0.1,
+        service="Mock",
+        retry=False,
+    )
+    assert progress.fraction == 0.75
+    # The reused characters took no time, only half as long again is left
+    assert 0 < progress.eta < progress.throughput
+    assert progress.stats["chunks_reused"] == 1
+    with pytest.raises(ValueError):
+        progress.emit("unknown")
+
+
+def test_json_lines_and_bar():
+    progress = Progress()
+    fp = io.StringIO()
+    progress.subscribe(JsonLinesWriter(fp))
+    stream = io.StringIO()
+    bar = ProgressBar(progress, stream, width=10, interval=0)
+    progress.emit("stage_started", stage="Translator", dest_lang="fr")
+    progress.emit("translation_planned", dest_lang="fr", characters=100)
+    progress.emit(
+        "chunks_reused",
+        dest_lang="fr",
+        chunks=1,
+        characters=50,
+        source="journal",
+    )
+    assert bar.render() == "Translator [#####-----]  50%"
+    bar.close()
+    assert stream.getvalue().endswith("50%\n")
+    events = [json.loads(line) for line in fp.getvalue().splitlines()]
+    assert [event["event"] for event in events] == [
+        "stage_started",
+        "translation_planned",
+        "chunks_reused",
+    ]
+    assert events[2]["source"] == "journal"
@@ -0,0 +1,193 @@
+"""server module test suite"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+from test_translator import CPUBoundService
+
+from translatex.mock import MockTranslationBackend, MockTranslationService
+from translatex.server import TranslationServer
+
+TEXFILES_DIR_PATH = Path(__file__).parent.resolve() / "texfiles"
+
+
+def post(url, fields):
+    request = urllib.request.Request(
+        url + TranslationServer.TRANSLATE_PATH,
+        data=json.dumps(fields).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def get(url, path=TranslationServer.HEALTH_PATH):
+    try:
+        with urllib.request.urlopen(url + path) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_translate(tagging_service):
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    with TranslationServer(
+        service=tagging_service, dest_langs="fr", port=0
+    ) as server:
+        status, answer = post(
+            server.url, {"latex": latex, "dest_langs": ["fr", "de"]}
+        )
+        assert status == 200
+        assert "fr:" in answer["outputs"]["fr"]
+        assert "de:" in answer["outputs"]["de"]
+        stats = answer["stats"]
+        assert stats["characters"] == len(latex)
+        assert stats["seconds"] >= 0 and stats["queue_seconds"] >= 0
+        assert stats["languages"]["fr"]["chunks"] > 0
+        assert stats["languages"]["de"]["services"] == {
+            tagging_service.name: stats["languages"]["de"]["chunks"]
+        }
+        assert stats["chunks_received"] == sum(
+            language["chunks"] for language in stats["languages"].values()
+        )
+        # The service is warm for the next documents, each getting a
+        # pipeline of its own
+        first = server.pipeline(dest_langs=["fr", "de"])
+        second = server.pipeline(dest_langs=["fr", "de"])
+        assert first is not second
+        assert first.service is second.service is tagging_service
+        status, answer = post(server.url, {"latex": latex})
+        assert list(answer["outputs"]) == ["fr"]
+        status, answer = post(
+            server.url, {"latex": latex, "dest_langs": "fr, de"}
+        )
+        assert list(answer["outputs"]) == ["fr", "de"]
+        status, health = get(server.url)
+        assert status == 200
+        assert health["status"] == "ok"
+        assert health["completed"] == 3
+        assert health["queued"] == health["running"] == health["failed"] == 0
+
+
+def test_bad_requests(tagging_service):
+    with TranslationServer(service=tagging_service, port=0) as server:
+        assert post(server.url, {"text": "Hello"})[0] == 400
+        status, answer = post(
+            server.url, {"latex": "Hello", "service": "Unknown"}
+        )
+        assert status == 400 and "Unknown" in answer["error"]
+        status, answer = post(
+            server.url, {"latex": "Hello", "dest_langs": " , "}
+        )
+        assert status == 400
+        # Invalid requests never take a place in the queue
+        status, health = get(server.url)
+        assert health["queued"] == health["failed"] == 0
+        assert get(server.url, "/unknown")[0] == 404
+    with pytest.raises(ValueError):
+        TranslationServer(workers=0, port=0)
+
+
+def test_queue_limit():
+    release = threading.Event()
+
+    def blocking(text, source_lang, dest_lang):
+        release.wait(10)
+        return text
+
+    service = MockTranslationService(
+        MockTranslationBackend(transform=blocking)
+    )
+    with TranslationServer(
+        service=service, port=0, workers=1, queue_size=1
+    ) as server:
+        answers = list()
+        clients = [
+            threading.Thread(
+                target=lambda: answers.append(
+                    post(server.url, {"latex": "Hello world."})
+                )
+            )
+            for _ in range(2)
+        ]
+        for client in clients:
+            client.start()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            health = get(server.url)[1]
+            if health["running"] == 1 and health["queued"] == 1:
+                break
+            time.sleep(0.01)
+        assert (health["running"], health["queued"]) == (1, 1)
+        status, answer = post(server.url, {"latex": "Hello world."})
+        assert status == 503
+        release.set()
+        for client in clients:
+            client.join()
+        assert [status for status, _ in answers] == [200, 200]
+        health = get(server.url)[1]
+        assert health["rejected"] == 1 and health["completed"] == 2
+
+
+def test_concurrent_documents():
+    """Ensure documents translated at the same time with the same service and languages keep their progress apart"""
+    running = set()
+    both_running = threading.Event()
+
+    def overlapping(text, source_lang, dest_lang):
+        running.add(threading.get_ident())
+        if len(running) == 2:
+            both_running.set()
+        both_running.wait(10)
+        return text
+
+    service = MockTranslationService(
+        MockTranslationBackend(transform=overlapping)
+    )
+    documents = [
+        "Hello world.",
+        "One sentence. Another one. And a third one, a bit longer.",
+    ]
+    with TranslationServer(service=service, port=0, workers=2) as server:
+        answers = dict()
+        clients = [
+            threading.Thread(
+                target=lambda latex=latex: answers.update(
+                    {latex: post(server.url, {"latex": latex})}
+                )
+            )
+            for latex in documents
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    assert both_running.is_set()
+    for latex in documents:
+        status, answer = answers[latex]
+        assert status == 200
+        assert answer["outputs"]["en"] == latex
+        # Each run only counts the characters of its own document
+        assert answer["stats"]["characters_sent"] == len(latex)
+
+
+def test_pool_per_service():
+    """Ensure the pipelines of a CPU bound service share its worker processes until the server stops"""
+    latex = (TEXFILES_DIR_PATH / "helloworld.tex").read_text()
+    with TranslationServer(
+        service=CPUBoundService(), dest_langs="fr", port=0
+    ) as server:
+        pool = server.pipeline(dest_langs="fr").pool
+        assert pool is not None
+        assert server.pipeline(dest_langs="de").pool is pool
+        status, answer = post(server.url, {"latex": latex, "dest_langs": "de"})
+        assert status == 200
+        assert "HELLO WORLD" in answer["outputs"]["de"]
+    assert not server._pools
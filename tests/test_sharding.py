@@ -0,0 +1,93 @@
+"""sharding module test suite"""
+from textwrap import dedent
+
+from translatex.marker import Marker
+from translatex.mock import MockTranslationService
+from translatex.pipeline import Pipeline
+from translatex.sharding import mark_sharded, split_shards
+
+DOCUMENT = dedent(
+    r"""
+    \documentclass{article}
+    \begin{document}
+    \section{First}
+    Some \textbf{bold} text.
+    % \section{Commented out}
+    \begin{minipage}{5cm}
+    \section{Inside an environment}
+    \end{minipage}
+    \section*{Second}
+    Some \emph{emphasized} text and $x^2$.
+    \chapter{Third}
+    \begin{itemize}
+    \item One
+    \item Two
+    \end{itemize}
+    \end{document}
+    """
+)
+
+
+def test_split_shards():
+    head, shards, tail = split_shards(DOCUMENT, 10)
+    assert head.endswith("\\begin{document}")
+    assert tail.startswith("\\end{document}")
+    assert head + "".join(shards) + tail == DOCUMENT
+    assert [shard.lstrip().split("{")[0] for shard in shards] == [
+        "\\section",
+        "\\section*",
+        "\\chapter",
+    ]
+    # Sections are grouped into the number of shards asked for
+    assert len(split_shards(DOCUMENT, 2)[1]) == 2
+    assert len(split_shards(DOCUMENT, 1)[1]) == 1
+    head, shards, tail = split_shards("No document environment", 4)
+    assert (head, shards, tail) == ("", ["No document environment"], "")
+
+
+def test_mark_sharded():
+    whole = Marker(DOCUMENT)
+    whole.mark()
+    sharded = mark_sharded(DOCUMENT, max_workers=3)
+    assert sharded.marker_count > whole.marker_count
+    assert len(sharded.dump_store().splitlines()) == len(
+        whole.dump_store().splitlines()
+    )
+    sharded.unmark()
+    assert sharded.unmarked_latex == DOCUMENT
+    # The next stages see the same document
+    outputs = [
+        Pipeline(
+            service=MockTranslationService(), shard_workers=workers, stop=stop
+        )
+        .run(DOCUMENT)
+        .output
+        for stop in ("Tokenizer", None)
+        for workers in (1, 3)
+    ]
+    assert outputs[0] == outputs[1]
+    assert outputs[2] == outputs[3] == DOCUMENT
+
+
+def test_mark_sharded_in_process(monkeypatch, caplog):
+    with caplog.at_level("INFO"):
+        sharded = mark_sharded(DOCUMENT, max_workers=1, max_shard_length=60)
+    assert "one after the other" in caplog.text
+    sharded.unmark()
+    assert sharded.unmarked_latex == DOCUMENT
+    # The low memory mode marks shards of a bounded length in the current process
+    monkeypatch.setattr(Pipeline, "LOW_MEMORY_SHARD_LENGTH", 60)
+    outputs = [
+        Pipeline(
+            service=MockTranslationService(),
+            dest_langs=["fr", "de"],
+            low_memory=low_memory,
+            stop=stop,
+        )
+        .run(DOCUMENT)
+        .outputs
+        for stop in ("Tokenizer", None)
+        for low_memory in (False, True)
+    ]
+    assert outputs[0] == outputs[1]
+    assert outputs[2] == outputs[3] == {"fr": DOCUMENT, "de": DOCUMENT}
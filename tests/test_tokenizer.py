@@ -1,8 +1,16 @@
 """tokenizer module test suite"""
+import re
+import time
+from pathlib import Path
+
 import pytest
 
+from translatex.marker import Marker
+from translatex.preprocessor import Preprocessor
 from translatex.tokenizer import Tokenizer
 
+EXAMPLES_DIR_PATH = Path(__file__).parent.parent.resolve() / "examples"
+
 
 def test_creation(small_tokenizer):
     """Ensure Tokenizer created correctly with all its properties."""
@@ -72,6 +80,20 @@ def test_token_regex(small_tokenizer):
     assert t._token_regex() == r"\[(?:\d+)\.(?:\d+)\]"
 
 
+@pytest.mark.parametrize(
+    "variant", ["[3-4]", "[ 3 - 4 ]", "[3–4]", "(3-4)", "【３－４】"]
+)
+def test_tolerant_token_regex(variant):
+    """Ensure the tolerant token regex matches the variants of a token given back by automatic translators"""
+    pattern = re.compile(
+        Tokenizer.tolerant_token_regex(Tokenizer.DEFAULT_TOKEN_FORMAT)
+    )
+    match = pattern.fullmatch(variant)
+    assert match
+    assert (int(match[1]), int(match[2])) == (3, 4)
+    assert not pattern.search("3-4 and [3 4]")
+
+
 def test_undo_tokenization(small_tokenizer):
     """Ensure Tokenizer preserves all details of the original string when detokenization operation is done"""
     t = small_tokenizer
@@ -106,3 +128,218 @@ def test_warning_detokenization(small_tokenizer, caplog):
     with caplog.at_level("ERROR"):
         t.detokenize()
     assert caplog.text
+
+
+def test_engine(small_tokenizer):
+    """Ensure engine setter works correctly"""
+    t = small_tokenizer
+    assert t.engine == Tokenizer.DEFAULT_ENGINE
+    t.engine = Tokenizer.ENGINE_SINGLE_SCAN
+    with pytest.raises(ValueError):
+        t.engine = "spam"
+
+
+def tokenize_with_engine(marked_latex: str, engine: str) -> Tokenizer:
+    t = Tokenizer(marked_latex)
+    t.engine = engine
+    t.tokenize()
+    return t
+
+
+@pytest.mark.parametrize(
+    "latex",
+    [
+        "small_marker",
+        "math_marker",
+        "math_text_marker",
+        "code_marker",
+    ]
+    + sorted(EXAMPLES_DIR_PATH.glob("*.tex")),
+    ids=lambda latex: getattr(latex, "name", latex),
+)
+def test_single_scan_equivalence(latex, request):
+    """Ensure the single scan engine leaves the same text to translate as the passes"""
+    if isinstance(latex, str):
+        m = request.getfixturevalue(latex)
+    else:
+        p = Preprocessor(latex.read_text())
+        p.process()
+        m = Marker.from_preprocessor(p)
+    m.mark()
+    passes = tokenize_with_engine(m.marked_latex, Tokenizer.ENGINE_PASSES)
+    scan = tokenize_with_engine(m.marked_latex, Tokenizer.ENGINE_SINGLE_SCAN)
+    token_regex = Tokenizer.token_regex(Tokenizer.DEFAULT_TOKEN_FORMAT)
+    assert re.split(token_regex, scan.tokenized_string) == re.split(
+        token_regex, passes.tokenized_string
+    )
+    assert scan.total_token_count() == passes.total_token_count()
+
+
+@pytest.mark.parametrize(
+    "latex",
+    [
+        "small_marker",
+        "math_marker",
+        "math_text_marker",
+        "code_marker",
+    ]
+    + sorted(EXAMPLES_DIR_PATH.glob("*.tex")),
+    ids=lambda latex: getattr(latex, "name", latex),
+)
+def test_single_scan_undo_tokenization(latex, request):
+    """Ensure detokenization after the single scan engine gives back the same string as after the passes"""
+    if isinstance(latex, str):
+        m = request.getfixturevalue(latex)
+    else:
+        p = Preprocessor(latex.read_text())
+        p.process()
+        m = Marker.from_preprocessor(p)
+    m.mark()
+    passes = tokenize_with_engine(m.marked_latex, Tokenizer.ENGINE_PASSES)
+    scan = tokenize_with_engine(m.marked_latex, Tokenizer.ENGINE_SINGLE_SCAN)
+    passes.detokenize()
+    scan.detokenize()
+    assert scan.marked_string == passes.marked_string
+    # The engines number the tokens in a different order
+    assert len(scan.missing_tokens) == len(passes.missing_tokens)
+    if not passes.missing_tokens:
+        assert scan.marked_string == m.marked_latex
+
+
+@pytest.mark.parametrize(
+    "latex",
+    [
+        # Tokens inside the string stored for another token
+        r"\begin{minipage}{0.5\linewidth} Hi \end{minipage}",
+        # Backslashes inside kept curly braces
+        r"\section{Tables \\Taking control}",
+        # Curly braces following a token without content indicator
+        r"\begin{itemize} \item {\bfseries bold} \end{itemize}",
+    ],
+)
+def test_undo_tokenization_nested(latex):
+    """Ensure Tokenizer preserves all details of the original string when tokens are nested or next to braces"""
+    m = Marker(f"\\begin{{document}}\n{latex}\n\\end{{document}}\n")
+    m.mark()
+    t = Tokenizer.from_marker(m)
+    t.tokenize()
+    t.detokenize()
+    assert t.marked_string == m.marked_latex
+
+
+def test_unmatched_content_braces(caplog):
+    """Ensure a token whose content braces can't be matched never leaves its content indicator in the output"""
+    latex = (EXAMPLES_DIR_PATH / "simple.tex").read_text()
+    p = Preprocessor(latex)
+    p.process()
+    m = Marker.from_preprocessor(p)
+    m.mark()
+    t = Tokenizer.from_marker(m)
+    t.tokenize()
+    with caplog.at_level("ERROR"):
+        t.detokenize()
+    assert (
+        Tokenizer.DEFAULT_DETOKENIZER_CONTENT_INDICATOR not in t.marked_string
+    )
+    assert t.missing_tokens
+    assert "without the curly braces" in caplog.text
+    m.update_from_tokenizer(t)
+    m.unmark()
+    assert r"\texttt{\textbackslash" in m.unmarked_latex
+
+
+def test_pass_linearity():
+    """Ensure a tokenization pass tokenizes every match exactly once and numbers tokens in order"""
+    t = Tokenizer("//1// ")
+    tokenized = t._tokenize_comments("a % one\nb % two\nc % three\n")
+    assert tokenized == "a [0-1]\nb [0-2]\nc [0-3]\n"
+    assert list(t._token_store.values()) == ["% one", "% two", "% three"]
+
+
+def test_pass_timeout(small_tokenizer):
+    """Ensure pass timeout setter works correctly"""
+    t = small_tokenizer
+    assert t.pass_timeout == Tokenizer.DEFAULT_PASS_TIMEOUT
+    t.pass_timeout = None
+    with pytest.raises(ValueError):
+        t.pass_timeout = 0
+    assert t.pass_deadline == Tokenizer.DEFAULT_PASS_DEADLINE
+    t.pass_deadline = None
+    with pytest.raises(ValueError):
+        t.pass_deadline = -1
+
+
+PATHOLOGICAL_LATEX = {
+    "unbalanced_removed": r"\label{" + "a b c " * 2000,
+    "deep_removed": r"\label" + "{a " * 30 + "b c " * 500,
+    "brackets_removed": r"\label[" + "a [b] " * 1000,
+    "unbalanced_command": r"\//1//{" + "word " * 2000,
+    "deep_command": r"\//1//" + "{a " * 200,
+    "brackets_command": r"\//1//[" + "x " * 2000,
+    "backslashes_command": r"\//1//" + "\\" * 3000 + "{",
+    "alternating_command": r"\//1//" + "{}" * 2000 + "{",
+    "unbalanced_env": r"\begin{//1//}{" + "text " * 2000,
+    "backslashes_env": r"\begin{//1//}" + "\\" * 3000 + "{",
+    "paragraphs": (r"\label{" + "a b c " * 300 + "\n\n") * 3,
+}
+"""Adversarial inputs that make the recursive regexes backtrack for a long time"""
+
+
+@pytest.mark.parametrize(
+    "tokenize_pass",
+    [
+        "_tokenize_completely_removed",
+        "_tokenize_commands",
+        "_tokenize_named_envs",
+        "_tokenize_single_scan",
+    ],
+)
+@pytest.mark.parametrize(
+    "latex", PATHOLOGICAL_LATEX.values(), ids=PATHOLOGICAL_LATEX.keys()
+)
+def test_pass_timeout_fuzz(latex, tokenize_pass):
+    """Ensure no pass exceeds its time budget on pathological LaTeX and that the string can still be restored"""
+    t = Tokenizer("//1// ")
+    t.pass_timeout = 0.05
+    structures = latex.count("\n\n") + 1
+    start = time.perf_counter()
+    tokenized = getattr(t, tokenize_pass)(latex)
+    # The single scan engine may spend one budget searching and one finding the structure responsible
+    assert time.perf_counter() - start < 2 * structures * t.pass_timeout + 1
+    t.tokenized_string = tokenized
+    start = time.perf_counter()
+    t.detokenize()
+    assert time.perf_counter() - start < 2 * structures * t.pass_timeout + 1
+    assert t.marked_string == latex
+
+
+def test_pass_timeout_opaque(caplog):
+    """Ensure a structure that can't be matched in time is tokenized as is until the end of its paragraph"""
+    latex = r"\label{" + "a b c " * 2000 + "\n\nText \\label{x}"
+    t = Tokenizer("//1// ")
+    t.pass_timeout = 0.05
+    with caplog.at_level("WARNING"):
+        tokenized = t._tokenize_completely_removed(latex)
+    assert caplog.text
+    assert tokenized == "[0-1]\n\nText [0-2]"
+    t.tokenized_string = tokenized
+    t.detokenize()
+    assert t.marked_string == latex
+
+
+@pytest.mark.parametrize(
+    "tokenize_pass", ["_tokenize_completely_removed", "_tokenize_single_scan"]
+)
+def test_pass_deadline(tokenize_pass, monkeypatch, caplog):
+    """Ensure the structures left once a pass ran out of time are tokenized as is until the end of their paragraph"""
+    latex = "\n\n".join(r"Text \label{x} more" for _ in range(3))
+    t = Tokenizer("//1// ")
+    # Every pass starts out of time
+    monkeypatch.setattr(t, "_deadline", lambda: time.monotonic() - 1)
+    with caplog.at_level("WARNING"):
+        tokenized = getattr(t, tokenize_pass)(latex)
+    assert "timed out" in caplog.text
+    assert tokenized == "Text [0-1]\n\nText [0-2]\n\nText [0-3]"
+    t.tokenized_string = tokenized
+    t.detokenize()
+    assert t.marked_string == latex
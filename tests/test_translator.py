@@ -1,11 +1,19 @@
 """translator module test suite"""
+import json
+import os
+import re
 from textwrap import dedent
+from types import SimpleNamespace
 
 import pytest
 from conftest import TEST_SERVICE_CLASSES
 
 from translatex.translator import (
     TRANSLATION_SERVICE_CLASSES,
+    DeepL,
+    ServiceProcessPool,
+    TranslationService,
+    Translator,
     add_custom_translation_services,
 )
 
@@ -13,11 +21,18 @@ from translatex.translator import (
 def test_split_string_by_length(small_trans):
     s = "Yes, 3.14 is an approximation of pi."
     assert small_trans.split_string_by_length(s, 100) == [s]
-    assert small_trans.split_string_by_length(s, 4) == [s]
+    assert small_trans.split_string_by_length(s, 16) == [
+        "Yes, 3.14 is an ",
+        "approximation ",
+        "of pi.",
+    ]
+    chunks = small_trans.split_string_by_length(s, 4)
+    assert "".join(chunks) == s
+    assert all(len(chunk) <= 4 for chunk in chunks)
 
     s = "Hello world. I'm a 2-sentence string."
     assert small_trans.split_string_by_length(s, 100) == [s]
-    assert small_trans.split_string_by_length(s, 4) == [
+    assert small_trans.split_string_by_length(s, 24) == [
         "Hello world. ",
         "I'm a 2-sentence string.",
     ]
@@ -30,12 +45,312 @@ def test_split_string_by_length(small_trans):
     lines.
     """
     )
-    chunks = small_trans.split_string_by_length(s, 4)
+    chunks = small_trans.split_string_by_length(s, 20)
     assert chunks == [
         "\nHello world.\n",
         "I'm a string.\n",
-        "On multiple\nlines.",
+        "On multiple\nlines.\n",
+    ]
+
+
+def test_iter_chunks():
+    tokens = "[0-1] Some words [0-12]{[0-13] around} tokens. " * 20
+    chunks = Translator.iter_chunks(tokens, 30)
+    assert next(chunks) == "[0-1] Some words "
+    chunks = list(chunks)
+    assert "[0-1] Some words " + "".join(chunks) == tokens
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    # Tokens are never cut, even without whitespace to cut at
+    tokens = "word[0-1]word[0-2]word[0-3]"
+    chunks = Translator.split_string_by_length(tokens, 7)
+    assert "".join(chunks) == tokens
+    assert all(len(chunk) <= 7 for chunk in chunks)
+    assert [re.findall(r"\[\d-\d\]|\[|\]", chunk) for chunk in chunks] == [
+        [],
+        ["[0-1]"],
+        ["[0-2]"],
+        [],
+        ["[0-3]"],
     ]
+    assert Translator.split_string_by_length(tokens, 0) == [tokens]
+
+
+class ManglingService(TranslationService):
+    """Gives back tokens the way some automatic translators do."""
+
+    name = "Mangling service"
+    char_limit = 30
+
+    def __init__(self, variants):
+        self.variants = variants
+        self.calls = list()
+
+    def translate(self, text: str, source_lang: str, dest_lang: str) -> str:
+        self.calls.append(text)
+        for token, variant in self.variants.items():
+            text = text.replace(token, variant)
+        return text
+
+
+def test_recover_tokens(caplog):
+    tokens = "[0-1] First sentence. [0-2] Second one. [0-3] Third one.\n"
+    trans = Translator(tokens)
+    service = ManglingService(
+        {"[0-1]": "[ 0 - 1 ]", "[0-2]": "(0–2)", "[0-3]": "[0-3 ]"}
+    )
+    with caplog.at_level("WARNING"):
+        trans.translate(service=service)
+    assert not caplog.text
+    assert trans.unrecoverable_chunks == []
+    assert trans.translated_string == tokens
+
+
+def test_recover_tokens_unrecoverable(caplog):
+    tokens = "[0-1] First (0-1). [0-2] Second one. [0-3] Third one.\n"
+    trans = Translator(tokens)
+    service = ManglingService({"[0-2]": "two"})
+    with caplog.at_level("WARNING"):
+        trans.translate(service=service)
+    assert "[0-2]" in caplog.text
+    assert len(trans.unrecoverable_chunks) == 1
+    chunk = service.calls[trans.unrecoverable_chunks[0]]
+    assert "[0-2]" in chunk
+    # Text that only looks like a token is left alone
+    assert "(0-1)" in trans.translated_string
+    service.variants = dict()
+    service.calls = list()
+    trans.retranslate_unrecoverable(service=service)
+    assert service.calls == [chunk]
+    assert trans.unrecoverable_chunks == []
+    assert trans.translated_string == tokens
+
+
+class ArrayService(ManglingService):
+    """Supports arrays and counts the API calls."""
+
+    name = "Array service"
+    char_limit = 50
+    array_support = True
+    array_item_limit = 3
+    array_item_char_limit = 40
+    array_overall_char_limit = 100
+
+    def __init__(self):
+        super().__init__(dict())
+
+    def translate_array(self, texts, source_lang, dest_lang):
+        self.calls.append(texts)
+        return list(texts)
+
+
+def test_chunk_length_limit():
+    assert Translator.chunk_length_limit(ArrayService) == 40
+    assert Translator.chunk_length_limit(ManglingService) == 30
+    assert Translator.chunk_length_limit(TranslationService) == 0
+
+
+def test_pack_requests():
+    lengths = [40, 10, 35, 30, 5, 40, 25, 20]
+    requests = Translator.pack_requests(lengths, ArrayService)
+    assert sorted(index for request in requests for index in request) == list(
+        range(len(lengths))
+    )
+    for request in requests:
+        assert request == sorted(request)
+        assert len(request) <= ArrayService.array_item_limit
+        assert sum(lengths[index] for index in request) <= 100
+    # The total of 205 characters needs at least 3 calls
+    assert len(requests) == 3
+    requests = Translator.pack_requests(lengths, ManglingService)
+    assert requests == [[index] for index in range(len(lengths))]
+
+
+def test_plan_and_translate_arrays():
+    tokens = "[0-1] Some words [0-2]{[0-3] around} tokens. " * 10
+    trans = Translator(tokens)
+    service = ArrayService()
+    requests = trans.plan(service)
+    trans.translate(service=service)
+    assert trans.translated_string == tokens
+    assert len(service.calls) == len(requests)
+    assert all(len(call) <= 3 for call in service.calls)
+    assert all(len(text) <= 40 for call in service.calls for text in call)
+    # Tokens are never split between two chunks
+    texts = [text for call in service.calls for text in call]
+    assert all(
+        re.sub(r"\[\d-\d\]", "", text).count("[") == 0 for text in texts
+    )
+
+
+class WideArrayService(ArrayService):
+    """Takes more texts per call, so that the length of a call is the limit."""
+
+    name = "Wide array service"
+    array_item_limit = 10
+
+
+def test_plan_arrays_by_sentence():
+    """Ensure sentences of mixed lengths are packed into fewer calls than chunks filled greedily with them"""
+    tokens = "".join(
+        f"[{i // 10}-{i % 10}] "
+        + ("A long sentence {}. " if i % 2 else "Hi {}. ").format(i)
+        for i in range(60)
+    )
+    trans = Translator(tokens)
+    trans.deduplicate = False
+    requests = trans.plan(WideArrayService)
+    greedy_chunks = Translator.split_string_by_length(
+        tokens, Translator.chunk_length_limit(WideArrayService)
+    )
+    greedy_requests = Translator.pack_requests(
+        [WideArrayService.array_length(chunk) for chunk in greedy_chunks],
+        WideArrayService,
+    )
+    assert len(requests) < len(greedy_requests)
+    assert len(trans._chunks) > len(greedy_chunks)
+    trans.translate(service=WideArrayService())
+    assert trans.translated_string == tokens
+
+
+def test_plan_arrays_by_window(monkeypatch):
+    """Ensure calls are planned a window at a time with array support, before the whole string is cut"""
+    tokens = "".join(
+        f"[{i // 10}-{i % 10}] Sentence number {i}. " for i in range(200)
+    )
+    trans = Translator(tokens)
+    monkeypatch.setattr(Translator, "PACKING_WINDOW", 2)
+    requests = trans._plan(ArrayService)
+    first = next(requests)
+    assert len(trans._chunks) == 2 * ArrayService.array_item_limit
+    requests = [first] + list(requests)
+    assert len(trans._chunks) == 200
+    assert sorted(index for request in requests for index in request) == list(
+        range(200)
+    )
+    # Windows of full calls pack as tightly as the whole string at once
+    assert len(requests) == len(
+        Translator.pack_requests(
+            [ArrayService.array_length(chunk) for chunk in trans._chunks],
+            ArrayService,
+        )
+    )
+
+
+def test_deduplicate(caplog):
+    tokens = (
+        "[0-1] Intro. [1-1] Proof. [1-2] Done.\n\n[0-2] Middle.\n"
+        "[2-1] Proof. [2-2] Done. [0-3] End."
+    )
+    trans = Translator(tokens)
+    service = ArrayService()
+    with caplog.at_level("INFO"):
+        trans.translate(service=service)
+    texts = [text for call in service.calls for text in call]
+    # Repeated sentences are only sent once, whatever the sentences around
+    # them, with their own tokens given back
+    assert "[1-1] Proof. " in texts
+    assert "[2-1] Proof. " not in texts
+    assert "[1-2] Done.\n\n" in texts
+    assert "[2-2] Done. " not in texts
+    assert trans.translated_string == tokens
+    assert "Deduplicated 2 of 7 chunk(s)" in caplog.text
+    trans.deduplicate = False
+    assert sum(map(len, trans.plan(service))) == len(texts) + 2
+
+
+def test_estimate():
+    tokens = "".join(
+        f"[{i}-1] Some words [{i}-2]{{[{i}-3] around}} {i} tokens. "
+        for i in range(10)
+    )
+    trans = Translator(tokens)
+    trans.deduplicate = False
+    ArrayService.rate_limit = 2.0
+    ArrayService.call_latency = 0.1
+    ArrayService.overall_char_limit = 100
+    try:
+        estimate = trans.estimate(ArrayService)
+    finally:
+        del ArrayService.rate_limit
+        del ArrayService.call_latency
+        del ArrayService.overall_char_limit
+    assert estimate["service"] == ArrayService.name
+    assert estimate["characters"] == len(tokens)
+    assert estimate["requests"] == len(trans.plan(ArrayService))
+    # Waiting for the rate limit takes longer than the latency
+    assert estimate["seconds"] == estimate["requests"] * 0.5
+    assert estimate["over_limit"]
+    assert not trans.estimate(ArrayService)["over_limit"]
+
+
+class FakeDeepLTranslator:
+    """Stands for ``deepl.Translator`` and counts the API calls."""
+
+    calls = list()
+    glossaries = list()
+
+    def __init__(self, auth_key):
+        pass
+
+    def get_source_languages(self):
+        FakeDeepLTranslator.calls.append("languages")
+        return [
+            SimpleNamespace(code="FR", name="French"),
+            SimpleNamespace(code="EN", name="English"),
+        ]
+
+    def list_glossaries(self):
+        return FakeDeepLTranslator.glossaries
+
+    def create_glossary(self, name, source_lang, target_lang, entries):
+        glossary = SimpleNamespace(name=name, entries=entries)
+        FakeDeepLTranslator.glossaries.append(glossary)
+        return glossary
+
+    def translate_text(self, text, source_lang, target_lang, glossary=None):
+        FakeDeepLTranslator.calls.append((text, glossary))
+        return [SimpleNamespace(text=t.upper()) for t in text]
+
+
+@pytest.fixture
+def fake_deepl(monkeypatch, tmp_path):
+    monkeypatch.setenv(DeepL.api_key_env_variable_name, "fake")
+    monkeypatch.setattr("deepl.Translator", FakeDeepLTranslator)
+    monkeypatch.setattr(DeepL, "language_cache_path", tmp_path / "lang.json")
+    FakeDeepLTranslator.calls = list()
+    FakeDeepLTranslator.glossaries = list()
+
+
+def test_deepl_language_cache(fake_deepl):
+    assert DeepL().languages == {"en": "English", "fr": "French"}
+    assert DeepL().languages == {"en": "English", "fr": "French"}
+    assert FakeDeepLTranslator.calls == ["languages"]
+    # A stale cache is refreshed
+    os.utime(DeepL.language_cache_path, (0, 0))
+    DeepL()
+    assert FakeDeepLTranslator.calls == ["languages"] * 2
+
+
+def test_deepl_batch_and_glossary(fake_deepl, tmp_path):
+    glossary_path = tmp_path / "glossary.csv"
+    glossary_path.write_text("groupe,group\nanneau,ring\n")
+    tokens = "[0-1] Un groupe. [0-2] Un anneau. [0-3] Un corps.\n" * 20
+    trans = Translator(tokens)
+    service = DeepL(DeepL.load_glossary(glossary_path))
+    trans.translate(service=service, source_lang="fr", destination_lang="en")
+    assert trans.translated_string == tokens.upper()
+    calls = FakeDeepLTranslator.calls[1:]
+    assert len(calls) == len(trans.plan(service))
+    assert all(len(texts) <= 50 for texts, _ in calls)
+    # The glossary is created once and reused by the next runs
+    assert len(FakeDeepLTranslator.glossaries) == 1
+    assert FakeDeepLTranslator.glossaries[0].entries == {
+        "groupe": "group",
+        "anneau": "ring",
+    }
+    assert all(glossary is not None for _, glossary in calls)
+    DeepL(service.glossary).translate("Un groupe.", "fr", "en")
+    assert len(FakeDeepLTranslator.glossaries) == 1
 
 
 @pytest.mark.xfail(
@@ -102,3 +417,82 @@ class TestService2(TranslationService):
         TRANSLATION_SERVICE_CLASSES["Test service 2"]().translate("foo")
         == "Always no"
     )
+
+
+class CPUBoundService(TranslationService):
+    """Translates to upper case, tagged with the worker process it ran in."""
+
+    name = "CPU bound service"
+    char_limit = 20
+    cpu_bound = True
+
+    def __init__(self):
+        self.pid = os.getpid()
+
+    def translate(self, text: str, source_lang: str, dest_lang: str) -> str:
+        return text.upper() if self.pid != PARENT_PID else text
+
+
+# Spawned worker processes import this module again, they get the parent's PID from their environment
+PARENT_PID = int(
+    os.environ.setdefault("TRANSLATEX_TEST_PARENT_PID", str(os.getpid()))
+)
+
+
+def test_cpu_bound_service():
+    tokens = "[0-1] One sentence. [0-2] Another one. [0-3] Last one.\n" * 3
+    trans = Translator(tokens)
+    trans.deduplicate = False
+    trans.translate(service=CPUBoundService())
+    # Every chunk was translated in a worker process
+    assert trans.translated_string == tokens.upper()
+    assert len(trans.chunk_services) == len(trans.plan(CPUBoundService)) > 1
+
+
+def test_service_process_pool_custom_file(tmp_path):
+    custom_file = tmp_path / "custom_cpu.py"
+    custom_file.write_text(
+        dedent(
+            """\
+            import os
+            from translatex.translator import TranslationService
+
+            class CustomCPUService(TranslationService):
+                name = "Custom CPU service"
+                cpu_bound = True
+
+                def __init__(self):
+                    self.pid = os.getpid()
+
+                def translate(self, text, source_lang, dest_lang):
+                    return f"{text} {self.pid}"
+            """
+        )
+    )
+    with open(custom_file) as f:
+        add_custom_translation_services(f)
+    try:
+        service_class = TRANSLATION_SERVICE_CLASSES["Custom CPU service"]
+        # Workers are spawned by default, and load the custom file again
+        with ServiceProcessPool(service_class, max_workers=2) as pool:
+            futures = [pool.submit(["a", "b"], "en", "fr") for _ in range(4)]
+            results = [future.result() for future in futures]
+    finally:
+        del TRANSLATION_SERVICE_CLASSES["Custom CPU service"]
+    pids = {int(text.split()[1]) for result in results for text in result}
+    assert os.getpid() not in pids
+    # The service is created once per worker, not once per call
+    assert len(pids) <= 2
+
+
+def test_deepl_array_length():
+    """Ensure the DeepL calls stay under the size limit of a request body with texts outside of ASCII"""
+    for letter, calls in (("e", 3), ("ж", 8), ("日", 8)):
+        chunks = [letter * 1000] * 150
+        requests = Translator.pack_requests(
+            [DeepL.array_length(chunk) for chunk in chunks], DeepL
+        )
+        assert len(requests) == calls
+        for request in requests:
+            body = json.dumps({"text": [chunks[index] for index in request]})
+            assert len(body.encode()) < 128 * 1024